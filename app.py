@@ -1,9 +1,6 @@
-
 # app.py
 import streamlit as st
-# Only import dashboard for main page; Streamlit will auto-discover pages in /pages
-from pages import dashboard
-
+# Shell only: Streamlit discovers the pages in /pages and loads each one when it is opened,
+# so starting the server imports no data or scan code
 st.sidebar.title("Navigation")
 st.write("Use the sidebar to navigate. For more features, see the pages menu.")
-dashboard
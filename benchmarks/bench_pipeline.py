@@ -0,0 +1,185 @@
+# bench_pipeline.py
+# Offline timings for each stage of the universe scan at several universe sizes
+# Usage: python -m benchmarks.bench_pipeline [--sizes 10,100,1000] [--out results.json] [--compare old.json]
+#
+# Every vendor call is served by benchmarks.replay, so runs need no network and
+# results from different commits can be compared directly.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from unittest import mock
+
+# The disk cache and bar store read their location at import time
+os.environ.setdefault('OPTIONS_CACHE_DIR', tempfile.mkdtemp(prefix='options-bench-'))
+
+import numpy as np
+import pandas as pd
+from benchmarks.replay import FakeWebSocketApp, Fixtures, expiries, offline, universe
+from data.bars import BarStore
+from data.store import DiskCache
+from logic import yfinance_options
+from logic.features import panel_features
+from logic.greeks import chain_greeks
+from logic.iv import chain_implied_vol
+from logic.scanner import Scanner
+from logic.scoring import RUBRIC, rubric_mask, score_frame
+
+SIZES = (10, 100, 1000)
+WORKERS = 8
+WS_MESSAGES = 20_000
+
+# The default RUBRIC admits no call in the 7-60 DTE window under Black-Scholes (theta >= -0.03/day
+# and gamma <= 0.015 exclude each other at delta 0.45-0.60), so no fixture chain can pass it.
+# Screening is timed with theta and gamma opened up so several percent of candidates survive.
+BENCH_RUBRIC = dict(RUBRIC, theta_min=-0.5, gamma=(0.005, 0.05))
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def bench_scan(tickers):
+    # Same two phases as pages/dashboard.py, against a fresh bar store
+    provider = yfinance_options._provider
+    provider.bars = BarStore(provider.fetch_daily_bars, root=tempfile.mkdtemp(prefix='bars-'))
+
+    def scan():
+        for _ in Scanner(yfinance_options.refresh_bars, max_workers=WORKERS).scan(tickers):
+            pass
+        features = yfinance_options.universe_features(tickers)
+        frames = []
+        scanner = Scanner(lambda t: yfinance_options.get_option_candidates(t, features.loc[t]), max_workers=WORKERS)
+        for result in scanner.scan(tickers):
+            if result.error is None and not result.rows.empty:
+                frames.append(result.rows)
+        candidates = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return candidates, yfinance_options.screen_candidates(candidates, BENCH_RUBRIC)
+
+    (candidates, table), cold = _timed(scan)
+    _, warm = _timed(scan)
+    return candidates, {'cold_s': cold, 'warm_s': warm, 'candidates': len(candidates), 'rows': len(table)}
+
+
+def bench_chain(tickers, provider):
+    chains, seconds = _timed(lambda: [provider.get_option_chain(t) for t in tickers])
+    return {'seconds': seconds, 'contracts': int(sum(len(c) for c in chains))}
+
+
+def bench_greeks_iv(tickers, fx):
+    frames = []
+    for t in tickers:
+        spot = fx.spot(t)
+        for expiry in expiries():
+            chain = fx.chain(t, expiry)
+            both = pd.concat([chain.calls.assign(type='call'), chain.puts.assign(type='put')], ignore_index=True)
+            dte = (pd.Timestamp(expiry) - pd.Timestamp.now().normalize()).days
+            frames.append(both.assign(spot=spot, days_to_expiry=dte))
+    chain = pd.concat(frames, ignore_index=True)
+    spot = chain['spot'].to_numpy()
+    iv, iv_s = _timed(chain_implied_vol, chain, spot)
+    _, greeks_s = _timed(chain_greeks, chain.assign(impliedVolatility=iv), spot)
+    return {'contracts': len(chain), 'iv_s': iv_s, 'greeks_s': greeks_s,
+            'iv_solved_pct': float(100.0 * np.isfinite(iv).mean())}
+
+
+def bench_features(tickers, fx):
+    close = pd.DataFrame({t: fx.bars(t)['Close'].to_numpy() for t in tickers})
+    volume = pd.DataFrame({t: fx.bars(t)['Volume'].to_numpy() for t in tickers})
+    _, seconds = _timed(panel_features, close, volume)
+    return {'seconds': seconds, 'bars': int(close.size)}
+
+
+def bench_scoring(candidates):
+    if candidates.empty:
+        return {'seconds': None, 'mask_s': None, 'screen_s': None, 'rows': 0, 'passed': 0}
+
+    # Score every candidate, not only rubric passes, so the timing covers the full frame;
+    # screen_s is the dashboard path (mask, analytics and table for the passes)
+    mask, mask_s = _timed(rubric_mask, candidates, BENCH_RUBRIC)
+    _, seconds = _timed(score_frame, candidates)
+    table, screen_s = _timed(yfinance_options.screen_candidates, candidates, BENCH_RUBRIC)
+    return {'seconds': seconds, 'mask_s': mask_s, 'screen_s': screen_s, 'rows': len(candidates),
+            'passed': int(mask.sum()), 'table_rows': len(table)}
+
+
+def bench_ws(tickers, fx):
+    import polygon_ws
+    FakeWebSocketApp.messages = fx.ws_messages([f"O:{t}" for t in tickers], WS_MESSAGES)
+    ws = FakeWebSocketApp(polygon_ws.WS_URL, on_message=polygon_ws.on_message)
+    _, seconds = _timed(ws.run_forever)
+    return {'seconds': seconds, 'messages': WS_MESSAGES, 'messages_per_sec': WS_MESSAGES / seconds}
+
+
+def run(sizes=SIZES):
+    fx = Fixtures()
+    results = []
+    with offline(fx):
+        for n in sizes:
+            tickers = universe(n)
+            # A fresh disk cache per size, so every size's cold scan starts cold
+            cache = DiskCache(tempfile.mkdtemp(prefix=f'options-bench-{n}-'))
+            with mock.patch('data.store._default', cache):
+                candidates, scan = bench_scan(tickers)
+                stages = {
+                    'scan': scan,
+                    'chain_normalization': bench_chain(tickers, yfinance_options._provider),
+                    'greeks_iv': bench_greeks_iv(tickers, fx),
+                    'features': bench_features(tickers, fx),
+                    'scoring': bench_scoring(candidates),
+                    'ws_replay': bench_ws(tickers, fx),
+                }
+            for stage, row in stages.items():
+                results.append(dict(stage=stage, tickers=n, **row))
+                print(f"{n:>5} {stage:<20} {_fmt(row)}")
+    return {'meta': _meta(), 'results': results}
+
+
+def _fmt(row):
+    return '  '.join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items())
+
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit, 'timestamp': pd.Timestamp.now(tz='UTC').isoformat(),
+        'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        'machine': platform.machine(), 'cpus': os.cpu_count(),
+    }
+
+
+def compare(old, new):
+    """Print the ratio new/old for every timing present in both runs (>1 is slower)."""
+    key = lambda r: (r['stage'], r['tickers'])
+    before = {key(r): r for r in old['results']}
+    for row in new['results']:
+        prev = before.get(key(row))
+        if prev is None:
+            continue
+        for field, value in row.items():
+            if field.endswith('_s') or field == 'seconds':
+                if isinstance(value, float) and isinstance(prev.get(field), float) and prev[field] > 0:
+                    print(f"{row['tickers']:>5} {row['stage']:<20} {field:<8} {value / prev[field]:.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--out', default='benchmarks/results.json')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+    report = run([int(s) for s in args.sizes.split(',')])
+    with open(args.out, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"wrote {args.out}")
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(json.load(fh), report)
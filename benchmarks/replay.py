@@ -0,0 +1,244 @@
+# replay.py
+# Offline stand-ins for yfinance, Polygon REST/WebSocket and Alpha Vantage, replaying fixtures
+#
+# The only captured vendor payload in the repo is polygon_nvda_snapshot.json.
+# Fixtures for any number of tickers are derived from it deterministically:
+# each synthetic ticker gets its own price level, a year of daily bars, a
+# chain per expiry and Polygon/Alpha Vantage payloads in the recorded shapes.
+import copy
+import json
+import os
+import zlib
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+import numpy as np
+import pandas as pd
+from logic.greeks import bs_greeks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECORDED_SNAPSHOT = os.path.join(ROOT, 'polygon_nvda_snapshot.json')
+
+N_BARS = 520          # about two years of daily bars
+N_EXPIRIES = 6        # weekly expiries from next Friday
+STRIKES_PER_SIDE = 15
+
+OptionChain = namedtuple('OptionChain', ['calls', 'puts'])
+
+
+def universe(n):
+    """n synthetic ticker names (T0000, T0001, ...)."""
+    return [f"T{i:04d}" for i in range(n)]
+
+
+def _seed(ticker):
+    return zlib.crc32(ticker.encode())
+
+
+def expiries():
+    """The next N_EXPIRIES weekly (Friday) expiry dates as YYYY-MM-DD."""
+    today = pd.Timestamp.now().normalize()
+    first = today + pd.offsets.Week(weekday=4)
+    return [(first + pd.Timedelta(weeks=i)).strftime('%Y-%m-%d') for i in range(N_EXPIRIES)]
+
+
+class Fixtures:
+    """Deterministic per-ticker vendor payloads, built lazily and memoised."""
+
+    def __init__(self):
+        with open(RECORDED_SNAPSHOT) as fh:
+            self.recorded = json.load(fh)
+        self._bars = {}
+        self._chains = {}
+
+    def spot(self, ticker):
+        return float(self.bars(ticker)['Close'].iloc[-1])
+
+    def bars(self, ticker):
+        # yfinance-style history frame (capitalised columns, tz-aware index)
+        if ticker not in self._bars:
+            rng = np.random.default_rng(_seed(ticker))
+            idx = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=N_BARS, tz='America/New_York')
+            close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, N_BARS)))
+            spread = close * rng.uniform(0.002, 0.02, N_BARS)
+            self._bars[ticker] = pd.DataFrame({
+                'Open': close - spread / 2, 'High': close + spread, 'Low': close - spread, 'Close': close,
+                'Volume': rng.integers(1_000_000, 50_000_000, N_BARS).astype(float),
+            }, index=idx)
+        return self._bars[ticker]
+
+    def chain(self, ticker, expiry):
+        # yfinance-style calls/puts frames for one expiry, priced off a per-ticker vol
+        key = (ticker, expiry)
+        if key not in self._chains:
+            rng = np.random.default_rng(_seed(ticker) + _seed(expiry))
+            spot = self.spot(ticker)
+            step = max(round(spot * 0.01, 0), 0.5)
+            strikes = np.round(spot / step) * step + step * np.arange(-STRIKES_PER_SIDE, STRIKES_PER_SIDE + 1)
+            strikes = strikes[strikes > 0]
+            dte = max((pd.Timestamp(expiry) - pd.Timestamp.now().normalize()).days, 1)
+            vol = rng.uniform(0.2, 0.6) + 0.1 * np.abs(np.log(strikes / spot))
+            frames = {}
+            for side, is_call in (('calls', True), ('puts', False)):
+                price = bs_greeks(spot, strikes, 0.05, dte, vol, is_call)['price'].to_numpy()
+                half = np.maximum(price * rng.uniform(0.005, 0.04, strikes.size), 0.01)
+                cp = 'C' if is_call else 'P'
+                yymmdd = pd.Timestamp(expiry).strftime('%y%m%d')
+                frames[side] = pd.DataFrame({
+                    'contractSymbol': [f"{ticker}{yymmdd}{cp}{int(round(k * 1000)):08d}" for k in strikes],
+                    'strike': strikes, 'lastPrice': price, 'bid': np.round(price - half, 2),
+                    'ask': np.round(price + half, 2), 'volume': rng.integers(0, 5000, strikes.size).astype(float),
+                    'openInterest': rng.integers(0, 20000, strikes.size).astype(float),
+                    'impliedVolatility': vol, 'inTheMoney': (strikes < spot) if is_call else (strikes > spot),
+                })
+            self._chains[key] = frames
+        frames = self._chains[key]
+        return OptionChain(frames['calls'].copy(), frames['puts'].copy())
+
+    def polygon_snapshot(self, ticker):
+        # Recorded NVDA snapshot results re-labelled and re-struck for this ticker
+        spot = self.spot(ticker)
+        base = self.recorded['results']
+        ref = base[0]['underlying_asset']['price']
+        expiry = expiries()[0]
+        out = []
+        for r in base:
+            r = copy.deepcopy(r)
+            strike = round(r['details']['strike_price'] * spot / ref, 2)
+            cp = 'C' if r['details']['contract_type'] == 'call' else 'P'
+            r['details'].update(strike_price=strike, expiration_date=expiry,
+                                ticker=f"O:{ticker}{pd.Timestamp(expiry).strftime('%y%m%d')}{cp}{int(round(strike * 1000)):08d}")
+            r['underlying_asset'].update(ticker=ticker, price=spot)
+            out.append(r)
+        return {'results': out, 'status': 'OK'}
+
+    def polygon_aggs(self, ticker, start=None):
+        bars = self.bars(ticker)
+        if start:
+            bars = bars[bars.index.tz_localize(None) >= pd.Timestamp(start)]
+        t = bars.index.tz_localize(None).normalize().as_unit('ms').asi8.tolist()
+        return {'results': [{'o': o, 'h': h, 'l': l, 'c': c, 'v': v, 't': ts} for o, h, l, c, v, ts in
+                            zip(bars['Open'], bars['High'], bars['Low'], bars['Close'], bars['Volume'], t)]}
+
+    def alphavantage(self, function, ticker):
+        if function == 'TIME_SERIES_DAILY_ADJUSTED':
+            bars = self.bars(ticker).tail(100)
+            return {'Time Series (Daily)': {
+                d.strftime('%Y-%m-%d'): {'4. close': f"{c:.4f}", '6. volume': f"{int(v)}"}
+                for d, c, v in zip(bars.index, bars['Close'], bars['Volume'])}}
+        if function == 'OPTION_CHAIN':
+            chain = self.chain(ticker, expiries()[0])
+            calls = chain.calls.assign(expiry=expiries()[0], impliedVolatility=chain.calls['impliedVolatility'] * 100)
+            puts = chain.puts.assign(expiry=expiries()[0], impliedVolatility=chain.puts['impliedVolatility'] * 100)
+            return {'optionChain': {'calls': calls.to_dict('records'), 'puts': puts.to_dict('records')}}
+        return {}
+
+    def ws_messages(self, tickers, n_messages, events_per_message=10):
+        """Polygon-style trade messages (JSON strings) spread over the given tickers."""
+        rng = np.random.default_rng(0)
+        t0 = int(pd.Timestamp.now().timestamp() * 1000)
+        msgs = []
+        for i in range(n_messages):
+            events = []
+            for j in range(events_per_message):
+                tk = tickers[(i * events_per_message + j) % len(tickers)]
+                events.append({'ev': 'T', 'sym': tk, 'p': round(float(rng.uniform(10, 500)), 2),
+                               's': int(rng.integers(1, 500)), 't': t0 + i * 10 + j})
+            msgs.append(json.dumps(events))
+        return msgs
+
+
+class FakeTicker:
+    """yfinance.Ticker stand-in backed by Fixtures."""
+
+    def __init__(self, fixtures, ticker):
+        self._fx = fixtures
+        self.ticker = ticker
+
+    @property
+    def options(self):
+        return tuple(expiries())
+
+    def option_chain(self, expiry):
+        return self._fx.chain(self.ticker, expiry)
+
+    def history(self, period=None, start=None, **kwargs):
+        bars = self._fx.bars(self.ticker)
+        if start is not None:
+            return bars[bars.index.tz_localize(None) >= pd.Timestamp(start)].copy()
+        n = {'1d': 1, '2d': 2, '5d': 5, '1mo': 21, '1y': 252, '2y': 504}.get(period, len(bars))
+        return bars.tail(n).copy()
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode()
+        self.text = self.content.decode()
+        self.headers = {}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeHTTP:
+    """Routes requests.get / Session.get calls to fixture payloads by URL."""
+
+    def __init__(self, fixtures):
+        self._fx = fixtures
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        params = params or {}
+        if 'alphavantage.co' in url:
+            return FakeResponse(self._fx.alphavantage(params.get('function'), params.get('symbol')))
+        if '/v3/snapshot/options/' in url:
+            ticker = url.split('/v3/snapshot/options/')[1].split('?')[0]
+            return FakeResponse(self._fx.polygon_snapshot(ticker))
+        if '/v2/aggs/ticker/' in url:
+            parts = url.split('/v2/aggs/ticker/')[1].split('/')
+            return FakeResponse(self._fx.polygon_aggs(parts[0], parts[4]))
+        return FakeResponse({'results': []})
+
+
+class FakeWebSocketApp:
+    """websocket.WebSocketApp stand-in: acks auth, then replays `messages` and returns."""
+    messages = []
+
+    def __init__(self, url, on_open=None, on_message=None, **kwargs):
+        self.url = url
+        self.on_open = on_open
+        self.on_message = on_message
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+    def run_forever(self, **kwargs):
+        if self.on_open:
+            self.on_open(self)
+        self.on_message(self, json.dumps([{'ev': 'status', 'status': 'auth_success'}]))
+        for message in self.messages:
+            self.on_message(self, message)
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def offline(fixtures=None):
+    """
+    Patch every network entry point used by the project onto the fixtures:
+    yfinance.Ticker, requests.get, requests.Session.get and websocket.WebSocketApp.
+    """
+    fixtures = fixtures or Fixtures()
+    http = FakeHTTP(fixtures)
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch('yfinance.Ticker', lambda t, *a, **k: FakeTicker(fixtures, t)))
+        stack.enter_context(mock.patch('requests.get', http.get))
+        stack.enter_context(mock.patch('requests.Session.get', lambda self, url, **kw: http.get(url, **kw)))
+        stack.enter_context(mock.patch('websocket.WebSocketApp', FakeWebSocketApp))
+        yield fixtures
@@ -0,0 +1,112 @@
+# startup.py
+# Cold-start timings: import cost of each entry point and time to the dashboard's first paint
+# Usage: python -m benchmarks.startup [--repeat 5] [--out benchmarks/results_startup.json]
+#
+# Every import is timed in a fresh interpreter, so nothing is shared with the
+# previous run. Heavy vendor clients are expected to stay unloaded until a
+# fetch needs them; the report lists any that an entry point pulled in.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['logic.refresher', 'data.provider', 'data.yahoo', 'data.polygon', 'polygon_ws', 'pages.dashboard']
+HEAVY = ['yfinance', 'requests', 'websocket', 'aiohttp', 'mibian']
+
+_PROBE = """
+import importlib, json, sys, time
+t0 = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - t0
+print(json.dumps({'seconds': seconds, 'loaded': [m for m in sys.argv[2].split(',') if m in sys.modules]}))
+"""
+
+# First paint: the app shell and the dashboard run headless; st.title is the first
+# element both send, so its timestamp is when the browser would show something
+_PAINT = """
+import json, sys, time
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+first = []
+title = st.title
+def timed_title(*args, **kwargs):
+    first.append(time.perf_counter())
+    return title(*args, **kwargs)
+st.title = timed_title
+t0 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+done = time.perf_counter()
+print(json.dumps({'first_paint_s': first[0] - t0 if first else None, 'script_s': done - t0,
+                  'exceptions': len(at.exception)}))
+"""
+
+
+def _python(code, *args):
+    env = dict(os.environ, OPTIONS_CACHE_DIR=tempfile.mkdtemp(prefix='options-startup-'))
+    proc = subprocess.run([sys.executable, '-c', code, *args], cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        return {'error': (proc.stderr.strip().splitlines() or ['failed'])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_imports(repeat):
+    rows = []
+    for module in MODULES:
+        runs = [_python(_PROBE, module, ','.join(HEAVY)) for _ in range(repeat)]
+        ok = [r for r in runs if 'error' not in r]
+        if not ok:
+            rows.append({'stage': 'import', 'module': module, 'skipped': runs[0]['error']})
+            continue
+        times = sorted(r['seconds'] for r in ok)
+        rows.append({'stage': 'import', 'module': module, 'median_s': times[len(times) // 2],
+                     'min_s': times[0], 'heavy_loaded': ok[0]['loaded']})
+    return rows
+
+
+def bench_first_paint(repeat):
+    rows = []
+    for script in ('app.py', 'pages/dashboard.py'):
+        runs = [_python(_PAINT, script) for _ in range(repeat)]
+        ok = [r for r in runs if 'error' not in r and r['first_paint_s'] is not None]
+        if not ok:
+            error = runs[0].get('error', 'no title rendered')
+            rows.append({'stage': 'first_paint', 'module': script, 'skipped': error})
+            continue
+        paint = sorted(r['first_paint_s'] for r in ok)
+        script_s = sorted(r['script_s'] for r in ok)
+        rows.append({'stage': 'first_paint', 'module': script, 'median_s': paint[len(paint) // 2],
+                     'script_s': script_s[len(script_s) // 2], 'exceptions': ok[0]['exceptions']})
+    return rows
+
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(),
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def _fmt(row):
+    return '  '.join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}"
+                     for k, v in row.items() if k not in ('stage', 'module'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--out', default='benchmarks/results_startup.json')
+    args = parser.parse_args()
+    results = bench_imports(args.repeat) + bench_first_paint(args.repeat)
+    for row in results:
+        print(f"{row['stage']:<12} {row['module']:<20} {_fmt(row)}")
+    with open(args.out, 'w') as fh:
+        json.dump({'meta': _meta(), 'results': results}, fh, indent=2)
+    print(f"wrote {args.out}")
@@ -0,0 +1,213 @@
+# async_provider.py
+# Asyncio data provider: aiohttp for Polygon and Alpha Vantage, yfinance on an executor,
+# independent sources queried concurrently under a deadline
+import asyncio
+import json
+from functools import partial
+import aiohttp
+from data import yahoo
+from data.chains import chain_loader
+from data.metrics import metrics, span, timed
+from data.polygon import BASE_URL, RETRY_STATUS, parse_snapshot
+from data.provider import (AV_URL, av_quote_from_daily, get_provider, price_row, resolve_iv,
+                           yf_quote_from_history)
+from data.schema import from_alphavantage, merge_chains
+from data.singleflight import freeze
+from data.store import get_cache
+
+DEADLINE = 8.0      # seconds a multi-source call waits before answering with what it has
+POOL_SIZE = 20      # open connections per aiohttp session
+MAX_RETRIES = 4     # Polygon 429/5xx retries with exponential backoff
+
+
+class AsyncDataProvider:
+    # Interface for async providers
+    async def get_prices(self, ticker):
+        raise NotImplementedError
+    async def get_historicals(self, ticker):
+        raise NotImplementedError
+    async def get_option_chain(self, ticker):
+        raise NotImplementedError
+    async def get_sentiment(self):
+        raise NotImplementedError
+
+
+async def first_good(coros, deadline=DEADLINE, good=lambda v: v is not None):
+    """
+    Run coroutines concurrently and return the first result that passes
+    `good`; None if none does before the deadline. Failures are skipped,
+    results landing together are taken in input order (so list the
+    preferred source first), and whatever is still running is cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(end - loop.time(), 0),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                metrics.count('async.deadline')
+                return None
+            for task in tasks:
+                if task in done and task.exception() is None and good(task.result()):
+                    return task.result()
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def gather_within(coros, deadline=DEADLINE):
+    """Run coroutines concurrently; results in input order, None for any that failed or missed the deadline."""
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        metrics.count('async.deadline')
+    return [t.result() if t in done and not t.cancelled() and t.exception() is None else None for t in tasks]
+
+
+class AsyncOptionAProvider(AsyncDataProvider):
+    """
+    Async counterpart of OptionAProvider (same keys, bar store and parsing).
+
+    Polygon and Alpha Vantage go over one pooled aiohttp session; yfinance,
+    the disk cache and the bar store are blocking and run on `executor`
+    (the loop default if None). Identical concurrent requests on this
+    provider share one in-flight task. Use as an async context manager, or
+    call close() when done:
+
+        async with AsyncOptionAProvider() as provider:
+            prices = await provider.get_prices('AAPL')
+    """
+
+    def __init__(self, sync=None, executor=None, deadline=DEADLINE):
+        self.sync = sync or get_provider()
+        self.executor = executor
+        self.deadline = deadline
+        self._session = None
+        self._inflight = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _http(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=POOL_SIZE),
+                                                  timeout=aiohttp.ClientTimeout(total=10))
+        return self._session
+
+    async def _blocking(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def _coalesced(self, key, factory):
+        # Async single-flight: waiters share the task; shield keeps one waiter's cancellation from killing it
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            metrics.count('singleflight.shared')
+        return await asyncio.shield(task)
+
+    async def get_json(self, source, url, params=None, retries=0):
+        """Decoded JSON from a GET, retrying RETRY_STATUS responses up to `retries` times."""
+        params = {k: str(v).lower() if isinstance(v, bool) else str(v) for k, v in (params or {}).items()}
+
+        async def fetch():
+            for attempt in range(retries + 1):
+                with span('http.get', source):
+                    async with self._http().get(url, params=params) as response:
+                        body = await response.read()
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+                metrics.add_bytes(source, len(body))
+                if status == 429:
+                    metrics.count(f"{source}.429")
+                if status not in RETRY_STATUS or attempt == retries:
+                    break
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+                await asyncio.sleep(delay)
+            if status >= 400:
+                raise RuntimeError(f"{source} HTTP {status} on {url}")
+            return json.loads(body)
+        return await self._coalesced((source, url, freeze(params)), fetch)
+
+    # --- per-source fetchers -------------------------------------------------
+
+    async def yf_quote(self, ticker):
+        return yf_quote_from_history(await self._blocking(yahoo.history, ticker, period="2d"))
+
+    async def av_quote(self, ticker):
+        if not self.sync.alpha_vantage_key:
+            return None
+        return av_quote_from_daily(await self.get_json('alphavantage', AV_URL, self.sync.av_params('TIME_SERIES_DAILY_ADJUSTED', ticker)))
+
+    async def polygon_snapshot(self, ticker, limit=250):
+        """Polygon chain snapshot (all pages) as a parse_snapshot() frame, through the disk cache."""
+        cache = get_cache()
+        cached = await self._blocking(cache.get, 'polygon', ticker, 'snapshot')
+        if cached is not None:
+            return cached
+        results = []
+        url, params = f"{BASE_URL}/v3/snapshot/options/{ticker.upper()}", {'limit': limit, 'apiKey': self.sync.polygon_key}
+        while url:
+            page = await self.get_json('polygon', url, params, retries=MAX_RETRIES)
+            results.extend(page.get('results') or [])
+            # next_url already carries the cursor and filters, only the key is re-added
+            url, params = page.get('next_url'), {'apiKey': self.sync.polygon_key}
+        snapshot = parse_snapshot(results)
+        if len(snapshot):
+            await self._blocking(cache.put, 'polygon', ticker, 'snapshot', snapshot)
+        return snapshot
+
+    # --- DataProvider API ----------------------------------------------------
+
+    @timed('async.get_prices')
+    async def get_prices(self, ticker):
+        # yfinance and Alpha Vantage race; the first usable quote wins
+        quote = await first_good([self.yf_quote(ticker), self.av_quote(ticker)], self.deadline)
+        metrics.count('prices.async' if quote is not None else 'prices.async_missing')
+        return price_row(ticker, quote)
+
+    async def get_historicals(self, ticker):
+        return await self._blocking(self.sync.get_historicals, ticker)
+
+    @timed('async.get_option_chain')
+    async def get_option_chain(self, ticker):
+        """
+        Alpha Vantage and Yahoo chains fetched concurrently and merged on OCC
+        symbol (see OptionAProvider.get_option_chain). Whatever has arrived by
+        the deadline is merged; a late source is simply left out.
+        """
+        async def av():
+            payload = await self.get_json('alphavantage', AV_URL, self.sync.av_params('OPTION_CHAIN', ticker))
+            return from_alphavantage(payload, ticker)
+
+        async def yf():
+            return await self._blocking(lambda: resolve_iv(chain_loader.load(ticker)))
+
+        chains = await gather_within([av(), yf()], self.deadline)
+        return merge_chains([c for c in chains if c is not None])
+
+    async def get_sentiment(self):
+        return {"VIX": None}
+
+    async def many(self, method, tickers):
+        """{ticker: result} for one method over many tickers, all in flight at once."""
+        fn = getattr(self, method)
+        results = await asyncio.gather(*(fn(t) for t in tickers), return_exceptions=True)
+        return {t: (None if isinstance(r, Exception) else r) for t, r in zip(tickers, results)}
@@ -0,0 +1,114 @@
+# bars.py
+# Incremental daily-bar store: one Parquet file per ticker, only the missing tail is fetched
+import os
+import tempfile
+import threading
+import time
+import pandas as pd
+from data.store import CACHE_DIR
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+LOOKBACK_DAYS = 730   # history pulled the first time a ticker is seen
+MIN_REFRESH = 60      # seconds between tail fetches for the same ticker
+
+
+class BarStore:
+    """
+    Local columnar store of daily OHLCV bars per ticker.
+
+    `fetch(ticker, start)` must return a DataFrame of BAR_COLUMNS indexed by
+    date for bars on or after `start` (a date string). The store remembers
+    its last bar and only asks for bars from that date on; the last bar is
+    re-requested because today's bar keeps changing until the close. New bars
+    are merged over old ones (later wins) and written atomically, so several
+    processes can share the directory.
+    """
+
+    def __init__(self, fetch, root=None, lookback_days=LOOKBACK_DAYS, min_refresh=MIN_REFRESH):
+        self.fetch = fetch
+        self.root = root or os.path.join(CACHE_DIR, 'bars')
+        self.lookback_days = lookback_days
+        self.min_refresh = min_refresh
+        self._frames = {}       # ticker -> (mtime, DataFrame)
+        self._refreshed = {}    # ticker -> monotonic time of last tail fetch
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker):
+        return os.path.join(self.root, f"{ticker.upper().replace(os.sep, '_')}.parquet")
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def load(self, ticker):
+        """Bars currently on disk (no network)."""
+        path = self._path(ticker)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name='date'))
+        cached = self._frames.get(ticker)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        df = pd.read_parquet(path)
+        self._frames[ticker] = (mtime, df)
+        return df
+
+    def _write(self, ticker, df):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                df.to_parquet(fh)
+            os.replace(tmp, self._path(ticker))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._frames[ticker] = (os.stat(self._path(ticker)).st_mtime, df)
+
+    def update(self, ticker, force=False):
+        """Fetch bars newer than the last stored one and merge them in."""
+        with self._ticker_lock(ticker):
+            last_refresh = self._refreshed.get(ticker)
+            if not force and last_refresh and time.monotonic() - last_refresh < self.min_refresh:
+                return self.load(ticker)
+            old = self.load(ticker)
+            if len(old):
+                start = old.index[-1]
+            else:
+                start = pd.Timestamp.now().normalize() - pd.Timedelta(days=self.lookback_days)
+            try:
+                new = self.fetch(ticker, start.strftime('%Y-%m-%d'))
+            except Exception as e:
+                print(f"[BARS ERROR] {ticker}: {e}")
+                new = None
+            self._refreshed[ticker] = time.monotonic()
+            if new is None or new.empty:
+                return old
+            new = new[BAR_COLUMNS].astype('float64')
+            merged = pd.concat([old, new]) if len(old) else new
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            merged.index.name = 'date'
+            self._write(ticker, merged)
+            return merged
+
+    def get(self, ticker, start=None, end=None, refresh=True):
+        """Bars for ticker between start and end (inclusive), refreshing the tail first."""
+        df = self.update(ticker) if refresh else self.load(ticker)
+        return df.loc[start:end] if (start is not None or end is not None) else df
+
+    def tail(self, ticker, n, refresh=True):
+        return self.get(ticker, refresh=refresh).tail(n)
+
+    def panel(self, tickers, start=None, end=None, refresh=False):
+        """Wide (date x ticker) close and volume panels for a universe."""
+        frames = {t: self.get(t, start, end, refresh=refresh) for t in tickers}
+        frames = {t: df for t, df in frames.items() if len(df)}
+        if not frames:
+            empty = pd.DataFrame(columns=list(tickers), dtype='float64')
+            return empty, empty.copy()
+        close = pd.DataFrame({t: df['close'] for t, df in frames.items()}).sort_index()
+        volume = pd.DataFrame({t: df['volume'] for t, df in frames.items()}).sort_index()
+        return close, volume
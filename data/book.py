@@ -0,0 +1,109 @@
+# book.py
+# Conflating last-value store for streaming market data, keyed by symbol
+import json
+import threading
+from collections import Counter
+
+# Polygon event type -> slot in a symbol's entry
+EVENT_SLOTS = {'T': 'trade', 'Q': 'quote', 'A': 'agg', 'AM': 'agg'}
+
+
+def _event_time(ev):
+    # Trades/quotes carry 't', aggregates their window start 's' (ms or ns; only compared per symbol)
+    return ev.get('t', ev.get('s'))
+
+
+class LatestBook:
+    """
+    Latest trade, quote and aggregate per symbol (contracts 'O:...' and underlyings).
+
+    Every update overwrites the symbol's slot instead of queueing, so a burst
+    on one symbol can never push out the state of a quiet one and memory is
+    O(symbols). Each accepted update gets a global sequence number; events
+    older than what is already held for that symbol/slot are dropped and
+    counted. snapshot() copies the entries under the same lock the writer
+    uses, so readers see one consistent state.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.counters = Counter()
+        self.last_status = None
+
+    def on_raw(self, message):
+        """Parse one raw WebSocket message (a JSON event or list of events), apply it and return the events."""
+        try:
+            events = json.loads(message)
+        except ValueError:
+            with self._lock:
+                self.counters['parse_errors'] += 1
+            return []
+        events = events if isinstance(events, list) else [events]
+        with self._lock:
+            self.counters['messages'] += 1
+            for ev in events:
+                self._apply(ev)
+        return events
+
+    def update_many(self, events):
+        with self._lock:
+            for ev in events:
+                self._apply(ev)
+
+    def update(self, ev):
+        with self._lock:
+            self._apply(ev)
+
+    def _apply(self, ev):
+        kind = ev.get('ev')
+        if kind == 'status':
+            self.last_status = ev
+            self.counters['status'] += 1
+            return
+        slot = EVENT_SLOTS.get(kind)
+        symbol = ev.get('sym')
+        if slot is None or symbol is None:
+            self.counters['unknown'] += 1
+            return
+        entry = self._entries.get(symbol)
+        if entry is None:
+            entry = self._entries[symbol] = {'symbol': symbol, 'seq': 0, 'updates': 0}
+        prev = entry.get(slot)
+        t = _event_time(ev)
+        if prev is not None and t is not None and _event_time(prev) is not None and t < _event_time(prev):
+            self.counters['stale_dropped'] += 1
+            return
+        if prev is not None:
+            self.counters['conflated'] += 1
+        self.seq += 1
+        entry[slot] = ev
+        entry['seq'] = self.seq
+        entry['updates'] += 1
+        self.counters['events'] += 1
+
+    def get(self, symbol):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            return dict(entry) if entry else None
+
+    def snapshot(self, since_seq=0, contracts=None):
+        """
+        {symbol: entry} for every symbol updated after `since_seq`.
+        contracts=True keeps only option contracts, False only underlyings.
+        """
+        with self._lock:
+            seq = self.seq
+            out = {s: dict(e) for s, e in self._entries.items() if e['seq'] > since_seq}
+        if contracts is not None:
+            out = {s: e for s, e in out.items() if s.startswith('O:') == contracts}
+        return seq, out
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, symbols=len(self._entries), seq=self.seq)
+
+
+# Latest trade/quote/aggregate per symbol, fed by polygon_ws (conflating, never drops quiet symbols)
+book = LatestBook()
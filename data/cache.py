@@ -1,19 +1,22 @@
 # cache.py
 # Caching wrappers for Streamlit
+# st.cache_data is the in-process fast path; data.store.DiskCache sits underneath
+# so restarts, the WebSocket worker and scripts reuse what was already fetched.
 import streamlit as st
-from data.provider import OptionAProvider
+from data.provider import get_provider
+from data.store import get_cache
 
 @st.cache_data(ttl=60)
 def get_prices(ticker):
-    provider = OptionAProvider()
-    return provider.get_prices(ticker)
+    provider = get_provider()
+    return get_cache().get_or_fetch('optiona', ticker, 'prices', lambda: provider.get_prices(ticker))
 
 @st.cache_data(ttl=60)
 def get_historicals(ticker):
-    provider = OptionAProvider()
-    return provider.get_historicals(ticker)
+    provider = get_provider()
+    return get_cache().get_or_fetch('optiona', ticker, 'historicals', lambda: provider.get_historicals(ticker))
 
 @st.cache_data(ttl=300)
 def get_sentiment():
-    provider = OptionAProvider()
-    return provider.get_sentiment()
+    provider = get_provider()
+    return get_cache().get_or_fetch('optiona', 'market', 'sentiment', provider.get_sentiment)
@@ -0,0 +1,121 @@
+# chains.py
+# Full option chains: every expiry inside a DTE window, fetched concurrently into one compact frame
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data import yahoo
+from logic.greeks import bs_greeks
+from data.schema import empty_chain, stack_columns, strike_price, typed_chain, yfinance_columns
+from data.store import get_cache
+from data.metrics import timed
+
+DTE_WINDOW = (7, 60)        # calendar days; the range dte_score is built around
+DELTA_BAND = (0.20, 0.80)   # absolute delta kept when scanning
+# Strike window (fraction of spot) cut by binary search before the delta mask; wide
+# enough to hold the whole delta band up to ~80% IV at the far end of DTE_WINDOW
+MONEYNESS = (0.6, 1.6)
+
+
+def expiries_in_window(expiries, dte_window=DTE_WINDOW, today=None):
+    """The listed expiries (YYYY-MM-DD strings) whose DTE falls inside dte_window."""
+    if not expiries:
+        return []
+    today = pd.Timestamp.now().normalize() if today is None else pd.Timestamp(today).normalize()
+    dte = (pd.to_datetime(pd.Index(expiries)) - today).days
+    keep = (dte >= dte_window[0]) & (dte <= dte_window[1])
+    return [e for e, k in zip(expiries, keep) if k]
+
+
+class ChainLoader:
+    """
+    Every expiry of an underlying inside `dte_window`, calls and puts, as one
+    data.schema chain sorted by (expiry, type, strike).
+
+    Expiries are fetched concurrently on one pool shared by all callers, so a
+    universe scan running on its own workers never has more than `max_workers`
+    chain requests in flight. Yahoo chains carry no Greeks; they are computed
+    locally from Yahoo's IV (decimal). Results go through the disk cache under
+    kind 'chain'.
+    """
+
+    def __init__(self, dte_window=DTE_WINDOW, max_workers=8, rate=0.05):
+        self.dte_window = dte_window
+        self.rate = rate
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chains')
+
+    def load(self, ticker, spot=None, max_age=None):
+        # max_age: serve a cached chain only if younger than this (seconds), e.g. the caller's rescan interval
+        return get_cache().get_or_fetch('yfinance', ticker, 'chain', lambda: self.fetch(ticker, spot), max_age=max_age)
+
+    @timed('chains.fetch')
+    def fetch(self, ticker, spot=None):
+        expiries = expiries_in_window(yahoo.options(ticker), self.dte_window)
+        if not expiries:
+            return empty_chain()
+        if spot is None:
+            spot = float(yahoo.history(ticker, period="1d")['Close'].iloc[-1])
+
+        def one(expiry):
+            try:
+                opt_chain = yahoo.option_chain(ticker, expiry)
+            except Exception as e:
+                print(f"[CHAIN ERROR] {ticker} {expiry}: {e}")
+                return []
+            return [yfinance_columns(opt_chain.calls, ticker, expiry, 'call', spot),
+                    yfinance_columns(opt_chain.puts, ticker, expiry, 'put', spot)]
+
+        # Cast once for the whole underlying rather than once per expiry
+        columns = stack_columns([p for sides in self._pool.map(one, expiries) for p in sides])
+        if not columns:
+            return empty_chain()
+        chain = typed_chain(columns).sort_values(['expiry', 'type', 'strike'], kind='stable', ignore_index=True)
+        greeks = bs_greeks(spot, strike_price(chain), self.rate, chain['dte'].to_numpy(),
+                           chain['iv'].to_numpy(), (chain['type'] == 'call').to_numpy())
+        for col in ('delta', 'gamma', 'theta', 'vega'):
+            chain[col] = greeks[col].to_numpy(dtype='float32')
+        return chain
+
+
+def _blocks(chain):
+    # [start, stop) row ranges of each (expiry, type) run in a sorted chain
+    if chain.empty:
+        return []
+    key = chain['expiry'].to_numpy().astype('int64') * 2 + (chain['type'] == 'put').to_numpy()
+    cuts = np.flatnonzero(np.diff(key)) + 1
+    return list(zip(np.r_[0, cuts], np.r_[cuts, len(chain)]))
+
+
+def strike_range(chain, lo, hi):
+    """Rows with lo <= strike <= hi (dollars), found by binary search inside each (expiry, type) run."""
+    strikes = strike_price(chain)
+    rows = [np.arange(start + np.searchsorted(strikes[start:stop], lo, 'left'),
+                      start + np.searchsorted(strikes[start:stop], hi, 'right'))
+            for start, stop in _blocks(chain)]
+    return chain.iloc[np.concatenate(rows)] if rows else chain.iloc[:0]
+
+
+def moneyness_slice(chain, spot, lo=MONEYNESS[0], hi=MONEYNESS[1]):
+    """Strikes between lo*spot and hi*spot in every expiry."""
+    return strike_range(chain, lo * spot, hi * spot)
+
+
+def nearest_strikes(chain, spot, n=1):
+    """The n strikes closest to spot in every (expiry, type) run."""
+    strikes = strike_price(chain)
+    rows = []
+    for start, stop in _blocks(chain):
+        i = start + np.searchsorted(strikes[start:stop], spot)
+        lo, hi = max(start, i - n), min(stop, i + n)
+        window = np.arange(lo, hi)
+        rows.append(np.sort(window[np.argsort(np.abs(strikes[lo:hi] - spot), kind='stable')[:n]]))
+    return chain.iloc[np.concatenate(rows)] if rows else chain.iloc[:0]
+
+
+def delta_band(chain, lo=DELTA_BAND[0], hi=DELTA_BAND[1]):
+    """Rows whose absolute delta is within [lo, hi]."""
+    delta = chain['delta'].abs()
+    return chain[(delta >= lo) & (delta <= hi)]
+
+
+# Process-wide loader shared by the scanner, the provider and the WS symbol resolver
+chain_loader = ChainLoader()
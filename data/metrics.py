@@ -0,0 +1,166 @@
+# metrics.py
+# In-process timing spans, latency histograms, counters and event rates for diagnostics
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Latency bucket upper bounds in milliseconds (last bucket is open-ended)
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, float('inf')]
+RATE_WINDOW = 60  # seconds of history kept for event rates
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (max for the open bucket)
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= target:
+                return self.max if bound == float('inf') else min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else None,
+            'p50_ms': self.quantile(0.5), 'p90_ms': self.quantile(0.9), 'p99_ms': self.quantile(0.99),
+            'min_ms': self.min, 'max_ms': self.max,
+        }
+
+
+class Metrics:
+    """
+    Thread-safe registry. Spans are keyed by (name, source); source is the
+    upstream (yfinance, polygon, alphavantage, ...) or None for local work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.errors = Counter()
+            self.counters = Counter()
+            self.gauges = {}
+            self._events = {}
+            self.started = time.time()
+
+    def observe(self, name, ms, source=None, error=False):
+        with self._lock:
+            key = (name, source)
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(ms)
+            if error:
+                self.errors[key] += 1
+
+    @contextmanager
+    def span(self, name, source=None):
+        t0 = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(name, (time.perf_counter() - t0) * 1000, source, error)
+
+    def timed(self, name, source=None):
+        """Decorator form of span(); coroutine functions stay coroutine functions and are timed to completion."""
+        def wrap(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def inner_async(*args, **kwargs):
+                    with self.span(name, source):
+                        return await fn(*args, **kwargs)
+                return inner_async
+
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.span(name, source):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_bytes(self, source, n):
+        self.count(f"bytes.{source}", n)
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def mark(self, name, n=1):
+        """Record n events now, for per-second rates over RATE_WINDOW."""
+        sec = int(time.time())
+        with self._lock:
+            window = self._events.get(name)
+            if window is None:
+                window = self._events[name] = deque()
+            if window and window[-1][0] == sec:
+                window[-1][1] += n
+            else:
+                window.append([sec, n])
+            while window and window[0][0] <= sec - RATE_WINDOW:
+                window.popleft()
+
+    def rates(self):
+        now = int(time.time())
+        with self._lock:
+            out = {}
+            for name, window in self._events.items():
+                total = sum(n for sec, n in window if sec > now - RATE_WINDOW)
+                span = min(RATE_WINDOW, max(now - int(self.started), 1))
+                out[name] = total / span
+            return out
+
+    def snapshot(self):
+        """Plain-dict view of everything recorded so far."""
+        rates = self.rates()
+        with self._lock:
+            spans = []
+            for (name, source), hist in sorted(self.histograms.items(), key=lambda kv: (kv[0][0], str(kv[0][1]))):
+                row = {'span': name, 'source': source, 'errors': self.errors.get((name, source), 0)}
+                row.update(hist.summary())
+                spans.append(row)
+            return {
+                'since': self.started,
+                'spans': spans,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'rates_per_sec': rates,
+            }
+
+
+# Process-wide registry
+metrics = Metrics()
+span = metrics.span
+timed = metrics.timed
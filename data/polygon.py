@@ -0,0 +1,164 @@
+# polygon.py
+# Polygon REST client: pooled session, 429 backoff, prefetching pagination, typed chain snapshots
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data.metrics import metrics, span
+from data.singleflight import flight, freeze
+
+BASE_URL = "https://api.polygon.io"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Column -> (path into a snapshot result, dtype) for parse_snapshot
+SNAPSHOT_FIELDS = {
+    'symbol': (('details', 'ticker'), 'string'),
+    'underlying': (('underlying_asset', 'ticker'), 'category'),
+    'type': (('details', 'contract_type'), 'category'),
+    'exercise_style': (('details', 'exercise_style'), 'category'),
+    'expiry': (('details', 'expiration_date'), 'datetime64[ns]'),
+    'strike': (('details', 'strike_price'), 'float64'),
+    'shares_per_contract': (('details', 'shares_per_contract'), 'float64'),
+    'bid': (('last_quote', 'bid'), 'float64'),
+    'ask': (('last_quote', 'ask'), 'float64'),
+    'last': (('last_trade', 'price'), 'float64'),
+    'day_open': (('day', 'open'), 'float64'),
+    'day_high': (('day', 'high'), 'float64'),
+    'day_low': (('day', 'low'), 'float64'),
+    'day_close': (('day', 'close'), 'float64'),
+    'day_vwap': (('day', 'vwap'), 'float64'),
+    'volume': (('day', 'volume'), 'float64'),
+    'open_interest': (('open_interest',), 'float64'),
+    'iv': (('implied_volatility',), 'float64'),
+    'delta': (('greeks', 'delta'), 'float64'),
+    'gamma': (('greeks', 'gamma'), 'float64'),
+    'theta': (('greeks', 'theta'), 'float64'),
+    'vega': (('greeks', 'vega'), 'float64'),
+    'break_even': (('break_even_price',), 'float64'),
+    'underlying_price': (('underlying_asset', 'price'), 'float64'),
+    'updated': (('day', 'last_updated'), 'epoch_ns'),
+}
+
+
+def _dig(obj, path):
+    for key in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def occ_symbols(underlying, expiry, strike, opt_type):
+    """
+    Polygon option tickers (O:{root}{YYMMDD}{C/P}{strike*1000:08d}) for aligned
+    Series of underlyings, expiries, strikes and types.
+    """
+    root = pd.Series(underlying).astype(str).str.upper().reset_index(drop=True)
+    yymmdd = pd.to_datetime(pd.Series(expiry)).dt.strftime('%y%m%d').reset_index(drop=True)
+    cp = np.where(pd.Series(opt_type).astype(str).str.lower().str.startswith('p').to_numpy(), 'P', 'C')
+    strike1k = np.round(pd.to_numeric(pd.Series(strike), errors='coerce').to_numpy(dtype=float) * 1000)
+    strike_txt = pd.Series(strike1k).map(lambda k: f"{int(k):08d}" if np.isfinite(k) else '')
+    return ('O:' + root + yymmdd + pd.Series(cp) + strike_txt).to_numpy()
+
+
+def parse_snapshot(results):
+    """
+    Typed columnar frame from a list of /v3/snapshot/options results
+    (the shape of polygon_nvda_snapshot.json['results']). One row per contract.
+    """
+    cols = {}
+    for name, (path, dtype) in SNAPSHOT_FIELDS.items():
+        values = [_dig(r, path) for r in results]
+        if dtype == 'float64':
+            cols[name] = np.array([np.nan if v is None else v for v in values], dtype='float64')
+        elif dtype == 'epoch_ns':
+            cols[name] = pd.to_datetime(pd.Series(values, dtype='float64'), unit='ns')
+        elif dtype == 'datetime64[ns]':
+            cols[name] = pd.to_datetime(pd.Series(values, dtype='object'), errors='coerce')
+        else:
+            cols[name] = pd.Series(values, dtype=dtype)
+    return pd.DataFrame(cols)
+
+
+class PolygonClient:
+    """
+    Thin Polygon REST client sharing one pooled keep-alive session.
+
+    429 and 5xx responses are retried with exponential backoff (honouring
+    Retry-After). Paginated endpoints are walked with one page of prefetch:
+    the request for `next_url` goes out before the current page is handed
+    to the caller, so parsing overlaps the next round-trip.
+    """
+
+    def __init__(self, api_key, pool_size=10, timeout=10, max_retries=5, backoff=1.0):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Created on first request, so building a client does not import requests
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def get(self, url, params=None):
+        """
+        GET a Polygon URL (absolute or path) and return the decoded JSON.
+        Identical concurrent requests share one call and one parsed result.
+        """
+        if url.startswith('/'):
+            url = BASE_URL + url
+        params = dict(params or {}, apiKey=self.api_key)
+        return flight.do(('polygon', url, freeze(params)), self._get, url, params)
+
+    def _get(self, url, params):
+        for attempt in range(self.max_retries + 1):
+            with span('http.get', 'polygon'):
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            metrics.add_bytes('polygon', len(response.content))
+            if response.status_code == 429:
+                metrics.count('polygon.429')
+            if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                break
+            retry_after = response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+            print(f"[POLYGON] {response.status_code} on {url}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_pages(self, url, params=None):
+        """Yield the decoded JSON of every page, following next_url with prefetch."""
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='polygon-prefetch') as pool:
+            future = pool.submit(self.get, url, params)
+            while future is not None:
+                page = future.result()
+                next_url = page.get('next_url')
+                # next_url already carries the cursor and original filters
+                future = pool.submit(self.get, next_url) if next_url else None
+                yield page
+
+    def chain_snapshot(self, ticker, limit=250, **filters):
+        """
+        Whole option chain snapshot for an underlying as a typed frame (see parse_snapshot).
+        filters are passed through, e.g. expiration_date_gte='2025-10-01', contract_type='call'.
+        """
+        params = {'limit': limit}
+        params.update({k.replace('_gte', '.gte').replace('_lte', '.lte'): v for k, v in filters.items()})
+        results = []
+        for page in self.iter_pages(f"/v3/snapshot/options/{ticker.upper()}", params):
+            results.extend(page.get('results') or [])
+        return parse_snapshot(results)
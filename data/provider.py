@@ -1,9 +1,21 @@
 # provider.py
 # DataProvider interface and OptionAProvider (manual/CSV) for now
+import numpy as np
 import pandas as pd
 import os
+import threading
 from dotenv import load_dotenv
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
+from logic.iv import chain_mid, implied_vol
+from logic.greeks import bs_greeks
+from data.bars import BarStore
+from data.chains import chain_loader
+from data.polygon import PolygonClient, occ_symbols
+from data.schema import from_alphavantage, merge_chains, strike_price
+from data.singleflight import flight, freeze
+from data.store import get_cache
+from data import yahoo
+from data.metrics import metrics, span, timed
 
 class DataProvider:
     def get_prices(self, ticker):
@@ -15,7 +27,68 @@ class DataProvider:
     def get_sentiment(self):
         raise NotImplementedError
 
-import requests
+def _http_get(source, url, params=None, timeout=10):
+    # requests.get with a latency span and byte count per upstream source
+    import requests
+    with span('http.get', source):
+        response = requests.get(url, params=params, timeout=timeout)
+    metrics.add_bytes(source, len(response.content))
+    return response
+
+def _http_json(source, url, params=None, timeout=10):
+    # Decoded JSON body; identical concurrent requests share one call and one parsed result
+    return flight.do((source, url, freeze(params)), lambda: _http_get(source, url, params, timeout).json())
+
+AV_URL = 'https://www.alphavantage.co/query'
+
+def yf_quote_from_history(hist):
+    # Price, volume, average volume and % change from a short daily history frame
+    if hist is None or hist.empty:
+        return None
+    last = hist.iloc[-1]
+    prev = hist.iloc[-2] if len(hist) > 1 else last
+    chg = round((last['Close'] - prev['Close']) / prev['Close'] * 100, 2) if prev['Close'] else 0
+    return {'price': last['Close'], 'volume': last['Volume'], 'avgvol': hist['Volume'].mean(), 'chg': chg}
+
+def av_quote_from_daily(data):
+    # Latest close and volume from a TIME_SERIES_DAILY_ADJUSTED payload
+    ts = data.get('Time Series (Daily)', {})
+    if not ts:
+        return None
+    latest = ts[max(ts)]
+    volume = int(latest['6. volume'])
+    return {'price': float(latest['4. close']), 'volume': volume, 'avgvol': volume, 'chg': 0}
+
+def price_row(ticker, quote):
+    if quote is None:
+        return {'Ticker': ticker, 'Price': None, 'ChgPct': None, 'Volume': None, 'AvgVol': None}
+    return {
+        'Ticker': ticker,
+        'Price': quote['price'],
+        'ChgPct': quote['chg'],
+        'Volume': quote['volume'],
+        'AvgVol': quote['avgvol'],
+        'Strike': None,
+        'DTE': 21,
+        'IV': 48,
+        'KeySR': '',
+        'Expiry': '',
+        'BidAsk': '',
+        'OI': '',
+        'Breakeven': '',
+        'POP': '',
+        'Reason': ''
+    }
+
+def resolve_iv(chain, rate=0.05):
+    """Copy of a schema chain with IV re-solved from mid prices in one batch; the quoted IV stays where the solver can't."""
+    chain = chain.copy()
+    if chain.empty:
+        return chain
+    solved = implied_vol(chain_mid(chain, last_col='last').to_numpy(), chain['underlying_price'].to_numpy(dtype=float),
+                         strike_price(chain), rate, chain['dte'].to_numpy(dtype=float), (chain['type'] == 'call').to_numpy())
+    chain['iv'] = np.where(np.isfinite(solved), solved, chain['iv']).astype('float32')
+    return chain
 
 class OptionAProvider(DataProvider):
 
@@ -28,7 +101,7 @@ class OptionAProvider(DataProvider):
         url = "https://api.polygon.io/v3/reference/options/contracts"
         params = {"underlying_ticker": "AAPL", "limit": 1, "apiKey": self.polygon_key}
         try:
-            response = requests.get(url, params=params, timeout=5)
+            response = _http_get('polygon', url, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 if 'results' in data and len(data['results']) > 0:
@@ -40,264 +113,191 @@ class OptionAProvider(DataProvider):
         except Exception as e:
             return False, f"Polygon API request failed: {e}"
 
+    @timed('provider.get_greeks')
     def get_greeks(self, ticker, expiry=None, strike=None, opt_type='call'):
         """
-        Fetch option greeks from Polygon API for a given ticker, expiry, strike, and type.
+        Option greeks for a single contract; see get_greeks_bulk.
         """
-        if not self.polygon_key or not expiry or not strike:
+        if not expiry or not strike:
             return {'delta': None, 'gamma': None, 'theta': None, 'vega': None}
-        # Polygon uses OCC option symbol format
-        # Example: AAPL240920C00190000 (AAPL, 2024-09-20, Call, 190.00)
-        # Format: {root}{YYMMDD}{C/P}{strike*1000:08d}
+        contract = pd.DataFrame([{'ticker': ticker, 'expiry': expiry, 'strike': strike, 'type': opt_type}])
+        row = self.get_greeks_bulk(contract).iloc[0]
+        return {k: (None if pd.isna(row[k]) else float(row[k])) for k in ('delta', 'gamma', 'theta', 'vega')}
+
+    @timed('provider.get_chain_snapshot')
+    def get_chain_snapshot(self, ticker):
+        """
+        Polygon chain snapshot for an underlying (one paginated sweep), cached on disk for the snapshot TTL.
+        """
+        if not self.polygon_key:
+            return pd.DataFrame()
         try:
-            root = ticker.upper()
-            y, m, d = expiry.split('-')
-            y = y[-2:]
-            m = m.zfill(2)
-            d = d.zfill(2)
-            cp = 'C' if opt_type.lower().startswith('c') else 'P'
-            strike_int = int(float(strike) * 1000)
-            occ = f"{root}{y}{m}{d}{cp}{strike_int:08d}"
-            url = f"https://api.polygon.io/v3/reference/options/contracts/{occ}"
-            params = {"apiKey": self.polygon_key}
-            response = requests.get(url, params=params)
-            data = response.json()
-            greeks = data.get('results', {}).get('greeks', {})
-            return {
-                'delta': greeks.get('delta'),
-                'gamma': greeks.get('gamma'),
-                'theta': greeks.get('theta'),
-                'vega': greeks.get('vega')
-            }
+            return get_cache().get_or_fetch('polygon', ticker, 'snapshot', lambda: self.polygon.chain_snapshot(ticker))
         except Exception as e:
-            print(f"[POLYGON GREEKS ERROR] {ticker} {expiry} {strike} {opt_type}: {e}")
-            return {'delta': None, 'gamma': None, 'theta': None, 'vega': None}
+            print(f"[POLYGON SNAPSHOT ERROR] {ticker}: {e}")
+            return pd.DataFrame()
+
+    @timed('provider.get_greeks_bulk')
+    def get_greeks_bulk(self, contracts, rate=0.05, max_workers=8):
+        """
+        Greeks for many contracts at once.
+
+        contracts: DataFrame (or list of dicts) with ticker, expiry, strike and
+        optionally type ('call'/'put'), iv (decimal) and spot. Contracts are
+        grouped by underlying and served from one cached chain snapshot per
+        underlying; contracts the vendor has no Greeks for are priced locally
+        in one vectorized Black-Scholes pass from the snapshot IV (or the given
+        iv) and spot. Returns delta/gamma/theta/vega/iv/greeks_source aligned
+        to the input rows.
+        """
+        contracts = pd.DataFrame(contracts)
+        out = pd.DataFrame(index=contracts.index, columns=['delta', 'gamma', 'theta', 'vega', 'iv'], dtype='float64')
+        out['greeks_source'] = None
+        if contracts.empty:
+            return out
+        opt_type = contracts['type'] if 'type' in contracts.columns else pd.Series('call', index=contracts.index)
+        symbols = pd.Series(occ_symbols(contracts['ticker'], contracts['expiry'], contracts['strike'], opt_type),
+                            index=contracts.index)
+
+        # One snapshot per underlying, fetched concurrently over the pooled session
+        tickers = contracts['ticker'].astype(str).str.upper().unique()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            snapshots = dict(zip(tickers, pool.map(self.get_chain_snapshot, tickers)))
+        snaps = [df for df in snapshots.values() if len(df)]
+        spot = pd.to_numeric(contracts['spot'], errors='coerce') if 'spot' in contracts.columns else pd.Series(float('nan'), index=contracts.index)
+        if snaps:
+            snap = pd.concat(snaps, ignore_index=True).drop_duplicates('symbol').set_index('symbol')
+            found = snap.reindex(symbols.to_numpy())
+            found.index = contracts.index
+            for col in ('delta', 'gamma', 'theta', 'vega', 'iv'):
+                out[col] = found[col].to_numpy(dtype=float)
+            out.loc[out['delta'].notna(), 'greeks_source'] = 'polygon'
+        # Spot per underlying from any row of its snapshot, so unlisted contracts still get one
+        underlying = contracts['ticker'].astype(str).str.upper()
+        snap_spot = {t: pd.to_numeric(df['underlying_price'], errors='coerce').dropna()
+                     for t, df in snapshots.items() if 'underlying_price' in df.columns}
+        spot = spot.fillna(underlying.map({t: s.iloc[0] for t, s in snap_spot.items() if len(s)}))
+        if 'iv' in contracts.columns:
+            out['iv'] = out['iv'].fillna(pd.to_numeric(contracts['iv'], errors='coerce'))
+
+        # Local fallback for whatever the vendor did not cover
+        missing = out['delta'].isna()
+        if missing.any():
+            for t in underlying[missing & spot.isna()].unique():
+                bars = self.bars.get(t, refresh=True)
+                if len(bars):
+                    spot[(underlying == t) & spot.isna()] = bars['close'].iloc[-1]
+            sub = contracts[missing]
+            dte = (pd.to_datetime(sub['expiry']) - pd.Timestamp.now().normalize()).dt.days
+            local = bs_greeks(spot[missing].to_numpy(dtype=float), pd.to_numeric(sub['strike'], errors='coerce').to_numpy(dtype=float),
+                              rate, dte.to_numpy(dtype=float), out.loc[missing, 'iv'].to_numpy(dtype=float),
+                              ~opt_type[missing].astype(str).str.lower().str.startswith('p').to_numpy())
+            local.index = sub.index
+            for col in ('delta', 'gamma', 'theta', 'vega'):
+                out.loc[missing, col] = local[col]
+            out.loc[missing & out['delta'].notna(), 'greeks_source'] = 'local'
+        return out
+
     def __init__(self):
         # Only Polygon key is used
         self.polygon_key = "uz85txFQaRLRhVMNEwUfZr4wzIVcXgf0"
         self.alpha_vantage_key = os.environ.get("ALPHA_VANTAGE")
+        self.bars = BarStore(self.fetch_daily_bars)
+        self.polygon = PolygonClient(self.polygon_key)
 
+    @timed('provider.get_prices')
     def get_prices(self, ticker):
-        prices = {}
         # yfinance
-        yf_price = None
-        yf_vol = yf_avgvol = yf_chg = None
+        yf_quote = None
         try:
-            yf_ticker = yf.Ticker(ticker)
-            hist = yf_ticker.history(period="2d")
-            if not hist.empty:
-                last = hist.iloc[-1]
-                prev = hist.iloc[-2] if len(hist) > 1 else last
-                yf_price = last['Close']
-                yf_vol = last['Volume']
-                yf_avgvol = hist['Volume'].mean()
-                yf_chg = round((last['Close'] - prev['Close']) / prev['Close'] * 100, 2) if prev['Close'] else 0
-                prices['yfinance'] = yf_price
+            yf_quote = yf_quote_from_history(yahoo.history(ticker, period="2d"))
         except Exception:
-            yf_price = None
+            yf_quote = None
         # Alpha Vantage
-        av_price = None
-        av_vol = None
+        av_quote = None
         if self.alpha_vantage_key:
-            av_url = f'https://www.alphavantage.co/query'
-            av_params = {
-                'function': 'TIME_SERIES_DAILY_ADJUSTED',
-                'symbol': ticker,
-                'apikey': self.alpha_vantage_key
-            }
             try:
-                av_resp = requests.get(av_url, params=av_params, timeout=10)
-                av_data = av_resp.json()
-                ts = av_data.get('Time Series (Daily)', {})
-                if ts:
-                    latest = sorted(ts.keys())[-1]
-                    av_price = float(ts[latest]['4. close'])
-                    av_vol = int(ts[latest]['6. volume'])
-                    prices['alphavantage'] = av_price
+                av_quote = av_quote_from_daily(_http_json('alphavantage', AV_URL, params=self.av_params('TIME_SERIES_DAILY_ADJUSTED', ticker), timeout=10))
             except Exception:
-                av_price = None
-        # Debug print
-        print(f"[DEBUG] {ticker} prices: yfinance={yf_price}, alphavantage={av_price}")
-        # Selection logic: prefer yfinance, then alphavantage, else median if all present
-        selected_price = None
-        if yf_price is not None:
-            selected_price = yf_price
-            chg = yf_chg
-            vol = yf_vol
-            avgvol = yf_avgvol
-        elif av_price is not None:
-            selected_price = av_price
-            chg = 0
-            vol = av_vol
-            avgvol = av_vol
-        else:
-            # fallback: median of all available
-            valid_prices = [p for p in prices.values() if p is not None]
-            if valid_prices:
-                valid_prices.sort()
-                mid = len(valid_prices) // 2
-                if len(valid_prices) % 2 == 1:
-                    selected_price = valid_prices[mid]
-                else:
-                    selected_price = (valid_prices[mid-1] + valid_prices[mid]) / 2
-                chg = 0
-                vol = None
-                avgvol = None
-            else:
-                return {'Ticker': ticker, 'Price': None, 'ChgPct': None, 'Volume': None, 'AvgVol': None}
-        return {
-            'Ticker': ticker,
-            'Price': selected_price,
-            'ChgPct': chg,
-            'Volume': vol,
-            'AvgVol': avgvol,
-            'Strike': None,
-            'DTE': 21,
-            'IV': 48,
-            'KeySR': '',
-            'Expiry': '',
-            'BidAsk': '',
-            'OI': '',
-            'Breakeven': '',
-            'POP': '',
-            'Reason': ''
-        }
+                av_quote = None
+        metrics.count('prices.yfinance' if yf_quote is not None else 'prices.yfinance_missing')
+        metrics.count('prices.alphavantage' if av_quote is not None else 'prices.alphavantage_missing')
+        # Selection logic: prefer yfinance, then alphavantage
+        return price_row(ticker, yf_quote or av_quote)
 
-    def get_historicals(self, ticker):
-        # Try Polygon API first if key is present
-        if self.polygon_key:
-            url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/range/1/day/2023-01-01/2025-12-31"
-            params = {"apiKey": self.polygon_key, "limit": 220}
+    def av_params(self, function, ticker):
+        return {'function': function, 'symbol': ticker, 'apikey': self.alpha_vantage_key}
+
+    @timed('provider.fetch_daily_bars')
+    def fetch_daily_bars(self, ticker, start=None):
+        """
+        Daily OHLCV bars from `start` (YYYY-MM-DD) to today, indexed by date.
+        Polygon first if a key is set, else yfinance. Used by the BarStore to fetch only the missing tail.
+        """
+        end = pd.Timestamp.now().strftime('%Y-%m-%d')
+        if self.polygon_key and start:
+            url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/range/1/day/{start}/{end}"
+            params = {"apiKey": self.polygon_key, "adjusted": "true", "sort": "asc", "limit": 50000}
             try:
-                response = requests.get(url, params=params)
-                data = response.json()
-                closes = [bar['c'] for bar in data.get('results', [])][-220:]
-                if closes:
-                    return pd.Series(closes)
+                results = _http_json('polygon', url, params=params, timeout=10).get('results', [])
+                if results:
+                    df = pd.DataFrame(results)
+                    df.index = pd.to_datetime(df['t'], unit='ms').dt.normalize().rename('date')
+                    return df.rename(columns={'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume'})
             except Exception:
                 pass
         # Fallback to yfinance
+        hist = yahoo.history(ticker, start=start) if start else yahoo.history(ticker, period="2y")
+        if hist.empty:
+            return pd.DataFrame()
+        # The history frame is shared with other callers; relabel a copy
+        index = pd.DatetimeIndex(hist.index).tz_localize(None).normalize().rename('date')
+        return hist.set_axis(index).rename(columns=str.lower)
+
+    @timed('provider.get_historicals')
+    def get_historicals(self, ticker):
+        # Served from the local bar store; only bars newer than the last stored one hit the network
         try:
-            yf_ticker = yf.Ticker(ticker)
-            hist = yf_ticker.history(period="2y")
-            closes = hist['Close'].tolist()[-400:]
+            closes = self.bars.get(ticker)['close'].tolist()[-400:]
             return pd.Series(closes)
         except Exception:
             return pd.Series([])
 
+    @timed('provider.get_option_chain')
     def get_option_chain(self, ticker):
-        # Try Alpha Vantage
-        av_url = f'https://www.alphavantage.co/query'
-        av_params = {
-            'function': 'OPTION_CHAIN',
-            'symbol': ticker,
-            'apikey': self.alpha_vantage_key
-        }
-        av_options = None
-        required_cols = ['strike', 'type', 'impliedVolatility', 'expiry']
+        """
+        Alpha Vantage and Yahoo chains in the data.schema layout, merged on OCC
+        symbol into one row per contract with every field kept (quotes, OI,
+        volume, IV averaged across sources, Greeks). Empty chain if both fail.
+        """
+        chains = []
+        # Alpha Vantage
         try:
-            av_resp = requests.get(av_url, params=av_params, timeout=10)
-            av_data = av_resp.json()
-            if 'optionChain' in av_data:
-                calls = pd.DataFrame(av_data['optionChain'].get('calls', []))
-                puts = pd.DataFrame(av_data['optionChain'].get('puts', []))
-                if not calls.empty:
-                    calls['type'] = 'call'
-                if not puts.empty:
-                    puts['type'] = 'put'
-                av_options = pd.concat([calls, puts], ignore_index=True)
-        except Exception:
-            av_options = None
-        # Robustify av_options after try/except, before any use
-        if av_options is not None:
-            if not isinstance(av_options, pd.DataFrame) or av_options.empty:
-                av_options = pd.DataFrame(columns=required_cols)
-            if len(av_options.columns) == 0:
-                av_options = pd.DataFrame(columns=required_cols)
-            if 'contractType' in av_options.columns:
-                av_options = av_options.rename(columns={'contractType': 'type'})
-            if 'type' not in av_options.columns:
-                if 'contractSymbol' in av_options.columns:
-                    def infer_type(symbol):
-                        if isinstance(symbol, str) and len(symbol) > 0:
-                            if symbol[-9] == 'C':
-                                return 'call'
-                            elif symbol[-9] == 'P':
-                                return 'put'
-                        return None
-                    av_options['type'] = av_options['contractSymbol'].apply(infer_type)
-                else:
-                    av_options['type'] = None
-            for col in required_cols:
-                if col not in av_options.columns:
-                    av_options[col] = None
+            chains.append(from_alphavantage(_http_json('alphavantage', AV_URL, params=self.av_params('OPTION_CHAIN', ticker), timeout=10), ticker))
+        except Exception as e:
+            print(f"[AV CHAIN ERROR] {ticker}: {e}")
 
-        # Try yfinance
-        yf_options = None
+        # Yahoo: every expiry in the loader's DTE window. Its IV is re-solved from
+        # mid prices in one batch; Yahoo's own figure stays where the solver can't
         try:
-            yf_ticker = yf.Ticker(ticker)
-            expiries = yf_ticker.options
-            if expiries:
-                expiry = expiries[0]
-                opt_chain = yf_ticker.option_chain(expiry)
-                calls = opt_chain.calls
-                puts = opt_chain.puts
-                calls['expiry'] = expiry
-                puts['expiry'] = expiry
-                yf_options = pd.concat([calls, puts], ignore_index=True)
-        except Exception:
-            yf_options = None
-        # Robustify yf_options after try/except, before any use
-        required_cols = ['strike', 'type', 'impliedVolatility', 'expiry']
-        if yf_options is not None:
-            if not isinstance(yf_options, pd.DataFrame) or yf_options.empty:
-                yf_options = pd.DataFrame(columns=required_cols)
-            if len(yf_options.columns) == 0:
-                yf_options = pd.DataFrame(columns=required_cols)
-            if 'contractType' in yf_options.columns:
-                yf_options = yf_options.rename(columns={'contractType': 'type'})
-            if 'type' not in yf_options.columns:
-                if 'contractSymbol' in yf_options.columns:
-                    def infer_type(symbol):
-                        if isinstance(symbol, str) and len(symbol) > 0:
-                            if symbol[-9] == 'C':
-                                return 'call'
-                            elif symbol[-9] == 'P':
-                                return 'put'
-                        return None
-                    yf_options['type'] = yf_options['contractSymbol'].apply(infer_type)
-                else:
-                    yf_options['type'] = None
-            for col in required_cols:
-                if col not in yf_options.columns:
-                    yf_options[col] = None
+            chains.append(resolve_iv(chain_loader.load(ticker)))
+        except Exception as e:
+            print(f"[YF CHAIN ERROR] {ticker}: {e}")
 
-        # No need to robustify yf_options again here; already done above
-        # Cross-check and merge
-        if av_options is not None and not av_options.empty:
-            if yf_options is not None:
-                # Merge on strike and type, prefer IV from AV if both present, else average
-                merged = pd.merge(av_options, yf_options, on=['strike', 'type'], suffixes=('_av', '_yf'), how='outer')
-                def pick_iv(row):
-                    ivs = []
-                    if not pd.isna(row.get('impliedVolatility_av')):
-                        ivs.append(row['impliedVolatility_av'])
-                    if not pd.isna(row.get('impliedVolatility_yf')):
-                        ivs.append(row['impliedVolatility_yf']*100 if row['impliedVolatility_yf'] < 2 else row['impliedVolatility_yf'])
-                    if ivs:
-                        return sum(ivs)/len(ivs)
-                    return None
-                merged['impliedVolatility'] = merged.apply(pick_iv, axis=1)
-                merged['expiry'] = merged['expiry_av'].combine_first(merged['expiry_yf'])
-                # Keep only relevant columns
-                return merged[['strike', 'type', 'impliedVolatility', 'expiry']].dropna(subset=['strike'])
-            else:
-                return av_options[['strike', 'type', 'impliedVolatility', 'expiry']] if 'expiry' in av_options.columns else av_options[['strike', 'type', 'impliedVolatility']]
-        elif yf_options is not None:
-            return yf_options[required_cols]
-        else:
-            return []
+        return merge_chains(chains)
 
     def get_sentiment(self):
         # FRED sentiment removed; Polygon only
         return {"VIX": None}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_provider():
+    """Process-wide OptionAProvider, so callers share its bar store, Polygon session and in-flight requests."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = OptionAProvider()
+        return _default
@@ -0,0 +1,200 @@
+# schema.py
+# One typed option-chain layout shared by every source, with per-source adapters and an OCC-keyed merge
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+from data.polygon import occ_symbols
+
+OPTION_TYPE = CategoricalDtype(['call', 'put'])
+
+# Column -> dtype. Strikes are integer thousandths of a dollar (the OCC encoding),
+# so they compare and sort exactly; use strike_price() for dollars.
+# IV is a decimal fraction; Greeks use bs_greeks units (theta per day, vega per vol point).
+CHAIN_SCHEMA = {
+    'contract': 'string',           # OCC / Polygon symbol, O:AAPL250117C00150000
+    'underlying': 'category',
+    'type': OPTION_TYPE,
+    'expiry': 'datetime64[ns]',
+    'dte': 'int16',
+    'strike': 'int32',
+    'bid': 'float32', 'ask': 'float32', 'last': 'float32',
+    'volume': 'float32', 'oi': 'float32', 'iv': 'float32',
+    'delta': 'float32', 'gamma': 'float32', 'theta': 'float32', 'vega': 'float32',
+    'underlying_price': 'float32',
+    'source': 'category',           # which source(s) the row came from
+}
+CHAIN_COLUMNS = list(CHAIN_SCHEMA)
+SOURCE_PRIORITY = ['polygon', 'yfinance', 'alphavantage']
+
+# Alpha Vantage has shipped both camelCase and snake_case option payloads
+_AV_ALIASES = {
+    'contractID': 'contract', 'contractSymbol': 'contract', 'expiration': 'expiry',
+    'lastPrice': 'last', 'open_interest': 'oi', 'openInterest': 'oi',
+    'implied_volatility': 'iv', 'impliedVolatility': 'iv', 'contractType': 'type',
+}
+
+
+def empty_chain():
+    return typed_chain(pd.DataFrame(columns=CHAIN_COLUMNS))
+
+
+def strike_price(chain):
+    """Strikes in dollars (float64)."""
+    return chain['strike'].to_numpy(dtype='float64') / 1000
+
+
+def typed_chain(columns, today=None):
+    """
+    Cast a dict/DataFrame of chain columns to CHAIN_SCHEMA in one pass.
+    `strike` may be given in dollars as 'strike_price'; `dte` is derived from
+    expiry when missing; absent columns are NaN.
+    """
+    src = columns if isinstance(columns, pd.DataFrame) else pd.DataFrame(columns)
+    n = len(src)
+    today = pd.Timestamp.now().normalize() if today is None else pd.Timestamp(today).normalize()
+
+    def col(name):
+        return src[name] if name in src.columns else pd.Series(np.nan, index=src.index)
+
+    def cast(series, dtype):
+        # Columns already in the schema dtype pass through without a copy
+        return series if series.dtype == dtype else series.astype(dtype)
+
+    expiry = col('expiry')
+    if expiry.dtype != 'datetime64[ns]':
+        expiry = pd.to_datetime(expiry).astype('datetime64[ns]')
+    if 'strike' in src.columns:
+        strike = pd.to_numeric(src['strike'], errors='coerce')
+    else:
+        strike = np.round(pd.to_numeric(col('strike_price'), errors='coerce') * 1000)
+    dte = col('dte') if 'dte' in src.columns else (expiry - today).dt.days
+    opt_type = col('type')
+    if opt_type.dtype != OPTION_TYPE:
+        opt_type = opt_type.astype('string').str.lower().astype(OPTION_TYPE)
+    out = {
+        'contract': cast(col('contract'), 'string'),
+        'underlying': cast(col('underlying'), 'category'),
+        'type': opt_type,
+        'expiry': expiry,
+        'dte': pd.to_numeric(dte, errors='coerce').fillna(0).astype('int16'),
+        'strike': strike.fillna(0).astype('int32'),
+    }
+    for name, dtype in CHAIN_SCHEMA.items():
+        if dtype == 'float32':
+            value = col(name)
+            out[name] = value if value.dtype == 'float32' else pd.to_numeric(value, errors='coerce').astype('float32')
+    out['source'] = cast(col('source'), 'category')
+    return pd.DataFrame(out, index=pd.RangeIndex(n))[CHAIN_COLUMNS]
+
+
+def _occ(underlying, expiry, strike_dollars, opt_type, n):
+    # occ_symbols wants aligned sequences
+    return occ_symbols([underlying] * n if isinstance(underlying, str) else underlying,
+                       expiry, strike_dollars, opt_type)
+
+
+def yfinance_columns(frame, underlying, expiry, side, spot=None):
+    """
+    Raw chain columns (numpy arrays and scalars) for one side of a yfinance
+    Ticker.option_chain(expiry). Stack several with stack_columns() and cast
+    once with typed_chain(), instead of typing every expiry separately.
+    """
+    return {
+        'contract': 'O:' + frame['contractSymbol'].to_numpy(dtype=object), 'underlying': underlying,
+        'type': side, 'expiry': expiry, 'strike_price': frame['strike'].to_numpy(),
+        'bid': frame['bid'].to_numpy(), 'ask': frame['ask'].to_numpy(), 'last': frame['lastPrice'].to_numpy(),
+        'volume': frame['volume'].to_numpy(), 'oi': frame['openInterest'].to_numpy(),
+        'iv': frame['impliedVolatility'].to_numpy(), 'underlying_price': spot, 'source': 'yfinance',
+    }
+
+
+def stack_columns(parts):
+    """Concatenate raw column dicts (scalars broadcast to each part's length) into one dict of arrays."""
+    parts = [p for p in parts if len(p['contract'])]
+    if not parts:
+        return {}
+    out = {}
+    for name in parts[0]:
+        out[name] = np.concatenate([np.broadcast_to(np.asarray(p[name], dtype=object if isinstance(p[name], str) else None),
+                                                    len(p['contract'])) for p in parts])
+    return out
+
+
+def from_yfinance(frame, underlying, expiry, side, spot=None):
+    """One side of yfinance Ticker.option_chain(expiry) (calls or puts)."""
+    if frame is None or frame.empty:
+        return empty_chain()
+    return typed_chain(yfinance_columns(frame, underlying, expiry, side, spot))
+
+
+def from_alphavantage(payload, underlying):
+    """Alpha Vantage option chain JSON ({'optionChain': {'calls': [...], 'puts': [...]}} or {'data': [...]})."""
+    if 'optionChain' in payload:
+        sides = [(side, payload['optionChain'].get(key) or []) for side, key in (('call', 'calls'), ('put', 'puts'))]
+        frames = [pd.DataFrame(rows).assign(type=side) for side, rows in sides if rows]
+    else:
+        frames = [pd.DataFrame(payload.get('data') or [])]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return empty_chain()
+    raw = pd.concat(frames, ignore_index=True).rename(columns=_AV_ALIASES)
+    if 'strike' not in raw.columns or 'expiry' not in raw.columns:
+        return empty_chain()
+    strike = pd.to_numeric(raw['strike'], errors='coerce')
+    if 'type' not in raw.columns:
+        # OCC-style symbols carry the type 9 characters from the end
+        raw['type'] = raw['contract'].astype(str).str[-9].map({'C': 'call', 'P': 'put'})
+    # Alpha Vantage quotes IV in percent; anything below 2 is already a fraction
+    iv = pd.to_numeric(raw['iv'], errors='coerce') if 'iv' in raw.columns else pd.Series(np.nan, index=raw.index)
+    raw['iv'] = iv.where(iv < 2, iv / 100)
+    raw['contract'] = _occ(underlying, raw['expiry'], strike, raw['type'], len(raw))
+    raw['strike_price'] = strike
+    raw = raw.drop(columns=['strike'])
+    raw['underlying'] = underlying
+    raw['source'] = 'alphavantage'
+    return typed_chain(raw)
+
+
+def from_polygon(snapshot):
+    """A parse_snapshot() frame from data.polygon."""
+    if snapshot is None or snapshot.empty:
+        return empty_chain()
+    return typed_chain({
+        'contract': snapshot['symbol'], 'underlying': snapshot['underlying'].astype(str),
+        'type': snapshot['type'].astype(str), 'expiry': snapshot['expiry'],
+        'strike_price': snapshot['strike'], 'bid': snapshot['bid'], 'ask': snapshot['ask'],
+        'last': snapshot['last'], 'volume': snapshot['volume'], 'oi': snapshot['open_interest'],
+        'iv': snapshot['iv'], 'delta': snapshot['delta'], 'gamma': snapshot['gamma'],
+        'theta': snapshot['theta'], 'vega': snapshot['vega'],
+        'underlying_price': snapshot['underlying_price'], 'source': 'polygon',
+    })
+
+
+def merge_chains(chains, priority=SOURCE_PRIORITY):
+    """
+    Merge typed chains from several sources into one row per contract.
+
+    Each field takes the first non-missing value in source `priority` order,
+    except IV, which is averaged over the sources that have it. `source`
+    lists every contributing source ('polygon+yfinance'). Sorted by
+    (expiry, type, strike).
+    """
+    chains = [c for c in chains if c is not None and not c.empty]
+    if not chains:
+        return empty_chain()
+    both = pd.concat(chains, ignore_index=True)
+    if both['source'].nunique() <= 1 and both['contract'].is_unique:
+        # Disjoint pieces of one source (e.g. one per expiry): nothing to reconcile
+        return typed_chain(both).sort_values(['expiry', 'type', 'strike'], kind='stable', ignore_index=True)
+    rank = {s: i for i, s in enumerate(priority)}
+    both = both.iloc[np.argsort(both['source'].map(rank).fillna(len(rank)).to_numpy(), kind='stable')]
+    grouped = both.groupby('contract', sort=False, observed=True)
+    merged = grouped.first()
+    merged['iv'] = grouped['iv'].mean()
+    label = np.full(len(merged), '', dtype=object)
+    for name in sorted(both['source'].dropna().unique()):
+        has = merged.index.isin(both.loc[both['source'] == name, 'contract'])
+        label = np.where(has, np.where(label == '', name, label + '+' + name), label)
+    merged['source'] = label
+    merged = typed_chain(merged.reset_index())
+    return merged.sort_values(['expiry', 'type', 'strike'], kind='stable', ignore_index=True)
@@ -0,0 +1,64 @@
+# singleflight.py
+# Request coalescing: concurrent callers asking for the same key share one in-flight call
+import threading
+from data.metrics import metrics
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    do(key, fn) runs fn once per key at a time. Callers arriving while it is
+    running wait and get the same result (or the same exception) instead of
+    issuing a duplicate request. Nothing is kept after the call finishes;
+    caching is the job of the layers above (DiskCache, st.cache_data).
+    Keys are tuples such as (source, endpoint, params...).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            metrics.count('singleflight.shared')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        metrics.count('singleflight.calls')
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def freeze(params):
+    """Hashable, order-independent form of a params dict for use in keys."""
+    return tuple(sorted((params or {}).items()))
+
+
+# Process-wide instance shared by the provider, the disk cache and the chain loader
+flight = SingleFlight()
@@ -0,0 +1,251 @@
+# store.py
+# Process-independent on-disk market-data cache (Parquet files, TTL per kind, LRU size bound)
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+import pandas as pd
+from data.singleflight import flight
+
+CACHE_DIR = os.environ.get(
+    'OPTIONS_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'))
+
+# Seconds an entry stays fresh, per data kind
+TTL = {
+    'prices': 60,
+    'snapshot': 60,
+    'chain': 300,
+    'sentiment': 300,
+    'historicals': 6 * 3600,
+    # Refresher snapshots never expire; readers judge staleness from taken_at
+    'scan': None,
+    'scan_meta': None,
+    # Contract index: kept current by upserts, not by age
+    'contracts': None,
+}
+DEFAULT_TTL = 300
+MAX_BYTES = 512 * 1024 * 1024
+
+# Single-column frames written for a Series carry this column name
+_SERIES_COL = '__series__'
+
+# Top-level folders under the cache root owned by other stores (data.bars.BarStore):
+# never counted or evicted here
+FOREIGN_DIRS = {'bars'}
+
+
+def _json_default(obj):
+    # NumPy scalars (e.g. int64 volumes) round-trip as plain numbers
+    return obj.item() if hasattr(obj, 'item') else str(obj)
+
+
+def _safe(part):
+    return str(part).replace(os.sep, '_').replace(':', '_') or '_'
+
+
+class DiskCache:
+    """
+    Market-data cache shared by every process that points at the same directory.
+
+    Entries are keyed by (source, ticker, kind, as_of) and stored as
+    {root}/{kind}/{source}/{ticker}/{as_of}.parquet (.json for plain values).
+    Freshness comes from the file mtime and the TTL of its kind; recency of use
+    is kept in the file atime, which is bumped explicitly on every hit so LRU
+    eviction works on noatime mounts too. Writes are atomic (temp file +
+    rename), so concurrent readers never see partial files.
+
+    Kinds whose TTL is None (refresher snapshots, the contract index) are
+    state, not cache: like FOREIGN_DIRS they are never counted or evicted.
+    The cache size is measured once, then tracked as this process writes;
+    the tree is only walked again when the tracked size passes max_bytes
+    (which also picks up what other processes wrote meanwhile).
+    """
+
+    def __init__(self, root=CACHE_DIR, ttl=None, max_bytes=MAX_BYTES):
+        self.root = root
+        self.ttl = dict(TTL, **(ttl or {}))
+        self.max_bytes = max_bytes
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._bytes = None  # tracked size of the entries, None until first measured
+        self._kept = FOREIGN_DIRS | {_safe(kind) for kind, ttl in self.ttl.items() if ttl is None}
+
+    def _dir(self, source, ticker, kind):
+        return os.path.join(self.root, _safe(kind), _safe(source), _safe(ticker))
+
+    def _count(self, kind, event):
+        with self._lock:
+            self.counters[(kind, event)] += 1
+
+    def get(self, source, ticker, kind, as_of=None, max_age=None):
+        """
+        Fresh value for the key, or None. as_of defaults to today's date;
+        max_age (seconds) tightens the kind's TTL for this lookup.
+        """
+        as_of = as_of or pd.Timestamp.now().strftime('%Y-%m-%d')
+        base = os.path.join(self._dir(source, ticker, kind), _safe(as_of))
+        ttl = self.ttl.get(kind, DEFAULT_TTL)
+        if max_age is not None:
+            ttl = max_age if ttl is None else min(ttl, max_age)
+        for ext in ('.parquet', '.json'):
+            path = base + ext
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            now = time.time()
+            if ttl is not None and now - st.st_mtime > ttl:
+                self._count(kind, 'expired')
+                break
+            try:
+                value = self._read(path)
+                os.utime(path, (now, st.st_mtime))
+            except (OSError, ValueError):
+                # Evicted or replaced under us: treat as a miss
+                break
+            self._count(kind, 'hit')
+            return value
+        self._count(kind, 'miss')
+        return None
+
+    def put(self, source, ticker, kind, value, as_of=None):
+        as_of = as_of or pd.Timestamp.now().strftime('%Y-%m-%d')
+        folder = self._dir(source, ticker, kind)
+        os.makedirs(folder, exist_ok=True)
+        is_frame = isinstance(value, (pd.DataFrame, pd.Series))
+        path = os.path.join(folder, _safe(as_of) + ('.parquet' if is_frame else '.json'))
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                if isinstance(value, pd.Series):
+                    value.to_frame(_SERIES_COL).to_parquet(fh)
+                elif is_frame:
+                    value.to_parquet(fh)
+                else:
+                    fh.write(json.dumps(value, default=_json_default).encode())
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._count(kind, 'write')
+        if _safe(kind) not in self._kept and self._grow(os.stat(path).st_size - replaced) > self.max_bytes:
+            self.evict()
+        return value
+
+    def get_or_fetch(self, source, ticker, kind, fetch, as_of=None, max_age=None):
+        """Serve from disk, else call fetch() and store non-empty results."""
+        value = self.get(source, ticker, kind, as_of, max_age)
+        if value is not None:
+            return value
+        # Concurrent misses on one key share a single fetch
+        return flight.do(('disk', self.root, source, ticker, kind, as_of), self._fill, source, ticker, kind, fetch, as_of)
+
+    def _fill(self, source, ticker, kind, fetch, as_of):
+        value = fetch()
+        if value is None or (isinstance(value, (pd.DataFrame, pd.Series)) and value.empty):
+            return value
+        return self.put(source, ticker, kind, value, as_of)
+
+    def archive(self, source, ticker, kind, start=None, end=None):
+        """
+        {as_of: value} for every stored entry of a key between start and end
+        (as_of strings, inclusive), ignoring TTL: the last write of each day
+        is that day's snapshot, which backtests replay. Entries are still
+        subject to LRU eviction, so size max_bytes for the history you keep.
+        """
+        folder = self._dir(source, ticker, kind)
+        try:
+            names = sorted(os.listdir(folder))
+        except FileNotFoundError:
+            return {}
+        out = {}
+        for name in names:
+            as_of, ext = os.path.splitext(name)
+            if ext not in ('.parquet', '.json') or (start and as_of < start) or (end and as_of > end):
+                continue
+            try:
+                out[as_of] = self._read(os.path.join(folder, name))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def _read(self, path):
+        if path.endswith('.json'):
+            with open(path) as fh:
+                return json.load(fh)
+        df = pd.read_parquet(path)
+        if list(df.columns) == [_SERIES_COL]:
+            return df[_SERIES_COL].rename(None)
+        return df
+
+    def _grow(self, delta):
+        # Tracked size after a write; measured from disk the first time
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(st.st_size for _, st in self._entries())
+            else:
+                self._bytes += delta
+            return self._bytes
+
+    def _entries(self):
+        for folder, dirs, files in os.walk(self.root):
+            if folder == self.root:
+                dirs[:] = [d for d in dirs if d not in self._kept]
+            for name in files:
+                if name.endswith(('.parquet', '.json')):
+                    path = os.path.join(folder, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st
+
+    def evict(self):
+        """Drop least-recently-used files until the cache fits in max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[1].st_atime)
+        total = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= st.st_size
+            kind = os.path.relpath(path, self.root).split(os.sep)[0]
+            self._count(kind, 'evicted')
+        with self._lock:
+            self._bytes = total
+
+    def stats(self):
+        """Per-kind hit/miss/expired/write/evicted counts and hit ratio for this process."""
+        with self._lock:
+            counters = dict(self.counters)
+        out = {}
+        for (kind, event), n in counters.items():
+            out.setdefault(kind, {})[event] = n
+        for kind, c in out.items():
+            lookups = c.get('hit', 0) + c.get('miss', 0)
+            c['hit_ratio'] = c.get('hit', 0) / lookups if lookups else None
+        return out
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide DiskCache on CACHE_DIR."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = DiskCache()
+        return _default
@@ -0,0 +1,187 @@
+# ticks.py
+# Streaming tick-to-bar aggregation into fixed-size NumPy ring buffers
+import threading
+import numpy as np
+import pandas as pd
+
+BAR_FIELDS = ['start', 'open', 'high', 'low', 'close', 'volume', 'vwap', 'trades']
+INTERVALS = (1, 60, 300)    # seconds: 1s / 1m / 5m bars
+# Bars kept per interval: 30 minutes of 1s, a full day of 1m, four days of 5m
+CAPACITY = {1: 1800, 60: 1440, 300: 1152}
+
+
+class RingBuffer:
+    """
+    Preallocated per-field ring of the last `capacity` bars.
+
+    Every row is written twice (at i and i + capacity), so the newest n rows
+    are always one contiguous slice and last(n) returns views, not copies.
+    The views are read-only and only stable for the next capacity - n
+    appends (a full-buffer view is overwritten by the very next one): copy
+    them, or hold the writer's lock, to keep them longer.
+    """
+
+    def __init__(self, capacity=1440, fields=BAR_FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self._data = np.full((len(fields), 2 * capacity), np.nan)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, row):
+        i = self.count % self.capacity
+        self._data[:, i] = row
+        self._data[:, i + self.capacity] = row
+        self.count += 1
+
+    def last(self, n=None):
+        """{field: view} of the newest n rows (all held rows by default), oldest first."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.count % self.capacity + (self.capacity if self.count >= self.capacity else 0)
+        block = self._data[:, end - n:end]
+        block.flags.writeable = False
+        return dict(zip(self.fields, block))
+
+
+class _OpenBar:
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'pv', 'trades')
+
+    def __init__(self, start, price, size):
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.volume = size
+        self.pv = price * size
+        self.trades = 1
+
+    def add(self, price, size):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += size
+        self.pv += price * size
+        self.trades += 1
+
+    def row(self):
+        vwap = self.pv / self.volume if self.volume else self.close
+        return (self.start, self.open, self.high, self.low, self.close, self.volume, vwap, self.trades)
+
+
+class BarAggregator:
+    """
+    Rolls trades into OHLCV+VWAP bars per symbol for each interval in `intervals`.
+
+    Closed bars go into one RingBuffer per (symbol, interval), sized by
+    `capacity` ({interval: bars}), so memory is bounded however long the
+    session runs. Session VWAP per symbol resets when the trade date (UTC)
+    changes. Timestamps are epoch milliseconds, as in Polygon trade events.
+    Listeners added with add_listener() get (symbol, interval, row) for every
+    bar as it closes, on the feeding thread and under the lock: keep them
+    O(1) and do not call back into the aggregator.
+    """
+
+    def __init__(self, intervals=INTERVALS, capacity=None):
+        self.intervals = tuple(intervals)
+        self.capacity = {**CAPACITY, **(capacity or {})}
+        self._rings = {}      # (symbol, interval) -> RingBuffer
+        self._open = {}       # (symbol, interval) -> _OpenBar
+        self._session = {}    # symbol -> [day, pv, volume]
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, fn):
+        with self._lock:
+            if fn not in self._listeners:
+                self._listeners.append(fn)
+
+    def on_trade(self, symbol, price, size, ts_ms):
+        with self._lock:
+            self._add(symbol, float(price), float(size), int(ts_ms))
+
+    def on_events(self, events):
+        """Feed Polygon events; only trades ('T') are used."""
+        with self._lock:
+            for ev in events:
+                if ev.get('ev') == 'T' and 'p' in ev and 't' in ev:
+                    self._add(ev.get('sym'), float(ev['p']), float(ev.get('s', 0)), int(ev['t']))
+
+    def _add(self, symbol, price, size, ts_ms):
+        for interval in self.intervals:
+            key = (symbol, interval)
+            start = ts_ms - ts_ms % (interval * 1000)
+            bar = self._open.get(key)
+            if bar is not None and start > bar.start:
+                row = bar.row()
+                self._ring(key).append(row)
+                for listener in self._listeners:
+                    listener(symbol, interval, row)
+                bar = None
+            if bar is None:
+                self._open[key] = _OpenBar(start, price, size)
+            elif start == bar.start:
+                bar.add(price, size)
+            # Late trades for an already closed bar are ignored
+        day = ts_ms // 86_400_000
+        session = self._session.get(symbol)
+        if session is None or session[0] != day:
+            session = self._session[symbol] = [day, 0.0, 0.0]
+        session[1] += price * size
+        session[2] += size
+
+    def _ring(self, key):
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = RingBuffer(self.capacity.get(key[1], 1440))
+        return ring
+
+    # Readers take the lock the WS thread writes under and copy out, so a
+    # result never changes (or tears) after it is returned
+
+    def _bars(self, symbol, interval, n):
+        ring = self._rings.get((symbol, interval))
+        if ring is None:
+            return {f: np.empty(0) for f in BAR_FIELDS}
+        return {f: v.copy() for f, v in ring.last(n).items()}
+
+    def _current(self, symbol, interval):
+        bar = self._open.get((symbol, interval))
+        return dict(zip(BAR_FIELDS, bar.row())) if bar is not None else None
+
+    def bars(self, symbol, interval=60, n=None):
+        """{field: array} copies of the last n closed bars (oldest first)."""
+        with self._lock:
+            return self._bars(symbol, interval, n)
+
+    def current(self, symbol, interval=60):
+        """The still-open bar as a dict, or None."""
+        with self._lock:
+            return self._current(symbol, interval)
+
+    def frame(self, symbol, interval=60, n=None, include_open=False):
+        """Closed (and optionally the open) bars as a DataFrame indexed by bar start."""
+        with self._lock:
+            cols = self._bars(symbol, interval, n)
+            cur = self._current(symbol, interval) if include_open else None
+        df = pd.DataFrame({f: cols[f] for f in BAR_FIELDS if f != 'start'},
+                          index=pd.to_datetime(cols['start'], unit='ms'))
+        if cur:
+            extra = pd.DataFrame([{f: cur[f] for f in BAR_FIELDS if f != 'start'}],
+                                 index=pd.to_datetime([cur['start']], unit='ms'))
+            df = pd.concat([df, extra])
+        df.index.name = 'start'
+        return df
+
+    def session_vwap(self, symbol):
+        with self._lock:
+            session = self._session.get(symbol)
+            if not session or not session[2]:
+                return None
+            return session[1] / session[2]
+
+
+# Process-wide aggregator fed by polygon_ws
+aggregator = BarAggregator()
@@ -0,0 +1,48 @@
+# yahoo.py
+# Coalesced yfinance calls: one shared Ticker per symbol, one in-flight request per endpoint and params
+#
+# Results are shared between concurrent callers, so treat returned frames as read-only.
+import threading
+import time
+from data.metrics import span
+from data.singleflight import flight
+
+# yf.Ticker caches its expiry list; recycle objects so a long session sees new listings
+TICKER_TTL = 15 * 60
+
+_tickers = {}
+_lock = threading.Lock()
+
+
+def ticker(symbol):
+    # yfinance (and its HTTP stack) is imported on first use, not with the data layer
+    import yfinance as yf
+    now = time.monotonic()
+    with _lock:
+        entry = _tickers.get(symbol)
+        if entry is None or now - entry[0] > TICKER_TTL:
+            entry = _tickers[symbol] = (now, yf.Ticker(symbol))
+        return entry[1]
+
+
+def history(symbol, period=None, start=None):
+    kwargs = {'start': start} if start else {'period': period or '1mo'}
+
+    def fetch():
+        with span('yfinance.history', 'yfinance'):
+            return ticker(symbol).history(**kwargs)
+    return flight.do(('yfinance', 'history', symbol, period, start), fetch)
+
+
+def options(symbol):
+    def fetch():
+        with span('yfinance.options', 'yfinance'):
+            return tuple(ticker(symbol).options)
+    return flight.do(('yfinance', 'options', symbol), fetch)
+
+
+def option_chain(symbol, expiry):
+    def fetch():
+        with span('yfinance.option_chain', 'yfinance'):
+            return ticker(symbol).option_chain(expiry)
+    return flight.do(('yfinance', 'option_chain', symbol, expiry), fetch)
@@ -1,27 +1,21 @@
 # Debug helper to print the first option contract with Greeks
 import streamlit as st
 import pandas as pd
-import requests
 import os
+from data.polygon import PolygonClient
+from data.store import get_cache
 
 POLYGON_KEY = "uz85txFQaRLRhVMNEwUfZr4wzIVcXgf0"
 
 ticker = "SPY"
-url = f"https://api.polygon.io/v3/snapshot/options/{ticker.upper()}"
-params = {"apiKey": POLYGON_KEY}
-all_options = []
-while url:
-    response = requests.get(url, params=params)
-    data = response.json()
-    if 'results' in data and 'options' in data['results']:
-        all_options.extend(data['results']['options'])
-    url = data.get('next_url')
-    params = {}
+client = PolygonClient(POLYGON_KEY)
+
+# Shared on-disk cache: reruns within the snapshot TTL skip the paginated sweep
+chain = get_cache().get_or_fetch('polygon', ticker, 'snapshot', lambda: client.chain_snapshot(ticker))
 
 # Print the first contract with Greeks
-for opt in all_options:
-    if any(g in opt for g in ["delta", "gamma", "theta", "vega"]):
-        print(opt)
-        break
+with_greeks = chain.dropna(subset=["delta", "gamma", "theta", "vega"], how="all")
+if len(with_greeks):
+    print(with_greeks.iloc[0])
 else:
     print("No Greeks found in any contract.")
@@ -0,0 +1,70 @@
+# analytics.py
+# Trade analytics for whole candidate frames: breakeven, lognormal POP, expected move, key levels
+#
+# Works on the frames get_option_candidates returns (calls, IV in percent,
+# Price/Support/Resistance from logic.features) with array operations only.
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from data.metrics import timed
+
+RATE = 0.05  # risk-free rate for the lognormal drift, as in the chain Greeks
+
+ANALYTICS_COLUMNS = ['breakeven', 'pop', 'expected_move', 'be_reach']
+
+
+def _num(df, name):
+    return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float) if name in df.columns else np.full(len(df), np.nan)
+
+
+def breakevens(strike, premium):
+    # Long call: the underlying has to finish above strike plus the premium paid
+    return np.asarray(strike, dtype=float) + np.asarray(premium, dtype=float)
+
+
+def pop_lognormal(spot, level, iv, dte, rate=RATE):
+    """
+    P(S_T > level) under a lognormal terminal price with volatility `iv`
+    (decimal) over `dte` calendar days: N(d2) evaluated at the level.
+    NaN where any input is missing or non-positive.
+    """
+    spot, level, iv, dte = (np.asarray(a, dtype=float) for a in (spot, level, iv, dte))
+    t = np.where(dte > 0, dte, np.nan) / 365.0
+    vol_sqrt_t = np.where(iv > 0, iv, np.nan) * np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d2 = (np.log(spot / level) + (rate - 0.5 * iv * iv) * t) / vol_sqrt_t
+    return np.where(np.isfinite(d2), ndtr(d2), np.nan)
+
+
+def expected_moves(spot, iv, dte):
+    # One standard deviation of the price at expiry: S * sigma * sqrt(T)
+    spot, iv, dte = (np.asarray(a, dtype=float) for a in (spot, iv, dte))
+    return spot * iv * np.sqrt(np.clip(dte, 0, None) / 365.0)
+
+
+@timed('analytics.frame')
+def analytics_frame(df, rate=RATE):
+    """
+    Copy of a candidate frame with ANALYTICS_COLUMNS added:
+    breakeven at the ask (the bid when there is no ask), POP as the lognormal
+    probability of finishing above breakeven, the one-sigma expected move to
+    expiry, and be_reach, the distance to breakeven in expected moves
+    (<= 1 means breakeven sits inside the expected move).
+    """
+    out = df.copy()
+    spot, iv, dte = _num(df, 'Price'), _num(df, 'iv') / 100, _num(df, 'dte')
+    bid, ask = _num(df, 'bid'), _num(df, 'ask')
+    premium = np.where(ask > 0, ask, bid)
+    out['breakeven'] = breakevens(_num(df, 'strike'), premium)
+    out['pop'] = pop_lognormal(spot, out['breakeven'], iv, dte, rate)
+    out['expected_move'] = expected_moves(spot, iv, dte)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['be_reach'] = (out['breakeven'] - spot) / out['expected_move'].where(out['expected_move'] > 0)
+    return out
+
+
+def key_levels(df):
+    # 'Key S/R' text from the Support/Resistance feature columns
+    support = df['Support'].map('{:.2f}'.format).astype(str)
+    resistance = df['Resistance'].map('{:.2f}'.format).astype(str)
+    return (support + ' / ' + resistance).where(df['Support'].notna() & df['Resistance'].notna(), '')
@@ -0,0 +1,322 @@
+# backtest.py
+# Rubric backtester: replays stored daily chain snapshots and bars through features, Greeks, analytics and scoring
+#
+# Snapshots are the DiskCache's daily chain entries (yfinance 'chain' and Polygon
+# 'snapshot'; import_snapshot() adds saved Polygon responses such as
+# polygon_nvda_snapshot.json). Work splits in two:
+#   ticker_trades()  one ticker, all dates at once: candidates as the scanner
+#                    would have seen them, each simulated to its exit. Weight
+#                    independent, so it runs once per ticker, in worker processes.
+#   evaluate()       rubric, composite score and signal for every trade, then
+#                    P&L and hit rate per signal. Cheap enough to repeat for
+#                    every point of a weight grid.
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from data.chains import delta_band
+from data.metrics import timed
+from data.polygon import parse_snapshot
+from data.provider import get_provider
+from data.schema import from_polygon, merge_chains, strike_price
+from data.store import get_cache
+from logic.analytics import RATE, analytics_frame
+from logic.features import feature_panels
+from logic.greeks import bs_greeks
+from logic.scoring import (RUBRIC, ROLL_RULE, SIGNAL_THRESHOLDS, WEIGHTS, composite_scores, rubric_mask,
+                           score_frame, signals_from_scores)
+
+HOLD_DAYS = 10        # calendar days a position is held before it is closed at the bid
+MAX_ROLLS = 3         # rolls chained into one trade before a ROLL trigger just closes it
+BAR_LOOKBACK = 400    # calendar days of bars before the first snapshot, to warm up the 200SMA
+CONTRACT_SIZE = 100
+
+TRADE_COLUMNS = ['entry_price', 'exit_date', 'exit_price', 'exit_contract', 'exit_reason', 'rolls', 'premium_paid',
+                 'days_held', 'pnl', 'return']
+
+
+def import_snapshot(path, cache=None):
+    """
+    Store a saved /v3/snapshot/options response (JSON file) as that day's
+    Polygon snapshot for its underlying. Returns (ticker, as_of).
+    """
+    with open(path) as fh:
+        snapshot = parse_snapshot(json.load(fh).get('results') or [])
+    ticker = str(snapshot['underlying'].mode().iloc[0])
+    as_of = snapshot['updated'].max().strftime('%Y-%m-%d')
+    (cache or get_cache()).put('polygon', ticker, 'snapshot', snapshot, as_of=as_of)
+    return ticker, as_of
+
+
+def stored_chains(ticker, start=None, end=None, cache=None):
+    """One typed chain frame with a `date` column for every stored snapshot day of ticker."""
+    cache = cache or get_cache()
+    yahoo = cache.archive('yfinance', ticker, 'chain', start, end)
+    polygon = cache.archive('polygon', ticker, 'snapshot', start, end)
+    days = []
+    for as_of in sorted(set(yahoo) | set(polygon)):
+        chain = merge_chains([from_polygon(polygon.get(as_of)), yahoo.get(as_of)])
+        if len(chain):
+            days.append(chain.assign(date=pd.Timestamp(as_of)))
+    if not days:
+        return pd.DataFrame()
+    chains = pd.concat(days, ignore_index=True)
+    # DTE as of the snapshot day, not the day it is replayed
+    chains['dte'] = (chains['expiry'] - chains['date']).dt.days.astype('int16')
+    return chains
+
+
+def _on(series, dates):
+    # Value of a daily series as of each date (last value on or before it; NaN before the first bar)
+    series = series.sort_index().ffill()
+    pos = series.index.searchsorted(dates, side='right') - 1
+    values = series.to_numpy()
+    return np.where(pos >= 0, values[np.clip(pos, 0, None)], np.nan) if len(values) else np.full(len(dates), np.nan)
+
+
+def stored_calls(chains, close, rate=RATE):
+    """Call rows of stored_chains() with Greeks (vendor values kept, missing ones from Black-Scholes)."""
+    calls = chains[chains['type'] == 'call']
+    if calls.empty or close.empty:
+        return calls
+    spot = _on(close, pd.DatetimeIndex(calls['date']))
+    greeks = bs_greeks(spot, strike_price(calls), rate, calls['dte'].to_numpy(), calls['iv'].to_numpy())
+    return calls.assign(**{col: calls[col].fillna(pd.Series(greeks[col].to_numpy(dtype='float32'), index=calls.index))
+                           for col in ('delta', 'gamma', 'theta')})
+
+
+@timed('backtest.candidates')
+def candidate_history(ticker, calls, bars):
+    """
+    get_option_candidates() for every snapshot day at once: delta-band calls
+    from stored_calls(), the ticker's features as of that day, and a `date` column.
+    """
+    if calls.empty or bars.empty:
+        return pd.DataFrame()
+    close, volume = bars['close'], bars['volume']
+    calls = delta_band(calls)
+    dates = pd.DatetimeIndex(calls['date'])
+
+    bid, ask = calls['bid'], calls['ask']
+    mid = (bid + ask) / 2
+    out = pd.DataFrame({
+        'date': calls['date'], 'Ticker': ticker, 'contract': calls['contract'], 'Price': _on(close, dates),
+        'ChgPct': _on(close.pct_change() * 100, dates), 'Vol': _on(volume, dates),
+        'AvgVol': _on(volume.rolling(30, min_periods=1).mean(), dates), 'VWAP': np.nan,
+        'expiry': calls['expiry'].dt.strftime('%Y-%m-%d'), 'expiry_date': calls['expiry'],
+        'strike': strike_price(calls), 'bid': bid, 'ask': ask,
+        'delta': calls['delta'], 'theta': calls['theta'], 'gamma': calls['gamma'],
+        'iv': calls['iv'] * 100, 'oi': calls['oi'],
+        'spread_pct': ((ask - bid) / mid).where(mid > 0), 'dte': calls['dte'],
+    })
+    panels = feature_panels(close.to_frame(ticker), volume.to_frame(ticker))
+    for name, panel in panels.items():
+        out[name] = _on(panel[ticker], dates)
+    return out.reset_index(drop=True)
+
+
+def _exits(legs, calls, close, hold_days, roll):
+    """
+    Exit of every leg, vectorized: the first later snapshot of the leg's
+    contract that is `hold_days` past the trade's entry (`opened`) or meets
+    the ROLL rule's theta/DTE trigger, closed at the bid; otherwise intrinsic
+    value at expiry when the bars reach it; otherwise the last available bid.
+    Returns exit_date, exit_price and exit_reason aligned to legs.
+    """
+    marks = calls.loc[calls['contract'].isin(legs['contract']), ['contract', 'date', 'bid', 'dte', 'theta']]
+    pairs = legs[['contract', 'date', 'opened']].rename_axis('leg').reset_index().merge(
+        marks, on='contract', suffixes=('', '_mark'))
+    pairs = pairs[pairs['date_mark'] > pairs['date']].sort_values(['leg', 'date_mark'], kind='stable')
+    rolls = (pairs['dte'] < roll['dte_below']) | (pairs['theta'] < roll['theta_below'])
+    held = (pairs['date_mark'] - pairs['opened']).dt.days >= hold_days
+    first = pairs[rolls | held].groupby('leg').first()
+    first['exit_reason'] = np.where(rolls[rolls | held].groupby(pairs['leg']).first(), 'roll', 'hold')
+    last = pairs.groupby('leg').last()
+
+    exit_date = pd.Series(first['date_mark'], index=legs.index)
+    exit_price = pd.Series(first['bid'], index=legs.index, dtype=float)
+    reason = pd.Series(first['exit_reason'], index=legs.index, dtype=object)
+
+    # No trigger: settle at expiry if the bars get there, else mark at the last bid
+    expiry = pd.DatetimeIndex(legs['expiry_date'])
+    settle = exit_date.isna() & (expiry <= close.index.max())
+    intrinsic = np.maximum(_on(close, expiry) - legs['strike'].to_numpy(), 0)
+    exit_date = exit_date.where(~settle, legs['expiry_date'])
+    exit_price = exit_price.where(~settle, pd.Series(intrinsic, index=legs.index))
+    reason = reason.where(~settle, 'expiry')
+    still_open = exit_date.isna()
+    exit_date = exit_date.where(~still_open, last['date_mark'].reindex(legs.index))
+    exit_price = exit_price.where(~still_open, last['bid'].reindex(legs.index))
+    reason = reason.where(~still_open | exit_price.isna(), 'open')
+    return exit_date, exit_price, reason
+
+
+def _roll_targets(legs, on, calls):
+    """
+    Replacement for each leg rolled on `on`: among that day's calls with an
+    ask, the nearest expiry after the leg's, then the strike whose delta is
+    closest to the leg's target delta. Rows without one are left out.
+    """
+    rolled = pd.DataFrame({'date': on, 'after': legs['expiry_date'], 'target': legs['target_delta']}).rename_axis('leg').reset_index()
+    offers = calls.loc[calls['ask'] > 0, ['date', 'contract', 'expiry', 'bid', 'ask', 'delta']]
+    offers = offers.assign(strike=strike_price(calls[calls['ask'] > 0]))
+    pairs = rolled.merge(offers, on='date')
+    pairs = pairs[pairs['expiry'] > pairs['after']]
+    pairs = pairs[pairs['expiry'] == pairs.groupby('leg')['expiry'].transform('min')]
+    pairs = pairs.assign(gap=(pairs['delta'] - pairs['target']).abs()).sort_values(['leg', 'gap'], kind='stable')
+    return pairs.groupby('leg').first()
+
+
+@timed('backtest.simulate')
+def simulate(candidates, calls, close, hold_days=HOLD_DAYS, roll=ROLL_RULE, max_rolls=MAX_ROLLS):
+    """
+    Enter every candidate at its ask and follow it to its exit (see _exits).
+    A ROLL trigger sells the contract at the bid and buys the nearest
+    later-expiry call at the same delta (the entry delta) at its ask; the
+    replacement's P&L is chained into the same trade, up to `max_rolls`
+    times, and the holding period still runs from the original entry. A
+    trigger with no later expiry listed that day, or past max_rolls, closes
+    the trade ('roll'). `calls` is stored_calls() output. Adds TRADE_COLUMNS:
+    pnl sums every leg, return is pnl over the total premium paid.
+    """
+    trades = candidates[candidates['ask'] > 0].reset_index(drop=True)
+    legs = pd.DataFrame({'contract': trades['contract'], 'date': trades['date'], 'opened': trades['date'],
+                         'expiry_date': trades['expiry_date'], 'strike': trades['strike'].astype(float),
+                         'target_delta': trades['delta'].astype(float), 'entry_price': trades['ask'].astype(float)})
+    exit_date = pd.Series(pd.NaT, index=trades.index, dtype='datetime64[ns]')
+    exit_price = pd.Series(np.nan, index=trades.index)
+    exit_contract = trades['contract'].astype(object)
+    reason = pd.Series(None, index=trades.index, dtype=object)
+    rolls = pd.Series(0, index=trades.index)
+    paid = pd.Series(0.0, index=trades.index)
+    gain = pd.Series(0.0, index=trades.index)
+    # A leg bought on a roll with no later mark is valued at its bid that day
+    fallback = pd.Series(np.nan, index=trades.index)
+
+    for n in range(max_rolls + 1):
+        if legs.empty:
+            break
+        leg_date, leg_price, leg_reason = _exits(legs, calls, close, hold_days, roll)
+        unmarked = leg_price.isna() & fallback.reindex(legs.index).notna()
+        leg_date = leg_date.where(~unmarked, legs['date'])
+        leg_price = leg_price.where(~unmarked, fallback.reindex(legs.index))
+        leg_reason = leg_reason.where(~unmarked, 'open')
+        idx = legs.index
+        exit_date[idx], exit_price[idx], reason[idx] = leg_date, leg_price, leg_reason
+        exit_contract[idx] = legs['contract']
+        paid[idx] += legs['entry_price']
+        gain[idx] += leg_price - legs['entry_price']
+        if n == max_rolls:
+            break
+        rolled = legs[leg_reason == 'roll']
+        targets = _roll_targets(rolled, leg_date[rolled.index], calls)
+        legs = rolled.loc[targets.index].assign(
+            contract=targets['contract'], date=leg_date[targets.index], expiry_date=targets['expiry'],
+            strike=targets['strike'], entry_price=targets['ask'].astype(float))
+        rolls[legs.index] += 1
+        fallback = targets['bid'].astype(float)
+
+    trades['entry_price'] = trades['ask'].astype(float)
+    trades['exit_date'] = exit_date
+    trades['exit_price'] = exit_price
+    trades['exit_contract'] = exit_contract
+    trades['exit_reason'] = reason
+    trades['rolls'] = rolls
+    trades['premium_paid'] = paid
+    trades['days_held'] = (exit_date - trades['date']).dt.days
+    trades['pnl'] = gain * CONTRACT_SIZE
+    trades['return'] = gain / paid
+    return trades[exit_price.notna()].reset_index(drop=True)
+
+
+def ticker_trades(ticker, start=None, end=None, hold_days=HOLD_DAYS, roll=ROLL_RULE):
+    """
+    Every candidate of every stored snapshot day of `ticker`, simulated to its
+    exit, with analytics and default-weight sub-scores. Runs in a worker process.
+    """
+    chains = stored_chains(ticker, start, end)
+    if chains.empty:
+        return pd.DataFrame()
+    first = chains['date'].min() - pd.Timedelta(days=BAR_LOOKBACK)
+    bars = get_provider().bars.get(ticker, start=first, refresh=False)
+    calls = stored_calls(chains, bars['close'])
+    candidates = candidate_history(ticker, calls, bars)
+    if candidates.empty:
+        return candidates
+    trades = simulate(candidates, calls, bars['close'], hold_days, roll)
+    return score_frame(analytics_frame(trades))
+
+
+def collect(tickers, start=None, end=None, hold_days=HOLD_DAYS, roll=ROLL_RULE, workers=None):
+    """
+    ticker_trades() for a universe, one ticker per task across a process
+    pool (workers=0 runs inline). One frame of trades for all tickers.
+    """
+    args = (tickers, repeat(start), repeat(end), repeat(hold_days), repeat(roll))
+    if workers == 0:
+        parts = list(map(ticker_trades, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(ticker_trades, *args))
+    parts = [p for p in parts if len(p)]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=TRADE_COLUMNS)
+
+
+def evaluate(trades, weights=WEIGHTS, thresholds=SIGNAL_THRESHOLDS, roll=ROLL_RULE, rubric=RUBRIC):
+    """
+    Score and label collected trades under one parameter set: rows failing
+    `rubric` (None keeps all) are dropped, the composite score and signal
+    are recomputed from the stored sub-scores. Returns the trades with
+    'Signal Score' and 'Signal' replaced.
+    """
+    if rubric is not None and len(trades):
+        trades = trades[rubric_mask(trades, rubric)]
+    trades = trades.copy()
+    if trades.empty:
+        return trades.assign(**{'Signal Score': pd.Series(dtype=int), 'Signal': pd.Series(dtype=object)})
+    sentiment = trades['Sentiment Score'] if 'Sentiment Score' in trades.columns else 0.0
+    trades['Signal Score'] = composite_scores(trades['tech_score'], trades['greeks_score'], sentiment,
+                                              trades['dte_score'], weights)
+    trades['Signal'] = signals_from_scores(trades['Signal Score'], trades['theta'], trades['dte'], thresholds, roll)
+    return trades
+
+
+def summarize(trades, by='Signal'):
+    """Trade count, hit rate, P&L (per contract) and holding time for each signal."""
+    if trades.empty:
+        return pd.DataFrame(columns=['trades', 'hit_rate', 'avg_pnl', 'total_pnl', 'avg_return', 'avg_days', 'roll_share'])
+    grouped = trades.assign(win=trades['pnl'] > 0, rolled=trades['rolls'] > 0).groupby(by)
+    return pd.DataFrame({
+        'trades': grouped.size(), 'hit_rate': grouped['win'].mean(),
+        'avg_pnl': grouped['pnl'].mean(), 'total_pnl': grouped['pnl'].sum(),
+        'avg_return': grouped['return'].mean(), 'avg_days': grouped['days_held'].mean(),
+        'roll_share': grouped['rolled'].mean(),
+    }).sort_values('avg_pnl', ascending=False)
+
+
+def run_backtest(tickers, start=None, end=None, hold_days=HOLD_DAYS, weights=WEIGHTS, rubric=RUBRIC, workers=None):
+    """collect() + evaluate() + summarize(); returns (trades, summary)."""
+    trades = evaluate(collect(tickers, start, end, hold_days, workers=workers), weights, rubric=rubric)
+    return trades, summarize(trades)
+
+
+if __name__ == '__main__':
+    from logic.yfinance_options import TICKERS
+    parser = argparse.ArgumentParser(description='Backtest the scoring rubric over stored chain snapshots')
+    parser.add_argument('--tickers', help='comma-separated (default: the dashboard universe)')
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--hold-days', type=int, default=HOLD_DAYS)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--all', action='store_true', help='score every candidate, not only rubric passes')
+    parser.add_argument('--import', dest='imports', nargs='*', default=[], help='saved Polygon snapshot JSON files')
+    args = parser.parse_args()
+    for path in args.imports:
+        print('imported', *import_snapshot(path))
+    tickers = args.tickers.split(',') if args.tickers else TICKERS
+    trades, summary = run_backtest(tickers, args.start, args.end, args.hold_days,
+                                   rubric=None if args.all else RUBRIC, workers=args.workers)
+    print(f"{len(trades)} trades over {trades['Ticker'].nunique() if len(trades) else 0} tickers")
+    print(summary.to_string())
@@ -0,0 +1,113 @@
+# contract_index.py
+# Universe-wide candidate contract index: sorted by delta, upserted per ticker, screened without a rescan
+import threading
+import numpy as np
+import pandas as pd
+from data.metrics import metrics, timed
+from data.store import get_cache
+from logic.scoring import RUBRIC, WEIGHTS, rubric_mask
+from logic.yfinance_options import screen_candidates
+
+
+class ContractIndex:
+    """
+    Every delta-band candidate from the last scan of each ticker (the frames
+    get_option_candidates returns), kept as one frame sorted by delta.
+
+    upsert() swaps one ticker's rows as its scan lands and apply_quotes()
+    patches bid/ask from streamed quotes, so the index follows the refresh
+    cycle instead of being rebuilt. query() binary-searches the delta bounds
+    and masks only that slice, which keeps a universe screen in the
+    millisecond range; thresholds can change freely as long as the delta
+    bounds stay inside the scan's DELTA_BAND. Writers replace the frame,
+    never mutate it, so a frame handed to a reader stays consistent.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or get_cache()
+        self._frame = None
+        self._delta = None
+        self._lock = threading.Lock()
+
+    def _set(self, frame):
+        frame = frame.sort_values('delta', kind='stable', ignore_index=True)
+        self._frame = frame
+        self._delta = frame['delta'].to_numpy(dtype=float)
+
+    def frame(self):
+        """The current index frame (read-only), loading the saved one on first use."""
+        with self._lock:
+            if self._frame is None:
+                saved = self.cache.get('index', 'universe', 'contracts', as_of='latest')
+                self._set(saved if saved is not None else pd.DataFrame(columns=['Ticker', 'contract', 'delta']))
+            return self._frame
+
+    def __len__(self):
+        return len(self.frame())
+
+    def tickers(self):
+        return set(self.frame()['Ticker'].unique())
+
+    def upsert(self, ticker, candidates):
+        """Replace `ticker`'s rows with `candidates` (empty or None drops the ticker)."""
+        self.frame()
+        with self._lock:
+            keep = self._frame[self._frame['Ticker'] != ticker]
+            parts = [p for p in (keep, candidates) if p is not None and len(p)]
+            self._set(pd.concat(parts, ignore_index=True) if parts else keep)
+        metrics.count('index.upserts')
+
+    def apply_quotes(self, entries):
+        """
+        Patch bid, ask and spread_pct from streamed quotes: `entries` is a
+        LatestBook snapshot ({symbol: entry}); contracts not in the index are
+        ignored. Returns how many rows changed.
+        """
+        quotes = [(s, e['quote'].get('bp'), e['quote'].get('ap')) for s, e in entries.items() if e.get('quote')]
+        if not quotes:
+            return 0
+        self.frame()
+        with self._lock:
+            symbols, bid, ask = zip(*quotes)
+            pos = pd.Index(self._frame['contract']).get_indexer(symbols)
+            hit = pos >= 0
+            if not hit.any():
+                return 0
+            frame = self._frame.copy()
+            rows = pos[hit]
+            bid = np.asarray(bid, dtype=float)[hit]
+            ask = np.asarray(ask, dtype=float)[hit]
+            mid = (bid + ask) / 2
+            spread = np.where(mid > 0, (ask - bid) / np.where(mid > 0, mid, 1), np.nan)
+            # Cast to the column dtypes (quotes are float32 in the chain schema)
+            for col, values in (('bid', bid), ('ask', ask), ('spread_pct', spread)):
+                frame.loc[rows, col] = values.astype(frame[col].dtype)
+            # Delta is untouched, so the sort order still holds
+            self._frame = frame
+        return int(hit.sum())
+
+    @timed('index.query')
+    def query(self, rubric=RUBRIC, dte=None):
+        """Candidate rows passing `rubric` (optionally within a (lo, hi) DTE range), in delta order."""
+        self.frame()
+        with self._lock:
+            frame, delta = self._frame, self._delta
+        lo, hi = rubric['delta']
+        band = frame.iloc[np.searchsorted(delta, lo, side='left'):np.searchsorted(delta, hi, side='right')]
+        mask = rubric_mask(band, rubric)
+        if dte is not None:
+            mask &= band['dte'].between(*dte)
+        return band[mask]
+
+    def screen(self, rubric=RUBRIC, weights=WEIGHTS, dte=None):
+        """query() scored and laid out as the dashboard table."""
+        return screen_candidates(self.query(rubric, dte), rubric, weights)
+
+    def save(self):
+        frame = self.frame()
+        if len(frame):
+            self.cache.put('index', 'universe', 'contracts', frame, as_of='latest')
+
+
+# Process-wide index fed by the refresher
+contract_index = ContractIndex()
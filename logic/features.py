@@ -1,26 +1,128 @@
 # features.py
 # Indicator calculations: EMA, RSI, MACD, VolRatio, etc.
+# Every indicator is computed on a wide (date x ticker) panel; the single-ticker
+# functions wrap the panel versions with a one-column frame.
+import numpy as np
 import pandas as pd
+from data.metrics import timed
 
-def ema(series, window):
-    return series.ewm(span=window, adjust=False).mean()
+# Dashboard feature columns produced by panel_features
+FEATURE_COLUMNS = ['VolRatio', '20EMA', '50EMA', '200SMA', 'MA Trend', 'RSI', 'MACD', 'Support', 'Resistance']
 
-def sma(series, window):
-    return series.rolling(window=window).mean()
+# Support/resistance: swing pivots over the last SR_LOOKBACK bars, a pivot being
+# the extreme close of its centred 2 * SR_ORDER + 1 bar window
+SR_LOOKBACK = 120
+SR_ORDER = 5
 
-def rsi(series, window=14):
-    delta = series.diff()
+def _one(fn, series, *args, **kwargs):
+    return fn(series.to_frame(), *args, **kwargs).iloc[:, 0]
+
+def ema_panel(panel, window, min_periods=0):
+    return panel.ewm(span=window, adjust=False, min_periods=min_periods).mean()
+
+def sma_panel(panel, window):
+    return panel.rolling(window=window).mean()
+
+def rsi_panel(panel, window=14):
+    delta = panel.diff()
     gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
     rs = gain / loss
     return 100 - (100 / (1 + rs))
 
-def macd(series, fast=12, slow=26, signal=9):
-    ema_fast = ema(series, fast)
-    ema_slow = ema(series, slow)
-    macd_line = ema_fast - ema_slow
-    signal_line = ema(macd_line, signal)
+def rsi_wilder_panel(panel, window=14):
+    delta = panel.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+def macd_panel(panel, fast=12, slow=26, signal=9):
+    macd_line = ema_panel(panel, fast) - ema_panel(panel, slow)
+    signal_line = ema_panel(macd_line, signal)
     return macd_line, signal_line
 
+def support_resistance_panel(close, lookback=SR_LOOKBACK, order=SR_ORDER):
+    """
+    Nearest levels around each ticker's last close: support is the highest
+    pivot low below it, resistance the lowest pivot high above it. Falls back
+    to the lookback's min/max close when no pivot qualifies.
+    """
+    window = 2 * order + 1
+    last = close.ffill().iloc[-1]
+    recent = close.tail(lookback)
+    lows = recent.where(recent == close.rolling(window, center=True).min().tail(lookback))
+    highs = recent.where(recent == close.rolling(window, center=True).max().tail(lookback))
+    support = lows.where(lows.lt(last)).max().fillna(recent.min())
+    resistance = highs.where(highs.gt(last)).min().fillna(recent.max())
+    return support, resistance
+
+def ema(series, window):
+    return _one(ema_panel, series, window)
+
+def sma(series, window):
+    return _one(sma_panel, series, window)
+
+def rsi(series, window=14):
+    return _one(rsi_panel, series, window)
+
+def rsi_wilder(series, window=14):
+    # Wilder smoothing (alpha = 1/window); logic.streaming.WilderRSI updates this one bar at a time
+    return _one(rsi_wilder_panel, series, window)
+
+def macd(series, fast=12, slow=26, signal=9):
+    macd_line, signal_line = macd_panel(series.to_frame(), fast, slow, signal)
+    return macd_line.iloc[:, 0], signal_line.iloc[:, 0]
+
 def vol_ratio(volume, avg_volume):
     return volume / avg_volume if avg_volume else 0
+
+def feature_panels(close, volume=None, vol_window=30):
+    """
+    Every FEATURE_COLUMNS indicator except Support/Resistance as a
+    forward-filled (date x ticker) panel, keyed by column name; the value on a
+    date only uses bars up to that date. panel_features takes the last row,
+    backtests read whole histories.
+    """
+    close = close.sort_index()
+    ema20 = ema_panel(close, 20, min_periods=20).ffill()
+    ema50 = ema_panel(close, 50, min_periods=50).ffill()
+    sma200 = sma_panel(close, 200).ffill()
+    rsi = rsi_panel(close, 14).ffill()
+    macd_line = (ema_panel(close, 12, min_periods=26) - ema_panel(close, 26, min_periods=26)).ffill()
+
+    trend = np.select([(ema20 > ema50) & (ema50 > sma200), (ema20 < ema50) & (ema50 < sma200)],
+                      ['Bullish', 'Bearish'], 'Neutral')
+    macd_dir = np.where(macd_line > 0, 'Up', np.where(macd_line.isna(), None, 'Down'))
+
+    if volume is not None:
+        volume = volume.reindex(index=close.index, columns=close.columns)
+        avg_vol = volume.rolling(vol_window, min_periods=1).mean().ffill()
+        ratio = (volume.ffill() / avg_vol).where(avg_vol > 0)
+    else:
+        ratio = pd.DataFrame(np.nan, index=close.index, columns=close.columns)
+
+    return {
+        'VolRatio': ratio, '20EMA': ema20, '50EMA': ema50, '200SMA': sma200,
+        'MA Trend': pd.DataFrame(trend, index=close.index, columns=close.columns), 'RSI': rsi,
+        'MACD': pd.DataFrame(macd_dir, index=close.index, columns=close.columns),
+    }
+
+@timed('features.panel')
+def panel_features(close, volume=None, vol_window=30):
+    """
+    Latest dashboard features for every ticker in one pass.
+
+    close, volume: wide DataFrames (date x ticker), ragged histories allowed.
+    Returns a DataFrame indexed by ticker with FEATURE_COLUMNS; indicators
+    without enough history (20/50/200/14/26 bars) are NaN.
+    """
+    if close.empty:
+        out = pd.DataFrame(np.nan, index=close.columns, columns=FEATURE_COLUMNS)
+        out.index.name = 'Ticker'
+        return out
+    close = close.sort_index()
+    out = pd.DataFrame({name: panel.iloc[-1] for name, panel in feature_panels(close, volume, vol_window).items()},
+                       index=close.columns)
+    out['Support'], out['Resistance'] = support_resistance_panel(close)
+    out.index.name = 'Ticker'
+    return out
@@ -1,20 +1,90 @@
 # greeks.py
-# Calculate option Greeks using mibian
-import mibian
+# Black-Scholes pricing and Greeks, vectorized over whole option chains
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from data.metrics import timed
 
-def calculate_greeks(underlying_price, strike_price, interest_rate, days_to_expiry, implied_volatility):
+# Output units follow mibian so old callers see the same numbers:
+# theta per calendar day, vega per 1 vol point, rho per 1 rate point.
+GREEK_COLUMNS = ['price', 'delta', 'gamma', 'theta', 'vega', 'rho']
+
+_SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def _npdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+@timed('greeks.bs')
+def bs_greeks(spot, strike, rate, dte, iv, is_call=True):
+    """
+    Price and Greeks for arrays of European options in one pass.
+
+    spot, strike: prices; rate, iv: decimal fractions (0.05, 0.30);
+    dte: calendar days to expiry; is_call: bool or bool array.
+    All inputs broadcast against each other. Rows with non-positive or
+    missing spot/strike/dte/iv come back as NaN rather than raising.
+    Returns a DataFrame with GREEK_COLUMNS.
+    """
+    spot, strike, rate, dte, iv, is_call = np.broadcast_arrays(
+        np.asarray(spot, dtype=float), np.asarray(strike, dtype=float),
+        np.asarray(rate, dtype=float), np.asarray(dte, dtype=float),
+        np.asarray(iv, dtype=float), np.asarray(is_call, dtype=bool))
+    spot, strike, rate, dte, iv, is_call = (a.ravel() for a in (spot, strike, rate, dte, iv, is_call))
+
+    valid = (spot > 0) & (strike > 0) & (dte > 0) & (iv > 0) & np.isfinite(rate)
+    t = np.where(valid, dte, np.nan) / 365.0
+    sqrt_t = np.sqrt(t)
+    vol_sqrt_t = iv * sqrt_t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(spot / strike) + (rate + 0.5 * iv * iv) * t) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    disc = np.exp(-rate * t)
+    pdf_d1 = _npdf(d1)
+
+    # Put values come from the call ones via N(-x) = 1 - N(x)
+    sign = np.where(is_call, 1.0, -1.0)
+    nd1 = ndtr(sign * d1)
+    nd2 = ndtr(sign * d2)
+    price = sign * (spot * nd1 - strike * disc * nd2)
+    delta = sign * nd1
+    gamma = pdf_d1 / (spot * vol_sqrt_t)
+    theta = (-spot * pdf_d1 * iv / (2 * sqrt_t) - sign * rate * strike * disc * nd2) / 365.0
+    vega = spot * pdf_d1 * sqrt_t / 100.0
+    rho = sign * strike * t * disc * nd2 / 100.0
+
+    return pd.DataFrame({
+        'price': price, 'delta': delta, 'gamma': gamma,
+        'theta': theta, 'vega': vega, 'rho': rho,
+    })
+
+
+def chain_greeks(chain, spot, rate=0.05, iv_col='impliedVolatility', type_col='type',
+                 strike_col='strike', dte_col='days_to_expiry'):
+    """
+    Greeks for a chain DataFrame (yfinance-style column names by default).
+
+    IV is taken as a decimal fraction. `spot` may be a scalar or a column
+    aligned with `chain`; a missing type column means calls.
+    Returns GREEK_COLUMNS indexed like `chain`.
+    """
+    if type_col in chain.columns:
+        is_call = chain[type_col].astype(str).str.lower().str.startswith('c').to_numpy()
+    else:
+        is_call = True
+    out = bs_greeks(spot, chain[strike_col].to_numpy(), rate, chain[dte_col].to_numpy(),
+                    chain[iv_col].to_numpy(), is_call)
+    out.index = chain.index
+    return out
+
+
+def calculate_greeks(underlying_price, strike_price, interest_rate, days_to_expiry, implied_volatility, opt_type='call'):
+    # Scalar wrapper kept for old callers; rate and IV are in percent, as with mibian
     try:
-        C = mibian.BS([underlying_price, strike_price, interest_rate, days_to_expiry], implied_volatility)
-        return {
-            'delta': C.delta,
-            'gamma': C.gamma,
-            'theta': C.theta,
-            'vega': C.vega
-        }
-    except Exception as e:
-        return {
-            'delta': None,
-            'gamma': None,
-            'theta': None,
-            'vega': None
-        }
+        row = bs_greeks(float(underlying_price), float(strike_price), float(interest_rate) / 100,
+                        float(days_to_expiry), float(implied_volatility) / 100,
+                        str(opt_type).lower().startswith('c')).iloc[0]
+    except (TypeError, ValueError):
+        row = pd.Series(np.nan, index=GREEK_COLUMNS)
+    return {k: (None if pd.isna(row[k]) else float(row[k])) for k in ('delta', 'gamma', 'theta', 'vega')}
@@ -0,0 +1,107 @@
+# iv.py
+# Batched implied-volatility solver for whole option chains
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from data.metrics import timed
+
+IV_LOW = 1e-4   # search bracket for sigma (decimal)
+IV_HIGH = 5.0
+MAX_ITER = 40   # fixed iteration budget per batch
+TOL = 1e-6      # absolute price tolerance
+
+_SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def _price_vega(spot, strike, disc, t, sigma, sign):
+    sqrt_t = np.sqrt(t)
+    vol_sqrt_t = sigma * sqrt_t
+    d1 = (np.log(spot / (strike * disc)) + 0.5 * vol_sqrt_t * vol_sqrt_t) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    price = sign * (spot * ndtr(sign * d1) - strike * disc * ndtr(sign * d2))
+    vega = spot * np.exp(-0.5 * d1 * d1) / _SQRT_2PI * sqrt_t
+    return price, vega
+
+
+@timed('iv.solve')
+def implied_vol(price, spot, strike, rate, dte, is_call=True, max_iter=MAX_ITER, tol=TOL):
+    """
+    Implied volatility (decimal) for arrays of option prices.
+
+    Newton steps on vega, kept inside a per-contract [lo, hi] bracket that
+    shrinks every iteration; whenever Newton would leave the bracket or
+    vega vanishes the step falls back to bisection. Every contract gets at
+    most `max_iter` iterations. Prices outside the no-arbitrage bounds,
+    non-positive inputs and unconverged contracts come back as NaN.
+    """
+    price, spot, strike, rate, dte, is_call = (a.ravel() for a in np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(spot, dtype=float),
+        np.asarray(strike, dtype=float), np.asarray(rate, dtype=float),
+        np.asarray(dte, dtype=float), np.asarray(is_call, dtype=bool)))
+    n = price.size
+    out = np.full(n, np.nan)
+
+    t = dte / 365.0
+    with np.errstate(invalid='ignore', over='ignore'):
+        disc = np.exp(-rate * t)
+        sign = np.where(is_call, 1.0, -1.0)
+        intrinsic = np.maximum(sign * (spot - strike * disc), 0.0)
+        upper = np.where(is_call, spot, strike * disc)
+        ok = (spot > 0) & (strike > 0) & (t > 0) & (price > intrinsic) & (price < upper)
+    idx = np.flatnonzero(ok)
+    if idx.size == 0:
+        return out
+
+    # Work only on the solvable subset
+    p, s, k, d, tt, sg = price[idx], spot[idx], strike[idx], disc[idx], t[idx], sign[idx]
+    lo = np.full(idx.size, IV_LOW)
+    hi = np.full(idx.size, IV_HIGH)
+    # Brenner-Subrahmanyam start, clipped into the bracket
+    sigma = np.clip(np.sqrt(2 * np.pi / tt) * p / s, 0.05, 2.0)
+    active = np.arange(idx.size)
+
+    for _ in range(max_iter):
+        f, vega = _price_vega(s[active], k[active], d[active], tt[active], sigma[active], sg[active])
+        diff = f - p[active]
+        done = np.abs(diff) < tol
+        # Price is increasing in sigma: tighten the bracket from the sign of the error
+        lo[active] = np.where(diff < 0, sigma[active], lo[active])
+        hi[active] = np.where(diff > 0, sigma[active], hi[active])
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = sigma[active] - diff / vega
+        inside = (newton > lo[active]) & (newton < hi[active]) & np.isfinite(newton)
+        sigma[active] = np.where(done, sigma[active],
+                                 np.where(inside, newton, 0.5 * (lo[active] + hi[active])))
+        out[idx[active[done]]] = sigma[active[done]]
+        active = active[~done]
+        if active.size == 0:
+            break
+    return out
+
+
+def chain_mid(chain, bid_col='bid', ask_col='ask', last_col='lastPrice'):
+    """Mid price per contract, falling back to last trade when the quote is one-sided."""
+    missing = pd.Series(np.nan, index=chain.index)
+    bid = pd.to_numeric(chain[bid_col], errors='coerce') if bid_col in chain.columns else missing
+    ask = pd.to_numeric(chain[ask_col], errors='coerce') if ask_col in chain.columns else missing
+    mid = (bid + ask) / 2
+    mid = mid.where((bid > 0) & (ask > 0) & (ask >= bid))
+    if last_col in chain.columns:
+        mid = mid.fillna(pd.to_numeric(chain[last_col], errors='coerce'))
+    return mid
+
+
+def chain_implied_vol(chain, spot, rate=0.05, type_col='type', strike_col='strike',
+                      dte_col='days_to_expiry', max_iter=MAX_ITER):
+    """
+    Solve IV from mid prices for a whole chain DataFrame in one batch.
+    Returns a decimal-IV Series aligned with `chain`.
+    """
+    if type_col in chain.columns:
+        is_call = chain[type_col].astype(str).str.lower().str.startswith('c').to_numpy()
+    else:
+        is_call = True
+    iv = implied_vol(chain_mid(chain).to_numpy(dtype=float), spot,
+                     pd.to_numeric(chain[strike_col], errors='coerce').to_numpy(dtype=float),
+                     rate, chain[dte_col].to_numpy(dtype=float), is_call, max_iter=max_iter)
+    return pd.Series(iv, index=chain.index, name='iv')
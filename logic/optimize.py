@@ -0,0 +1,221 @@
+# optimize.py
+# Weight and threshold search for the composite score, over backtest trades
+#
+# The trades from logic.backtest.collect() are reduced to one read-only float
+# matrix (sub-scores, sentiment inputs, P&L) placed in shared memory once;
+# pool workers map it instead of receiving copies. Configurations are pruned
+# by successive halving: everything is scored on a random sample of trades,
+# the best 1/eta go on to a sample eta times larger, and only the survivors
+# are scored on all trades.
+import argparse
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from data.metrics import timed
+from logic.scoring import (RUBRIC, SENTIMENT_WEIGHTS, SIGNAL_THRESHOLDS, WEIGHTS, composite_scores, rubric_mask,
+                           sentiment_scores)
+
+# Matrix layout: score inputs, then outcomes; the sentiment inputs are only present
+# when the trades carry them (no live sentiment source yet)
+SCORE_COLUMNS = ['tech_score', 'greeks_score', 'dte_score', 'Sentiment Score']
+SENTIMENT_INPUTS = ['vix', 'put_call', 'fg', 'macro_risk']
+OUTCOME_COLUMNS = ['pnl', 'return']
+
+# Metric over the trades a configuration labels with the target signal
+METRICS = {
+    'avg_return': lambda pnl, ret: ret.mean(),
+    'avg_pnl': lambda pnl, ret: pnl.mean(),
+    'total_pnl': lambda pnl, ret: pnl.sum(),
+    'hit_rate': lambda pnl, ret: (pnl > 0).mean(),
+    'sharpe': lambda pnl, ret: ret.mean() / ret.std() if ret.std() > 0 else 0.0,
+}
+
+ETA = 3          # successive halving: keep the best 1/ETA per rung, grow the sample ETA times
+RUNGS = 3
+MIN_TRADES = 30  # configurations labelling fewer trades than this (scaled per rung) are ranked last
+
+
+def weight_grid(keys, step):
+    """Every weight dict over `keys` with weights on a `step` lattice summing to 1."""
+    n = round(1 / step)
+    for head in itertools.product(range(n + 1), repeat=len(keys) - 1):
+        if sum(head) <= n:
+            yield dict(zip(keys, [round(k * step, 6) for k in head] + [round((n - sum(head)) * step, 6)]))
+
+
+def threshold_grid(buy=(65, 70, 75, 80), hold=(50, 55, 60), watch=(35, 40, 45)):
+    """SIGNAL_THRESHOLDS-shaped lists for every strictly decreasing BUY > HOLD > WATCH cutoff triple."""
+    for b, h, w in itertools.product(buy, hold, watch):
+        if b > h > w:
+            yield [('BUY', b), ('HOLD', h), ('WATCH', w)]
+
+
+def param_grid(step=0.1, sentiment_step=None, thresholds=None):
+    """
+    Configurations as (weights, sentiment_weights, thresholds) tuples.
+    sentiment_step=None keeps SENTIMENT_WEIGHTS fixed.
+    """
+    sentiment = list(weight_grid(list(SENTIMENT_WEIGHTS), sentiment_step)) if sentiment_step else [SENTIMENT_WEIGHTS]
+    thresholds = list(thresholds or threshold_grid())
+    return [(w, s, t) for w in weight_grid(list(WEIGHTS), step) for s in sentiment for t in thresholds]
+
+
+def trade_matrix(trades, rubric=RUBRIC, seed=0):
+    """
+    (matrix, columns) from backtest trades: rubric passes only (rubric=None
+    keeps all), rows in a seeded random order so every prefix is an unbiased
+    sample for the halving rungs.
+    """
+    if rubric is not None and len(trades):
+        trades = trades[rubric_mask(trades, rubric)]
+    columns = SCORE_COLUMNS + [c for c in SENTIMENT_INPUTS if c in trades.columns] + OUTCOME_COLUMNS
+    matrix = np.column_stack([pd.to_numeric(trades[c], errors='coerce').to_numpy(dtype=float) if c in trades.columns
+                              else np.zeros(len(trades)) for c in columns]) if len(trades) else np.empty((0, len(columns)))
+    matrix = matrix[np.random.default_rng(seed).permutation(len(matrix))]
+    return np.ascontiguousarray(np.nan_to_num(matrix)), columns
+
+
+# --- worker side -------------------------------------------------------------
+
+_shm = None
+_matrix = None
+_columns = None
+
+
+def _attach(name, shape, columns):
+    global _shm, _matrix, _columns
+    _shm = shared_memory.SharedMemory(name=name)
+    _matrix = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _columns = columns
+
+
+def _detach():
+    global _shm, _matrix
+    _matrix = None
+    _shm.close()
+    _shm = None
+
+
+def _evaluate(config, rows, metric, signal, min_trades):
+    weights, sentiment_weights, thresholds = config
+    m = _matrix[:rows]
+    col = {name: m[:, i] for i, name in enumerate(_columns)}
+    if all(c in col for c in SENTIMENT_INPUTS):
+        sentiment = sentiment_scores(*(col[c] for c in SENTIMENT_INPUTS), weights=sentiment_weights)
+    else:
+        sentiment = col['Sentiment Score']
+    score = composite_scores(col['tech_score'], col['greeks_score'], sentiment, col['dte_score'], weights)
+    # Signal bands straight from the cutoffs (the ROLL overlay does not change the base signal)
+    cutoffs = dict(thresholds)
+    above = [c for label, c in thresholds if c > cutoffs[signal]]
+    picked = (score >= cutoffs[signal]) & (score < min(above)) if above else score >= cutoffs[signal]
+    n = int(picked.sum())
+    if n < min_trades:
+        return -math.inf, n
+    return float(METRICS[metric](col['pnl'][picked], col['return'][picked])), n
+
+
+def _evaluate_chunk(configs, rows, metric, signal, min_trades):
+    return [_evaluate(c, rows, metric, signal, min_trades) for c in configs]
+
+
+# --- driver ------------------------------------------------------------------
+
+def _chunks(items, n):
+    size = max(1, math.ceil(len(items) / n))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+@timed('optimize.search')
+def optimize(trades, configs=None, metric='avg_return', signal='BUY', rubric=RUBRIC, workers=None,
+             eta=ETA, rungs=RUNGS, min_trades=MIN_TRADES, seed=0):
+    """
+    Rank `configs` (default param_grid()) by `metric` over the trades each
+    one labels `signal`. Returns a DataFrame, best first, with the weights,
+    thresholds, the metric, trade count and the rung each configuration
+    reached (pruned ones keep their last score). workers=0 runs inline.
+    """
+    configs = list(configs if configs is not None else param_grid())
+    matrix, columns = trade_matrix(trades, rubric, seed)
+    n = len(matrix)
+    sizes = [max(n // eta ** k, min(n, min_trades * eta)) for k in reversed(range(rungs))]
+    results = {}
+
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        np.ndarray(matrix.shape, dtype=np.float64, buffer=shm.buf)[:] = matrix
+        initargs = (shm.name, matrix.shape, columns)
+        pool = None
+        if workers == 0:
+            _attach(*initargs)
+        else:
+            workers = workers or os.cpu_count() or 1
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=initargs)
+        try:
+            alive = list(range(len(configs)))
+            for rung, rows in enumerate(sizes):
+                # Fewer rows means proportionally fewer labelled trades
+                need = max(1, round(min_trades * rows / n)) if n else min_trades
+                args = (rows, metric, signal, need)
+                if pool is None:
+                    scores = _evaluate_chunk([configs[i] for i in alive], *args)
+                else:
+                    chunks = _chunks(alive, workers * 4)
+                    futures = [pool.submit(_evaluate_chunk, [configs[i] for i in chunk], *args) for chunk in chunks]
+                    scores = [s for f in futures for s in f.result()]
+                for i, (value, count) in zip(alive, scores):
+                    results[i] = (value, count, rung)
+                if rung < len(sizes) - 1:
+                    ranked = sorted(alive, key=lambda i: results[i][0], reverse=True)
+                    alive = ranked[:max(1, math.ceil(len(alive) / eta))]
+        finally:
+            if pool is not None:
+                pool.shutdown()
+    finally:
+        if workers == 0:
+            _detach()
+        shm.close()
+        shm.unlink()
+
+    rows = []
+    for i, (value, count, rung) in results.items():
+        weights, sentiment_weights, thresholds = configs[i]
+        rows.append({**{f"w_{k}": v for k, v in weights.items()},
+                     **{f"s_{k}": v for k, v in sentiment_weights.items()},
+                     **{label.lower(): cutoff for label, cutoff in thresholds},
+                     metric: value, 'trades': count, 'rung': rung, 'config': i})
+    table = pd.DataFrame(rows)
+    return table.sort_values(['rung', metric], ascending=False, ignore_index=True)
+
+
+def best_params(table, configs):
+    """(weights, sentiment_weights, thresholds) of the top row of an optimize() table."""
+    return configs[int(table['config'].iloc[0])]
+
+
+if __name__ == '__main__':
+    from logic.backtest import HOLD_DAYS, collect
+    from logic.yfinance_options import TICKERS
+    parser = argparse.ArgumentParser(description='Search composite-score weights and signal thresholds')
+    parser.add_argument('--tickers', help='comma-separated (default: the dashboard universe)')
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--hold-days', type=int, default=HOLD_DAYS)
+    parser.add_argument('--metric', default='avg_return', choices=sorted(METRICS))
+    parser.add_argument('--signal', default='BUY', choices=[label for label, _ in SIGNAL_THRESHOLDS])
+    parser.add_argument('--step', type=float, default=0.1, help='weight lattice step')
+    parser.add_argument('--sentiment-step', type=float, help='also search sentiment weights on this step')
+    parser.add_argument('--all', action='store_true', help='use every candidate, not only rubric passes')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    tickers = args.tickers.split(',') if args.tickers else TICKERS
+    trades = collect(tickers, args.start, args.end, args.hold_days, workers=args.workers)
+    configs = param_grid(args.step, args.sentiment_step)
+    table = optimize(trades, configs, args.metric, args.signal, None if args.all else RUBRIC, args.workers)
+    print(f"{len(configs)} configurations over {len(trades)} trades")
+    print(table.drop(columns='config').head(args.top).to_string())
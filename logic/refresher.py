@@ -0,0 +1,243 @@
+# refresher.py
+# Background scan service: owns the scan schedule and publishes immutable result snapshots
+#
+# One Refresher per process runs the universe scan on its own thread (hot tickers
+# often, the rest on a slower cadence) no matter how many Streamlit sessions are
+# open. Pages only read latest(), which is a reference swap away from the last
+# finished cycle. Each snapshot is also written to the DiskCache, so a restarted
+# process, or one that only reads, serves the last scan right away.
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+import pandas as pd
+from data.book import book
+from data.metrics import metrics, timed
+from data.store import get_cache
+from logic.contract_index import contract_index
+from logic.scanner import Scanner
+from logic.yfinance_options import TICKERS, COLUMNS, get_option_candidates, refresh_bars, screen_candidates, universe_features
+
+# Schedule: hot tickers every HOT_INTERVAL seconds, the rest every COLD_INTERVAL.
+# Hot tickers only reuse cached chains younger than HOT_INTERVAL; cold ones use the store TTL.
+HOT_TICKERS = TICKERS[:10]
+HOT_INTERVAL = 60
+COLD_INTERVAL = 15 * 60
+
+# Scanner settings: worker pool size, per-ticker timeout (s), max ticker starts per second
+SCAN_WORKERS = 8
+SCAN_TIMEOUT = 20
+SCAN_RATE = 10
+
+# One published scan. `table` is the screened COLUMNS frame for the whole universe,
+# `scanned` maps ticker -> epoch seconds of its last good scan, `errors` ticker -> last error.
+# Snapshots are shared by every reader: treat the table as read-only.
+Snapshot = namedtuple('Snapshot', ['seq', 'taken_at', 'table', 'scanned', 'errors'])
+
+
+def _freeze(seq, taken_at, table, scanned, errors):
+    return Snapshot(seq, taken_at, table, MappingProxyType(dict(scanned)), MappingProxyType(dict(errors)))
+
+
+class Refresher:
+    """
+    Scan schedule plus latest-snapshot store.
+
+    Nothing runs until start() launches the daemon thread (idempotent);
+    cancel() aborts the cycle in progress (what finished is still
+    published) and stop() ends the service. Every cycle scans the
+    tickers that are due, keeps their screened rows, and publishes a new
+    Snapshot built from the latest rows of every ticker; rows of tickers not
+    due this cycle are carried over. The unscreened candidates go to `index`
+    (a ContractIndex) for screens with other thresholds. refresh_now() makes
+    everything due.
+    """
+
+    def __init__(self, tickers=TICKERS, hot=HOT_TICKERS, hot_interval=HOT_INTERVAL,
+                 cold_interval=COLD_INTERVAL, cache=None, index=None):
+        self.tickers = list(tickers)
+        self.hot = [t for t in self.tickers if t in set(hot)]
+        self.cold = [t for t in self.tickers if t not in set(hot)]
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self.cache = cache or get_cache()
+        self.index = index if index is not None else contract_index
+        self.progress = (0, 0, None)  # (done, total, last ticker) of the running cycle
+        self.busy = False
+        self._rows = {}
+        self._scanned = {}
+        self._errors = {}
+        self._due = {'hot': 0.0, 'cold': 0.0}
+        self._snapshot = None
+        self._book_seq = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._cancel = threading.Event()
+        self._force = threading.Event()
+
+    # --- readers -------------------------------------------------------------
+
+    def latest(self):
+        """Newest Snapshot: this process's last cycle, else the one on disk, else None."""
+        with self._lock:
+            snapshot = self._snapshot
+        return snapshot if snapshot is not None else self.load()
+
+    def wait(self, after_seq=0, timeout=None):
+        """Block until a snapshot newer than `after_seq` is published; returns latest()."""
+        with self._published:
+            self._published.wait_for(lambda: self._snapshot is not None and self._snapshot.seq > after_seq, timeout)
+        return self.latest()
+
+    def load(self):
+        meta = self.cache.get('refresher', 'universe', 'scan_meta', as_of='latest')
+        table = self.cache.get('refresher', 'universe', 'scan', as_of='latest')
+        if meta is None or table is None:
+            return None
+        return _freeze(meta['seq'], meta['taken_at'], table, meta['scanned'], meta['errors'])
+
+    # --- service -------------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._seed()
+            self._thread = threading.Thread(target=self._loop, name='refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._cancel.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def refresh_now(self):
+        # _due belongs to the loop thread; it consumes the flag at the top of its next pass
+        self._force.set()
+        self._wake.set()
+
+    def _seed(self):
+        # Carry the on-disk snapshot forward so the first cycle extends it rather than starting empty
+        previous = self.load()
+        if previous is None:
+            return
+        self._snapshot = previous
+        self._scanned = dict(previous.scanned)
+        self._errors = dict(previous.errors)
+        for ticker, rows in previous.table.groupby('Ticker', sort=False):
+            self._rows[ticker] = rows.reset_index(drop=True)
+        now = time.time()
+        last_hot = min((self._scanned.get(t, 0.0) for t in self.hot), default=now)
+        last_cold = min((self._scanned.get(t, 0.0) for t in self.cold), default=now)
+        self._due = {'hot': last_hot + self.hot_interval, 'cold': last_cold + self.cold_interval}
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.time()
+            forced = self._force.is_set()
+            self._force.clear()
+            due = []
+            if forced or now >= self._due['hot']:
+                due += self.hot
+                self._due['hot'] = now + self.hot_interval
+            if forced or now >= self._due['cold']:
+                due += self.cold
+                self._due['cold'] = now + self.cold_interval
+            if due:
+                try:
+                    self.run_once(due)
+                except Exception as e:
+                    metrics.count('refresher.failed')
+                    print(f"Refresher cycle failed: {e}")
+                continue
+            self._wake.wait(max(min(self._due.values()) - time.time(), 0.0))
+            self._wake.clear()
+
+    @timed('refresher.cycle')
+    def run_once(self, tickers):
+        """Scan `tickers` now and publish the resulting snapshot (partial if cancelled)."""
+        self._cancel.clear()
+        self.busy = True
+        self.progress = (0, len(tickers), None)
+        try:
+            self._scan(tickers)
+        finally:
+            self.busy = False
+        if self._cancel.is_set():
+            metrics.count('refresher.cancelled')
+        return self.publish()
+
+    def _scan(self, tickers):
+        # Closing the scan generators early shuts their pools down and drops queued tickers
+        bar_scanner = Scanner(refresh_bars, max_workers=SCAN_WORKERS, timeout=SCAN_TIMEOUT, rate=SCAN_RATE)
+        results = bar_scanner.scan(tickers)
+        try:
+            for _ in results:
+                if self._cancel.is_set():
+                    return
+        finally:
+            results.close()
+        features = universe_features(tickers)
+
+        hot = set(self.hot)
+
+        def scan_ticker(ticker):
+            feats = features.loc[ticker] if ticker in features.index else None
+            return get_option_candidates(ticker, feats, max_age=self.hot_interval if ticker in hot else None)
+
+        scanner = Scanner(scan_ticker, max_workers=SCAN_WORKERS, timeout=SCAN_TIMEOUT, rate=SCAN_RATE)
+        results = scanner.scan(tickers)
+        try:
+            for i, result in enumerate(results, start=1):
+                if result.error:
+                    # Failed or timed out: the last good rows stay published
+                    self._errors[result.ticker] = result.error
+                else:
+                    self._rows[result.ticker] = screen_candidates(result.rows)
+                    self._scanned[result.ticker] = time.time()
+                    self._errors.pop(result.ticker, None)
+                    # Unscreened candidates feed the contract index, so other rubrics need no rescan
+                    self.index.upsert(result.ticker, result.rows)
+                self.progress = (i, len(tickers), result.ticker)
+                if self._cancel.is_set():
+                    return
+        finally:
+            results.close()
+
+    def publish(self):
+        parts = [self._rows[t] for t in self.tickers if t in self._rows and len(self._rows[t])]
+        table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=COLUMNS)
+        with self._lock:
+            seq = (self._snapshot.seq if self._snapshot is not None else 0) + 1
+        snapshot = _freeze(seq, time.time(), table, self._scanned, self._errors)
+        # Streamed quotes newer than the chains patch bid/ask in the index
+        self._book_seq, quotes = book.snapshot(self._book_seq, contracts=True)
+        self.index.apply_quotes(quotes)
+        self.index.save()
+        # Table first: a reader that sees the new meta always finds a table at least as new
+        self.cache.put('refresher', 'universe', 'scan', table, as_of='latest')
+        self.cache.put('refresher', 'universe', 'scan_meta', {
+            'seq': seq, 'taken_at': snapshot.taken_at,
+            'scanned': dict(snapshot.scanned), 'errors': dict(snapshot.errors)}, as_of='latest')
+        with self._published:
+            self._snapshot = snapshot
+            self._published.notify_all()
+        metrics.count('refresher.published')
+        return snapshot
+
+
+# Process-wide instance; the dashboard starts and cancels it on request
+refresher = Refresher()
@@ -0,0 +1,147 @@
+# scanner.py
+# Concurrent universe scanner: fans tickers out over a bounded worker pool
+import asyncio
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# One finished ticker. `rows` is whatever the scan function returned,
+# `error` is None, 'timeout' or the exception text.
+ScanResult = namedtuple('ScanResult', ['ticker', 'rows', 'error', 'elapsed'])
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all workers: at most `rate` task starts per second,
+    with bursts up to `burst`. rate=None disables limiting.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # Take a token and return how long the caller must wait for it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        if not self.rate:
+            return
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        if not self.rate:
+            return
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class Scanner:
+    """
+    Run `scan_fn(ticker)` for every ticker with at most `max_workers` in flight.
+
+    Results stream back in completion order, so a slow symbol never blocks the
+    ones behind it. A ticker that runs longer than `timeout` seconds is reported
+    as a timeout and skipped; its worker thread cannot be killed, so it keeps its
+    slot until the underlying call returns.
+    """
+
+    def __init__(self, scan_fn, max_workers=8, timeout=20, rate=None, burst=None):
+        self.scan_fn = scan_fn
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate, burst or max_workers)
+
+    def _run(self, ticker, started):
+        self.limiter.acquire()
+        started[ticker] = time.monotonic()
+        return self.scan_fn(ticker)
+
+    def scan(self, tickers):
+        """Generator of ScanResult, yielded as each ticker finishes."""
+        started = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scanner')
+        pending = {executor.submit(self._run, t, started): t for t in tickers}
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=self._next_deadline(pending, started), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    ticker = pending.pop(fut)
+                    yield self._result(ticker, fut, started)
+                now = time.monotonic()
+                for fut, ticker in list(pending.items()):
+                    t0 = started.get(ticker)
+                    if self.timeout and t0 is not None and now - t0 >= self.timeout:
+                        pending.pop(fut)
+                        fut.cancel()
+                        yield ScanResult(ticker, [], 'timeout', now - t0)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _next_deadline(self, pending, started):
+        # Wake up when the oldest running ticker hits its timeout
+        if not self.timeout:
+            return None
+        now = time.monotonic()
+        running = [started[t] for t in pending.values() if t in started]
+        if not running:
+            return min(self.timeout, 0.5)
+        return max(min(running) + self.timeout - now, 0.0)
+
+    def _result(self, ticker, fut, started):
+        elapsed = time.monotonic() - started.get(ticker, time.monotonic())
+        try:
+            return ScanResult(ticker, fut.result(), None, elapsed)
+        except Exception as e:
+            return ScanResult(ticker, [], str(e), elapsed)
+
+    def scan_all(self, tickers):
+        return list(self.scan(tickers))
+
+    async def scan_async(self, tickers, executor=None):
+        """
+        Async generator flavour of scan(). Blocking scan functions run in
+        `executor` (the loop default if None); coroutine functions (e.g.
+        AsyncOptionAProvider methods) are awaited on the running loop.
+        Concurrency is capped by a semaphore instead of the pool size.
+        """
+        loop = asyncio.get_running_loop()
+        sem = asyncio.Semaphore(self.max_workers)
+
+        async def one(ticker):
+            async with sem:
+                await self.limiter.acquire_async()
+                t0 = time.monotonic()
+                try:
+                    if asyncio.iscoroutinefunction(self.scan_fn):
+                        call = self.scan_fn(ticker)
+                    else:
+                        call = loop.run_in_executor(executor, self.scan_fn, ticker)
+                    rows = await asyncio.wait_for(call, self.timeout)
+                    return ScanResult(ticker, rows, None, time.monotonic() - t0)
+                except asyncio.TimeoutError:
+                    return ScanResult(ticker, [], 'timeout', time.monotonic() - t0)
+                except Exception as e:
+                    return ScanResult(ticker, [], str(e), time.monotonic() - t0)
+
+        tasks = [asyncio.ensure_future(one(t)) for t in tickers]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for task in tasks:
+                task.cancel()
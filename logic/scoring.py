@@ -1,61 +1,205 @@
 # scoring.py
 # Sub-scores & composite scoring logic for signals
+# Scalar functions score one contract; the *_scores functions do the same over
+# whole candidate frames with array operations. Thresholds and weights live in
+# the dicts below so callers can pass their own.
+import numpy as np
+import pandas as pd
+from data.metrics import timed
 
-def technical_score(ma_alignment, rsi, macd, vol_ratio):
+# Strict rubric for candidate contracts (IV in percent, spread as a fraction of mid)
+RUBRIC = {
+    'delta': (0.45, 0.60),
+    'theta_min': -0.03,
+    'gamma': (0.005, 0.015),
+    'iv': (20, 55),
+    'oi_min': 1000,
+    'spread_max': 0.05,
+}
+
+# Weights: Technicals 35%, Greeks 35%, Sentiment 20%, DTE 10%
+WEIGHTS = {'tech': 0.35, 'greeks': 0.35, 'sentiment': 0.2, 'dte': 0.1}
+
+# Sentiment inputs: VIX 30%, Put/Call 30%, Fear & Greed 30%, Macro 10%
+SENTIMENT_WEIGHTS = {'vix': 0.3, 'put_call': 0.3, 'fg': 0.3, 'macro_risk': 0.1}
+
+# Lowest score for each signal, best first; anything below is SELL
+SIGNAL_THRESHOLDS = [('BUY', 75), ('HOLD', 60), ('WATCH', 45)]
+
+# ROLL rule: good score but fast decay or close to expiry
+ROLL_RULE = {'min_score': 60, 'theta_below': -0.15, 'dte_below': 7}
+
+# Technical sub-score: MA alignment +/-, RSI points above 50 (capped), MACD up, volume surge
+TECH_RULES = {'ma_points': 20, 'rsi_center': 50, 'rsi_divisor': 2, 'rsi_cap': 15,
+              'macd_points': 10, 'vol_ratio_min': 1.5, 'vol_points': 15}
+
+# Greeks sub-score: delta sweet spot / penalty band, theta offset, gamma, IV week-over-week,
+# wide spread penalty, breakeven within one expected move
+GREEKS_RULES = {'delta_good': (0.45, 0.60), 'delta_good_points': 20, 'delta_bad': (0.35, 0.70),
+                'delta_bad_points': -10, 'theta_offset': 10, 'gamma_points': 5, 'iv_wow_min': 0.10,
+                'iv_wow_points': 10, 'spread_max': 0.10, 'spread_points': -10,
+                'be_reach_max': 1.0, 'be_reach_points': 10}
+
+# DTE sub-score: flat penalty under dte_min, else points per dte_span days
+DTE_RULES = {'dte_min': 7, 'short_points': -20, 'points': 10, 'dte_span': 30}
+
+def technical_score(ma_alignment, rsi, macd, vol_ratio, rules=TECH_RULES):
     # Example: 20>50>200 bonus, 20<50<200 penalty, RSI zone, MACD up, VolumeRatio bonus
+    # Labels are case-insensitive ('Bullish' and 'bullish' score the same)
+    ma_alignment, macd = str(ma_alignment).lower(), str(macd).lower()
     score = 0
     if ma_alignment == 'bullish':
-        score += 20
+        score += rules['ma_points']
     elif ma_alignment == 'bearish':
-        score -= 20
-    score += min(max((rsi-50)/2, 0), 15)  # RSI zone
+        score -= rules['ma_points']
+    score += min(max((rsi - rules['rsi_center']) / rules['rsi_divisor'], 0), rules['rsi_cap'])  # RSI zone
     if macd == 'up':
-        score += 10
-    if vol_ratio >= 1.5:
-        score += 15
+        score += rules['macd_points']
+    if vol_ratio >= rules['vol_ratio_min']:
+        score += rules['vol_points']
     return max(score, 0)
 
-def greeks_score(delta, theta, gamma, iv_wow, bid_ask):
+def greeks_score(delta, theta, gamma, iv_wow, bid_ask, be_reach=None, rules=GREEKS_RULES):
+    # be_reach: distance to breakeven in expected moves (logic.analytics), bonus when within one
     score = 0
-    if 0.45 <= delta <= 0.60:
-        score += 20
-    elif delta < 0.35 or delta > 0.70:
-        score -= 10
-    score += max(10 + theta, 0)  # Closer to 0 is better
+    lo, hi = rules['delta_good']
+    bad_lo, bad_hi = rules['delta_bad']
+    if lo <= delta <= hi:
+        score += rules['delta_good_points']
+    elif delta < bad_lo or delta > bad_hi:
+        score += rules['delta_bad_points']
+    score += max(rules['theta_offset'] + theta, 0)  # Closer to 0 is better
     if gamma > 0:
-        score += 5
-    if iv_wow >= 0.10:
-        score += 10
-    if bid_ask > 0.10:
-        score -= 10
+        score += rules['gamma_points']
+    if iv_wow >= rules['iv_wow_min']:
+        score += rules['iv_wow_points']
+    if bid_ask > rules['spread_max']:
+        score += rules['spread_points']
+    if be_reach is not None and be_reach <= rules['be_reach_max']:
+        score += rules['be_reach_points']
     return max(score, 0)
 
-def sentiment_score(vix, put_call, fg, macro_risk):
-    # Weighted: VIX 30%, Put/Call 30%, F&G 30%, Macro 10%
-    score = 0.3*vix + 0.3*put_call + 0.3*fg + 0.1*macro_risk
+def sentiment_score(vix, put_call, fg, macro_risk, weights=SENTIMENT_WEIGHTS):
+    score = weights['vix']*vix + weights['put_call']*put_call + weights['fg']*fg + weights['macro_risk']*macro_risk
     return int(score)
 
-def dte_score(dte):
+def dte_score(dte, rules=DTE_RULES):
     # Linear penalty as DTE approaches 0; steeper <7
-    if dte < 7:
-        return -20
-    return int(10 * dte / 30)
+    if dte < rules['dte_min']:
+        return rules['short_points']
+    return int(rules['points'] * dte / rules['dte_span'])
 
-def composite_score(tech, greeks, sentiment, dte):
-    # Weights: Technicals 35%, Greeks 35%, Sentiment 20%, DTE 10%
-    return int(0.35*tech + 0.35*greeks + 0.2*sentiment + 0.1*dte)
+def composite_score(tech, greeks, sentiment, dte, weights=WEIGHTS):
+    return int(weights['tech']*tech + weights['greeks']*greeks + weights['sentiment']*sentiment + weights['dte']*dte)
 
-def signal_from_score(score, theta, dte):
+def signal_from_score(score, theta, dte, thresholds=SIGNAL_THRESHOLDS, roll=ROLL_RULE):
     # Map to signals
-    if score >= 75:
-        sig = 'BUY'
-    elif score >= 60:
-        sig = 'HOLD'
-    elif score >= 45:
-        sig = 'WATCH'
-    else:
-        sig = 'SELL'
+    sig = 'SELL'
+    for label, cutoff in thresholds:
+        if score >= cutoff:
+            sig = label
+            break
     # ROLL rule
-    if score >= 60 and (theta < -0.15 or dte < 7):
+    if score >= roll['min_score'] and (theta < roll['theta_below'] or dte < roll['dte_below']):
         sig += ' + ROLL'
     return sig
+
+# --- Columnar versions -------------------------------------------------------
+
+def _col(df, name, default=np.nan):
+    if name in df.columns:
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+    return np.full(len(df), default, dtype=float)
+
+def _text(df, name):
+    if name in df.columns:
+        return df[name].astype(str).str.lower().to_numpy()
+    return np.full(len(df), '', dtype=object)
+
+def rubric_mask(df, rubric=RUBRIC):
+    """
+    Boolean Series: rows passing the strict rubric.
+    Uses columns delta, theta, gamma, iv (percent), oi and spread_pct;
+    a missing value fails its check, except a missing spread which passes
+    (as in the original per-row filter).
+    """
+    delta, theta, gamma = _col(df, 'delta'), _col(df, 'theta'), _col(df, 'gamma')
+    iv, oi, spread = _col(df, 'iv'), _col(df, 'oi'), _col(df, 'spread_pct')
+    lo, hi = rubric['delta']
+    mask = (delta >= lo) & (delta <= hi)
+    mask &= theta >= rubric['theta_min']
+    lo, hi = rubric['gamma']
+    mask &= (gamma >= lo) & (gamma <= hi)
+    lo, hi = rubric['iv']
+    mask &= (iv >= lo) & (iv <= hi)
+    mask &= oi >= rubric['oi_min']
+    mask &= ~(spread > rubric['spread_max'])
+    return pd.Series(mask, index=df.index)
+
+def technical_scores(df, rules=TECH_RULES):
+    # Columns: 'MA Trend', 'RSI', 'MACD', 'VolRatio' (as produced by features.panel_features)
+    trend, macd = _text(df, 'MA Trend'), _text(df, 'MACD')
+    points = float(rules['ma_points'])
+    score = np.where(trend == 'bullish', points, np.where(trend == 'bearish', -points, 0.0))
+    score += np.nan_to_num(np.clip((_col(df, 'RSI') - rules['rsi_center']) / rules['rsi_divisor'], 0, rules['rsi_cap']))
+    score += np.where(macd == 'up', float(rules['macd_points']), 0.0)
+    score += np.where(_col(df, 'VolRatio') >= rules['vol_ratio_min'], float(rules['vol_points']), 0.0)
+    return np.maximum(score, 0)
+
+def greeks_scores(df, rules=GREEKS_RULES):
+    # Columns: delta, theta, gamma, iv_wow, spread_pct, and be_reach from logic.analytics
+    # (breakeven within one expected move earns a bonus; frames without it score as before)
+    delta, theta = _col(df, 'delta'), _col(df, 'theta')
+    lo, hi = rules['delta_good']
+    bad_lo, bad_hi = rules['delta_bad']
+    score = np.where((delta >= lo) & (delta <= hi), float(rules['delta_good_points']),
+                     np.where((delta < bad_lo) | (delta > bad_hi), float(rules['delta_bad_points']), 0.0))
+    score += np.nan_to_num(np.maximum(rules['theta_offset'] + theta, 0))
+    score += np.where(_col(df, 'gamma') > 0, float(rules['gamma_points']), 0.0)
+    score += np.where(_col(df, 'iv_wow') >= rules['iv_wow_min'], float(rules['iv_wow_points']), 0.0)
+    score += np.where(_col(df, 'spread_pct') > rules['spread_max'], float(rules['spread_points']), 0.0)
+    score += np.where(_col(df, 'be_reach') <= rules['be_reach_max'], float(rules['be_reach_points']), 0.0)
+    return np.maximum(score, 0)
+
+def sentiment_scores(vix, put_call, fg, macro_risk, weights=SENTIMENT_WEIGHTS):
+    score = sum(weights[k] * np.asarray(v, dtype=float)
+                for k, v in (('vix', vix), ('put_call', put_call), ('fg', fg), ('macro_risk', macro_risk)))
+    return np.trunc(score)
+
+def dte_scores(dte, rules=DTE_RULES):
+    dte = np.asarray(dte, dtype=float)
+    return np.where(dte < rules['dte_min'], rules['short_points'],
+                    np.floor(rules['points'] * np.nan_to_num(dte) / rules['dte_span'])).astype(int)
+
+def composite_scores(tech, greeks, sentiment, dte, weights=WEIGHTS):
+    score = (weights['tech'] * np.asarray(tech) + weights['greeks'] * np.asarray(greeks)
+             + weights['sentiment'] * np.nan_to_num(np.asarray(sentiment, dtype=float))
+             + weights['dte'] * np.asarray(dte))
+    return np.trunc(score).astype(int)
+
+def signals_from_scores(score, theta, dte, thresholds=SIGNAL_THRESHOLDS, roll=ROLL_RULE):
+    score = np.asarray(score)
+    conds = [score >= cutoff for _, cutoff in thresholds]
+    sig = np.select(conds, [label for label, _ in thresholds], 'SELL').astype(object)
+    rolling = (score >= roll['min_score']) & ((np.asarray(theta, dtype=float) < roll['theta_below'])
+                                             | (np.asarray(dte, dtype=float) < roll['dte_below']))
+    sig[rolling] = sig[rolling] + ' + ROLL'
+    return sig
+
+@timed('scoring.score_frame')
+def score_frame(df, weights=WEIGHTS, thresholds=SIGNAL_THRESHOLDS, roll=ROLL_RULE,
+                tech_rules=TECH_RULES, greeks_rules=GREEKS_RULES, dte_rules=DTE_RULES):
+    """
+    Sub-scores, composite score and signal for every row of a candidate frame.
+    Returns a copy of df with tech_score, greeks_score, dte_score,
+    'Signal Score' and 'Signal' columns; 'Sentiment Score' is used if present.
+    """
+    out = df.copy()
+    dte = _col(df, 'dte')
+    out['tech_score'] = technical_scores(df, tech_rules)
+    out['greeks_score'] = greeks_scores(df, greeks_rules)
+    out['dte_score'] = dte_scores(dte, dte_rules)
+    sentiment = _col(df, 'Sentiment Score', 0.0)
+    out['Signal Score'] = composite_scores(out['tech_score'], out['greeks_score'], sentiment, out['dte_score'], weights)
+    out['Signal'] = signals_from_scores(out['Signal Score'], _col(df, 'theta'), dte, thresholds, roll)
+    return out
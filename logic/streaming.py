@@ -0,0 +1,377 @@
+# streaming.py
+# Stateful indicators with O(1) updates per bar/trade, for live streams
+# Each indicator matches its pandas counterpart in logic.features; bootstrap()
+# seeds the state from a historical series in one vectorized pass, update()
+# commits one bar and peek() gives the value a bar would produce without
+# committing it (used for today's still-forming daily bar).
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from logic import features
+
+
+class EMA:
+    # Same recursion as features.ema (ewm adjust=False, seeded with the first value)
+    def __init__(self, window):
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.value = None
+
+    def peek(self, x):
+        return x if self.value is None else self.value + self.alpha * (x - self.value)
+
+    def update(self, x):
+        self.value = self.peek(x)
+        return self.value
+
+    def bootstrap(self, series):
+        series = series.dropna()
+        self.value = float(features.ema(series, self.window).iloc[-1]) if len(series) else None
+        return self.value
+
+
+class SMA:
+    # Running sum over a fixed window; None until the window is full, like rolling().mean()
+    def __init__(self, window):
+        self.window = window
+        self._buf = deque(maxlen=window)
+        self._sum = 0.0
+
+    @property
+    def value(self):
+        return self._sum / self.window if len(self._buf) == self.window else None
+
+    def peek(self, x):
+        if len(self._buf) < self.window - 1:
+            return None
+        dropped = self._buf[0] if len(self._buf) == self.window else 0.0
+        return (self._sum - dropped + x) / self.window
+
+    def update(self, x):
+        if len(self._buf) == self.window:
+            self._sum -= self._buf[0]
+        self._buf.append(x)
+        self._sum += x
+        return self.value
+
+    def bootstrap(self, series):
+        tail = series.dropna().to_numpy(dtype=float)[-self.window:]
+        self._buf = deque(tail, maxlen=self.window)
+        self._sum = float(tail.sum())
+        return self.value
+
+
+def _rsi(gain, loss):
+    # features.rsi: inf RS (no losses) is 100, no movement at all is undefined
+    if loss == 0:
+        return 100.0 if gain > 0 else None
+    return 100 - 100 / (1 + gain / loss)
+
+
+class RSI:
+    # RSI on simple rolling means of gains and losses, matches features.rsi (the dashboard column)
+    def __init__(self, window=14):
+        self.window = window
+        self.gains = SMA(window)
+        self.losses = SMA(window)
+        self._prev = None
+
+    def _move(self, x):
+        # features.rsi counts the first bar as a zero move
+        d = 0.0 if self._prev is None else x - self._prev
+        return max(d, 0.0), max(-d, 0.0)
+
+    @property
+    def value(self):
+        gain, loss = self.gains.value, self.losses.value
+        return None if gain is None else _rsi(gain, loss)
+
+    def peek(self, x):
+        g, l = self._move(x)
+        gain, loss = self.gains.peek(g), self.losses.peek(l)
+        return None if gain is None else _rsi(gain, loss)
+
+    def update(self, x):
+        g, l = self._move(x)
+        self.gains.update(g)
+        self.losses.update(l)
+        self._prev = x
+        return self.value
+
+    def bootstrap(self, series):
+        series = series.dropna()
+        delta = series.diff()
+        self.gains.bootstrap(delta.where(delta > 0, 0))
+        self.losses.bootstrap(-delta.where(delta < 0, 0))
+        self._prev = float(series.iloc[-1]) if len(series) else None
+        return self.value
+
+
+class WilderRSI:
+    # Wilder RSI, matches features.rsi_wilder
+    def __init__(self, window=14):
+        self.window = window
+        self._prev = None
+        self._gain = None
+        self._loss = None
+        self._count = 0
+
+    @property
+    def value(self):
+        if self._count < self.window or self._gain is None:
+            return None
+        if self._loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self._gain / self._loss)
+
+    def update(self, x):
+        if self._prev is not None:
+            d = x - self._prev
+            g, l = max(d, 0.0), max(-d, 0.0)
+            if self._gain is None:
+                self._gain, self._loss = g, l
+            else:
+                a = 1.0 / self.window
+                self._gain += a * (g - self._gain)
+                self._loss += a * (l - self._loss)
+            self._count += 1
+        self._prev = x
+        return self.value
+
+    def bootstrap(self, series):
+        series = series.dropna()
+        if len(series) == 0:
+            return None
+        delta = series.diff()
+        a = 1.0 / self.window
+        self._gain = float(delta.clip(lower=0).ewm(alpha=a, adjust=False).mean().iloc[-1]) if len(series) > 1 else None
+        self._loss = float((-delta.clip(upper=0)).ewm(alpha=a, adjust=False).mean().iloc[-1]) if len(series) > 1 else None
+        self._prev = float(series.iloc[-1])
+        self._count = len(series) - 1
+        return self.value
+
+
+class MACD:
+    # MACD line and signal line, matches features.macd
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = EMA(fast), EMA(slow), EMA(signal)
+
+    @property
+    def value(self):
+        if self.signal.value is None:
+            return None
+        return self.fast.value - self.slow.value, self.signal.value
+
+    def peek(self, x):
+        if self.signal.value is None:
+            return None
+        line = self.fast.peek(x) - self.slow.peek(x)
+        return line, self.signal.peek(line)
+
+    def update(self, x):
+        line = self.fast.update(x) - self.slow.update(x)
+        self.signal.update(line)
+        return self.value
+
+    def bootstrap(self, series):
+        series = series.dropna()
+        if len(series) == 0:
+            return None
+        line, signal = features.macd(series, self.fast.window, self.slow.window, self.signal.window)
+        self.fast.bootstrap(series)
+        self.slow.bootstrap(series)
+        self.signal.value = float(signal.iloc[-1])
+        return self.value
+
+
+class VWAP:
+    # Session VWAP; reset() at the start of each session
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._pv = 0.0
+        self._v = 0.0
+
+    @property
+    def value(self):
+        return self._pv / self._v if self._v else None
+
+    def update(self, price, volume):
+        self._pv += price * volume
+        self._v += volume
+        return self.value
+
+    def bootstrap(self, prices, volumes):
+        self._pv = float((prices * volumes).sum())
+        self._v = float(volumes.sum())
+        return self.value
+
+
+class VolumeRatio:
+    # Latest volume over the mean of the last `window` volumes (latest included)
+    def __init__(self, window=30):
+        self.avg = SMA(window)
+        self.last = None
+
+    @property
+    def value(self):
+        avg = self.avg.value
+        return self.last / avg if avg else None
+
+    def peek(self, volume):
+        avg = self.avg.peek(volume)
+        return volume / avg if avg else None
+
+    def update(self, volume):
+        self.last = volume
+        self.avg.update(volume)
+        return self.value
+
+    def bootstrap(self, volumes):
+        volumes = volumes.dropna()
+        self.avg.bootstrap(volumes)
+        self.last = float(volumes.iloc[-1]) if len(volumes) else None
+        return self.value
+
+
+class TickerIndicators:
+    """All dashboard indicators for one ticker."""
+
+    def __init__(self):
+        self.ema20 = EMA(20)
+        self.ema50 = EMA(50)
+        self.sma200 = SMA(200)
+        self.rsi = RSI(14)
+        self.macd = MACD()
+        self.vwap = VWAP()
+        self.vol_ratio = VolumeRatio(30)
+        self.session = None
+
+    def on_bar(self, close, volume=0.0):
+        """Feed one completed bar."""
+        for ind in (self.ema20, self.ema50, self.sma200, self.rsi, self.macd):
+            ind.update(close)
+        self.vol_ratio.update(volume)
+
+    def on_trade(self, price, size, ts=None):
+        """Feed one trade (VWAP only); ts starts a new session when the date changes."""
+        if ts is not None:
+            day = pd.Timestamp(ts).date()
+            if day != self.session:
+                self.session = day
+                self.vwap.reset()
+        self.vwap.update(price, size)
+
+    def bootstrap(self, close, volume=None):
+        for ind in (self.ema20, self.ema50, self.sma200, self.rsi, self.macd):
+            ind.bootstrap(close)
+        if volume is not None:
+            self.vol_ratio.bootstrap(volume)
+
+    def live(self, close, volume):
+        """
+        Dashboard feature columns (logic.features.FEATURE_COLUMNS, without
+        Support/Resistance) if the next daily bar closed at `close` with
+        `volume`, without committing it.
+        """
+        ema20, ema50, sma200 = self.ema20.peek(close), self.ema50.peek(close), self.sma200.peek(close)
+        macd = self.macd.peek(close)
+        trend = 'Neutral'
+        if None not in (ema20, ema50, sma200):
+            if ema20 > ema50 > sma200:
+                trend = 'Bullish'
+            elif ema20 < ema50 < sma200:
+                trend = 'Bearish'
+        return {
+            'VolRatio': self.vol_ratio.peek(volume), '20EMA': ema20, '50EMA': ema50, '200SMA': sma200,
+            'MA Trend': trend, 'RSI': self.rsi.peek(close),
+            'MACD': None if macd is None else ('Up' if macd[0] > 0 else 'Down'),
+        }
+
+    def snapshot(self):
+        macd = self.macd.value
+        return {
+            '20EMA': self.ema20.value, '50EMA': self.ema50.value, '200SMA': self.sma200.value,
+            'RSI': self.rsi.value, 'MACD': macd[0] if macd else None,
+            'MACD Signal': macd[1] if macd else None,
+            'VWAP': self.vwap.value, 'VolRatio': self.vol_ratio.value,
+        }
+
+
+# Intraday bar size the engine listens to; each close moves today's provisional daily bar
+LIVE_INTERVAL = 60
+
+
+class IndicatorEngine:
+    """
+    Per-ticker daily indicator state, kept live from the tick aggregator.
+
+    bootstrap() seeds a ticker from its completed daily bars. on_bar_close()
+    is registered on data.ticks.BarAggregator and gets every closed
+    LIVE_INTERVAL bar: its close becomes today's provisional daily close and
+    its volume is added to today's volume, so live() costs O(1) per ticker.
+    When the trade date changes, the finished day is committed with update().
+    """
+
+    def __init__(self, interval=LIVE_INTERVAL):
+        self.interval = interval
+        self.tickers = {}
+        self._today = {}    # ticker -> [day, close, volume] of the forming daily bar
+        self._lock = threading.Lock()
+
+    def state(self, ticker):
+        if ticker not in self.tickers:
+            self.tickers[ticker] = TickerIndicators()
+        return self.tickers[ticker]
+
+    def bootstrap(self, ticker, close, volume=None):
+        """Seed from completed daily bars (today's partial bar excluded)."""
+        with self._lock:
+            self.tickers[ticker] = TickerIndicators()
+            self.tickers[ticker].bootstrap(close, volume)
+            self._today.pop(ticker, None)
+
+    def on_bar(self, ticker, close, volume=0.0):
+        with self._lock:
+            self.state(ticker).on_bar(close, volume)
+
+    def on_trade(self, ticker, price, size, ts=None):
+        with self._lock:
+            self.state(ticker).on_trade(price, size, ts)
+
+    def on_bar_close(self, symbol, interval, row):
+        # BarAggregator listener; runs on the WS thread, so O(1) and only for bootstrapped tickers
+        if interval != self.interval:
+            return
+        with self._lock:
+            state = self.tickers.get(symbol)
+            if state is None:
+                return
+            start, close, volume = row[0], row[4], row[5]
+            day = int(start // 86_400_000)
+            today = self._today.get(symbol)
+            if today is not None and today[0] != day:
+                state.on_bar(today[1], today[2])
+                today = None
+            if today is None:
+                today = self._today[symbol] = [day, close, 0.0]
+            today[1] = close
+            today[2] += volume
+
+    def live(self, ticker):
+        """Feature columns with today's bar so far, or None if the ticker has no live bars."""
+        with self._lock:
+            state, today = self.tickers.get(ticker), self._today.get(ticker)
+            if state is None or today is None:
+                return None
+            return state.live(today[1], today[2])
+
+    def snapshot(self):
+        with self._lock:
+            return {t: s.snapshot() for t, s in self.tickers.items()}
+
+
+# Process-wide engine; polygon_ws bootstraps streamed tickers and feeds it aggregator bar closes
+engine = IndicatorEngine()
@@ -1,22 +1,121 @@
-import yfinance as yf
 import pandas as pd
-import datetime
+import numpy as np
+from logic.analytics import analytics_frame, key_levels
+from logic.features import FEATURE_COLUMNS, panel_features
+from logic.scoring import RUBRIC, WEIGHTS, rubric_mask, score_frame
+from data.provider import get_provider
+from data.chains import chain_loader, delta_band, moneyness_slice
+from data.schema import strike_price
+from data.ticks import aggregator
+from logic.streaming import engine
+from data.metrics import timed
+
+_provider = get_provider()
+
+# Top 100 US stocks by market cap (example, can be replaced with dynamic list)
+TICKERS = [
+    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'BRK-B', 'UNH', 'LLY', 'JPM', 'V', 'XOM', 'MA', 'AVGO', 'JNJ', 'PG', 'HD', 'MRK', 'COST',
+    'ABBV', 'CVX', 'ADBE', 'PEP', 'KO', 'WMT', 'CRM', 'MCD', 'BAC', 'TMO', 'DIS', 'CSCO', 'ACN', 'ABT', 'LIN', 'DHR', 'VZ', 'NFLX', 'NKE', 'TXN', 'NEE',
+    'WFC', 'AMD', 'BMY', 'PM', 'AMGN', 'INTC', 'LOW', 'QCOM', 'HON', 'UNP', 'RTX', 'SBUX', 'IBM', 'MDT', 'CAT', 'GS', 'GE', 'BLK', 'ISRG', 'AMT', 'SPGI',
+    'PLD', 'T', 'CVS', 'LMT', 'SYK', 'ZTS', 'NOW', 'DE', 'ADP', 'MO', 'GILD', 'MDLZ', 'AXP', 'BKNG', 'C', 'SCHW', 'CB', 'MMC', 'CI', 'SO', 'USB', 'TGT',
+    'DUK', 'PNC', 'ELV', 'CL', 'SHW', 'APD', 'BDX', 'ICE', 'NSC', 'ITW', 'FDX', 'GM', 'ADI', 'EW', 'REGN', 'AON', 'ETN', 'EMR'
+]
+
+# Table columns (as per user spec)
+COLUMNS = [
+    "Ticker", "Price", "%chg", "Vol", "AvgVol", "VolRatio", "20EMA", "50EMA", "200SMA", "MA Trend", "VWAP", "RSI", "MACD", "Key S/R", "Target Expiry", "Suggested Strike", "Bid–Ask", "Delta", "Theta", "Gamma", "IV", "OI", "Breakeven", "POP", "Sentiment Score", "Signal Score", "Signal", "Reason", "Timestamp"
+]
 
 def fetch_yfinance_options(ticker):
-    ytkr = yf.Ticker(ticker)
-    expiries = ytkr.options
-    if not expiries:
+    # Calls for every expiry in the chain loader's DTE window, under Yahoo's column names
+    chain = chain_loader.load(ticker)
+    calls = chain[chain['type'] == 'call']
+    if calls.empty:
         return pd.DataFrame()
-    expiry = expiries[0]  # nearest expiry
-    opt_chain = ytkr.option_chain(expiry)
-    calls = opt_chain.calls.copy()
-    calls['expiration_date'] = expiry
-    # Add underlying price
-    hist = ytkr.history(period="1d")
-    underlying_price = hist['Close'].iloc[-1] if not hist.empty else None
-    calls['underlying_price'] = underlying_price
-    # Calculate days to expiry
-    today = datetime.datetime.now().date()
-    exp_date = datetime.datetime.strptime(expiry, "%Y-%m-%d").date()
-    calls['days_to_expiry'] = (exp_date - today).days
-    return calls
+    calls = calls.rename(columns={'contract': 'contractSymbol', 'last': 'lastPrice', 'oi': 'openInterest',
+                                  'iv': 'impliedVolatility', 'dte': 'days_to_expiry'})
+    calls['strike'] = strike_price(calls)
+    calls['expiration_date'] = calls['expiry'].dt.strftime('%Y-%m-%d')
+    return calls.reset_index(drop=True)
+
+def refresh_bars(ticker):
+    # Top up one ticker's local daily bars (tail fetch only)
+    return _provider.bars.update(ticker)
+
+@timed('features.universe')
+def universe_features(tickers, refresh=False):
+    # Dashboard indicator columns for the whole universe from one wide panel of daily bars
+    start = pd.Timestamp.now().normalize() - pd.DateOffset(years=1)
+    close, volume = _provider.bars.panel(tickers, start=start, refresh=refresh)
+    return panel_features(close, volume)
+
+@timed('scan.ticker')
+def get_option_candidates(ticker, feats=None, max_age=None):
+    # Blocking per-ticker scan used by the dashboard; run it through logic.scanner
+    # so tickers are fetched concurrently. `feats` is this ticker's row of
+    # universe_features(); computed on the spot when not given. `max_age` caps
+    # the age (seconds) of a cached chain, see ChainLoader.load.
+    # Returns the delta-band candidates across the DTE window; screen_candidates() applies the rubric.
+    # Failures raise, so the Scanner reports them per ticker; no data is an empty frame.
+    if feats is None:
+        feats = universe_features([ticker], refresh=True).loc[ticker]
+    # One year of daily bars from the local store (only the missing tail is downloaded);
+    # price and volumes are read from it rather than fetched again
+    hist = _provider.bars.get(ticker, start=pd.Timestamp.now().normalize() - pd.DateOffset(years=1), refresh=False)
+    if hist.empty:
+        return pd.DataFrame()
+    price = hist['close'].iloc[-1]
+    chg = (price / hist['close'].iloc[-2] - 1) * 100 if len(hist) > 1 else np.nan
+    avg_vol = hist['volume'].tail(30).mean()
+    today_vol = hist['volume'].iloc[-1]
+    # Yahoo Finance has no intraday VWAP; use the live session VWAP when the ticker is streaming
+    vwap = aggregator.session_vwap(ticker)
+    vwap = np.nan if vwap is None else vwap
+    # Every call in the DTE window whose delta is inside the scan band (Greeks computed locally)
+    chain = chain_loader.load(ticker, spot=price, max_age=max_age)
+    # Binary-search the strike window first so the delta mask only sees near-the-money rows
+    chain = moneyness_slice(chain, price)
+    calls = delta_band(chain[chain['type'] == 'call'])
+    if calls.empty:
+        return pd.DataFrame()
+    bid, ask = calls['bid'], calls['ask']
+    mid = (bid + ask) / 2
+    out = pd.DataFrame({
+        'Ticker': ticker, 'contract': calls['contract'], 'Price': price, 'ChgPct': chg, 'Vol': today_vol, 'AvgVol': avg_vol,
+        'VWAP': vwap, 'expiry': calls['expiry'].dt.strftime('%Y-%m-%d'), 'strike': strike_price(calls), 'bid': bid, 'ask': ask,
+        'delta': calls['delta'], 'theta': calls['theta'], 'gamma': calls['gamma'],
+        'iv': calls['iv'] * 100, 'oi': calls['oi'],
+        'spread_pct': ((ask - bid) / mid).where(mid > 0), 'dte': calls['dte'],
+    })
+    # Streaming tickers: today's indicators from the live engine instead of yesterday's close
+    live = engine.live(ticker) or {}
+    for col in FEATURE_COLUMNS:
+        out[col] = live[col] if live.get(col) is not None else feats[col]
+    return out.reset_index(drop=True)
+
+@timed('scoring.screen')
+def screen_candidates(candidates, rubric=RUBRIC, weights=WEIGHTS):
+    """
+    Apply the strict rubric to a candidate frame (any number of tickers) as
+    one boolean mask, add breakeven/POP/expected move to the survivors, score
+    them and lay them out as COLUMNS.
+    """
+    if candidates is None or len(candidates) == 0:
+        return pd.DataFrame(columns=COLUMNS)
+    passed = score_frame(analytics_frame(candidates[rubric_mask(candidates, rubric)]), weights=weights)
+    reason = (passed['MA Trend'].astype(str) + ' trend, MACD ' + passed['MACD'].fillna('n/a').astype(str)
+              + ', breakeven ' + passed['be_reach'].map('{:+.1f}'.format).astype(str) + 'σ away')
+    table = pd.DataFrame({
+        'Ticker': passed['Ticker'], 'Price': passed['Price'], '%chg': passed.get('ChgPct', np.nan),
+        'Vol': passed['Vol'], 'AvgVol': passed['AvgVol'], 'VolRatio': passed['VolRatio'],
+        '20EMA': passed['20EMA'], '50EMA': passed['50EMA'], '200SMA': passed['200SMA'],
+        'MA Trend': passed['MA Trend'], 'VWAP': passed['VWAP'], 'RSI': passed['RSI'], 'MACD': passed['MACD'],
+        'Key S/R': key_levels(passed) if 'Support' in passed.columns else '', 'Target Expiry': passed['expiry'], 'Suggested Strike': passed['strike'],
+        'Bid–Ask': passed['bid'].astype(str) + ' × ' + passed['ask'].astype(str),
+        'Delta': passed['delta'], 'Theta': passed['theta'], 'Gamma': passed['gamma'],
+        'IV': passed['iv'], 'OI': passed['oi'], 'Breakeven': passed['breakeven'], 'POP': passed['pop'] * 100,
+        'Sentiment Score': passed.get('Sentiment Score', ''),
+        'Signal Score': passed['Signal Score'], 'Signal': passed['Signal'], 'Reason': reason,
+        'Timestamp': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M'),
+    }, columns=COLUMNS)
+    return table.reset_index(drop=True)
@@ -0,0 +1,38 @@
+import streamlit as st
+import pandas as pd
+from data.metrics import metrics
+from data.store import get_cache
+
+st.title('Diagnostics')
+st.caption('Where refreshes spend their time: provider calls, upstream requests, features, scoring and the live stream.')
+
+snap = metrics.snapshot()
+
+st.subheader('Latency by span')
+spans = pd.DataFrame(snap['spans'])
+if spans.empty:
+    st.write('No spans recorded yet in this process.')
+else:
+    st.dataframe(spans, use_container_width=True)
+
+st.subheader('Cache hit ratios')
+cache = pd.DataFrame(get_cache().stats()).T
+if cache.empty:
+    st.write('No cache lookups yet.')
+else:
+    st.dataframe(cache, use_container_width=True)
+
+st.subheader('Bytes transferred')
+bytes_by_source = {k.split('.', 1)[1]: v for k, v in snap['counters'].items() if k.startswith('bytes.')}
+st.dataframe(pd.Series(bytes_by_source, name='bytes', dtype='float64').to_frame(), use_container_width=True)
+
+st.subheader('WebSocket stream')
+rates = snap['rates_per_sec']
+lag = next((s for s in snap['spans'] if s['span'] == 'ws.lag'), None)
+col1, col2, col3 = st.columns(3)
+col1.metric('Messages/s', f"{rates.get('ws.messages', 0):.1f}")
+col2.metric('Events/s', f"{rates.get('ws.events', 0):.1f}")
+col3.metric('Lag p50 (ms)', f"{lag['p50_ms']:.0f}" if lag else '–')
+
+with st.expander('Raw metrics snapshot'):
+    st.json({**snap, 'cache': get_cache().stats()})
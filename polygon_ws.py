@@ -1,48 +1,42 @@
 # polygon_ws.py
 # Background WebSocket client for Polygon.io real-time options data
-import websocket
 import threading
 import json
 import os
-import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from data.book import book
+from data.chains import chain_loader, delta_band, nearest_strikes
+from data.ticks import aggregator
+from data.metrics import metrics
+from data.provider import get_provider
+from logic.streaming import engine
 
 POLYGON_KEY = "uz85txFQaRLRhVMNEwUfZr4wzIVcXgf0"
 # ENSURE ONLY DELAYED ENDPOINT IS USED
 WS_URL = "wss://delayed.polygon.io/options"
 
-# Thread-safe queue to store latest messages for Streamlit
-ws_queue = queue.Queue(maxsize=100)
 
+# Quote subscriptions per ticker for the contract index, nearest delta 0.5 first
+QUOTE_CONTRACTS = 40
 
 
-
-# Helper to build Polygon option symbol for ATM call for nearest expiry
-import yfinance as yf
-from datetime import datetime
-
-
-# Subscribe to ATM call and underlying for each ticker (delayed)
-
-# Restore original logic: subscribe to ATM call and underlying for each ticker
+# Subscribe to the ATM call of every expiry in the chain loader's DTE window, plus the underlying (delayed),
+# and to quotes of the delta-band calls (the contracts logic.contract_index holds) so apply_quotes sees them
 def build_option_symbols(ticker):
     symbols = []
     try:
-        ytkr = yf.Ticker(ticker)
-        expiries = ytkr.options
-        if not expiries:
-            return []
-        expiry = expiries[0]  # nearest expiry
-        opt_chain = ytkr.option_chain(expiry)
-        calls = opt_chain.calls
-        underlying_price = ytkr.history(period="1d")['Close'].iloc[-1]
+        chain = chain_loader.load(ticker)
+        calls = chain[chain['type'] == 'call']
         if not calls.empty:
-            atm_strike = min(calls['strike'], key=lambda x: abs(x - underlying_price))
-            # Polygon format: O:{underlying}{yymmdd}{C/P}{strike*1000:08d}
-            dt = datetime.strptime(expiry, "%Y-%m-%d")
-            yymmdd = dt.strftime("%y%m%d")
-            strike_int = int(round(atm_strike * 1000))
-            option_symbol = f"T.O:{ticker.upper()}{yymmdd}C{strike_int:08d}"
-            symbols.append(option_symbol)
+            spot = float(calls['underlying_price'].iloc[0])
+            atm = nearest_strikes(calls, spot, n=1)
+            # Chain contracts are already Polygon symbols: O:{underlying}{yymmdd}{C/P}{strike*1000:08d}
+            symbols.extend(f"T.{s}" for s in atm['contract'])
+            band = delta_band(calls)
+            band = band.iloc[(band['delta'].abs() - 0.5).abs().to_numpy().argsort(kind='stable')[:QUOTE_CONTRACTS]]
+            symbols.extend(f"Q.{s}" for s in band['contract'])
         # Also subscribe to underlying trades (T.{TICKER})
         underlying_symbol = f"T.{ticker.upper()}"
         symbols.append(underlying_symbol)
@@ -51,69 +45,282 @@ def build_option_symbols(ticker):
     return symbols
 
 
+# Resolved subscription symbols per ticker, so switching back to a ticker is free
+SYMBOL_TTL = 15 * 60
+_symbol_cache = {}
+_symbol_lock = threading.Lock()
+
+def resolve_symbols(tickers, max_workers=8):
+    """
+    Subscription symbols for many tickers, resolved concurrently in the caller's
+    thread pool (never on a socket thread) and cached for SYMBOL_TTL seconds.
+    """
+    now = time.monotonic()
+    with _symbol_lock:
+        todo = [t for t in tickers if t not in _symbol_cache or now - _symbol_cache[t][0] > SYMBOL_TTL]
+    if todo:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            resolved = dict(zip(todo, pool.map(build_option_symbols, todo)))
+        with _symbol_lock:
+            for t, symbols in resolved.items():
+                if symbols:
+                    _symbol_cache[t] = (now, symbols)
+    with _symbol_lock:
+        return {t: _symbol_cache[t][1] for t in tickers if t in _symbol_cache}
+
+
 def on_message(ws, message):
-    print("[WS MESSAGE]", message)  # Debug: print all incoming messages
-    try:
-        data = json.loads(message)
-        if ws_queue.full():
-            ws_queue.get()
-        ws_queue.put(data)
-    except Exception as e:
-        print(f"[WS ERROR] {e}")
-
-def on_open(ws, ticker):
-    ws.send(json.dumps({"action": "auth", "params": POLYGON_KEY}))
-    # Subscribe only to the selected ticker
-    for symbol in build_option_symbols(ticker):
-        print(f"[WS SUBSCRIBE] {symbol}")
-        ws.send(json.dumps({"action": "subscribe", "params": symbol}))
-    print(f"[WS] Subscribed to: {ticker}")
-
-
-# Global reference to the current WebSocket and thread
-current_ws = None
-current_thread = None
-ws_lock = threading.Lock()
-
-def run_ws(ticker):
-    def _on_open(ws):
-        on_open(ws, ticker)
-    global current_ws
-    ws = websocket.WebSocketApp(WS_URL, on_open=_on_open, on_message=on_message)
-    with ws_lock:
-        current_ws = ws
-    ws.run_forever()
+    # Hot path: no printing; parse once, fold into the book and roll trades into bars
+    events = book.on_raw(message)
+    metrics.mark('ws.messages')
+    if events:
+        metrics.mark('ws.events', len(events))
+        aggregator.on_events(events)
+        # End-to-end lag: now vs the newest exchange timestamp in the message (ms)
+        stamps = [ev['t'] for ev in events if 't' in ev]
+        if stamps:
+            metrics.observe('ws.lag', time.time() * 1000 - max(stamps), 'polygon')
 
-# Helper to close the current WebSocket connection
-def close_ws():
-    global current_ws, current_thread
-    with ws_lock:
-        if current_ws is not None:
+
+class _Shard:
+    # One authenticated connection and the symbols it carries
+    def __init__(self, name):
+        self.name = name
+        self.ws = None
+        self.thread = None
+        self.symbols = set()
+        self.authed = False
+        self.lock = threading.Lock()
+
+
+class StreamManager:
+    """
+    Polygon stream for a whole universe over one connection (or a few shards).
+
+    subscribe()/unsubscribe() send incremental subscription messages on the
+    live socket; nothing reconnects when the symbol set changes. Each shard
+    reconnects on its own with exponential backoff and, once re-authenticated,
+    resubscribes everything it owns. Symbols go to the least-loaded shard;
+    a new shard is only opened when every existing one holds
+    `max_symbols_per_shard` symbols and fewer than `max_shards` are open.
+    Past capacity() symbols are refused (and logged), never packed onto a full shard.
+    """
+
+    def __init__(self, url=WS_URL, api_key=POLYGON_KEY, on_message=on_message,
+                 max_shards=1, max_symbols_per_shard=1000, max_backoff=60):
+        self.url = url
+        self.api_key = api_key
+        self.on_message = on_message
+        self.max_shards = max_shards
+        self.max_symbols_per_shard = max_symbols_per_shard
+        self.max_backoff = max_backoff
+        self.shards = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    # --- subscriptions -------------------------------------------------------
+
+    def symbols(self):
+        with self._lock:
+            return set().union(*(s.symbols for s in self.shards)) if self.shards else set()
+
+    def capacity(self):
+        return self.max_shards * self.max_symbols_per_shard
+
+    def _shard_for_new_symbol(self):
+        # Least-loaded shard with room, a new shard if allowed, else None
+        open_shards = [s for s in self.shards if len(s.symbols) < self.max_symbols_per_shard]
+        if not open_shards and len(self.shards) < self.max_shards:
+            shard = _Shard(f"polygon-ws-{len(self.shards)}")
+            self.shards.append(shard)
+            return shard
+        return min(open_shards, key=lambda s: len(s.symbols)) if open_shards else None
+
+    def subscribe(self, symbols):
+        """Subscribe new symbols; returns those refused because every shard is full."""
+        added = {}
+        refused = []
+        with self._lock:
+            current = set().union(*(s.symbols for s in self.shards)) if self.shards else set()
+            for symbol in symbols:
+                if symbol in current:
+                    continue
+                shard = self._shard_for_new_symbol()
+                if shard is None:
+                    refused.append(symbol)
+                    continue
+                shard.symbols.add(symbol)
+                current.add(symbol)
+                added.setdefault(shard, []).append(symbol)
+        if refused:
+            metrics.count('ws.refused', len(refused))
+            print(f"[WS] all {self.max_shards} shard(s) full, refused {len(refused)} symbols")
+        for shard, new in added.items():
+            self._ensure_running(shard)
+            self._send(shard, 'subscribe', new)
+        return refused
+
+    def unsubscribe(self, symbols):
+        removed = {}
+        symbols = set(symbols)
+        with self._lock:
+            for shard in self.shards:
+                gone = shard.symbols & symbols
+                if gone:
+                    shard.symbols -= gone
+                    removed[shard] = list(gone)
+        for shard, gone in removed.items():
+            self._send(shard, 'unsubscribe', gone)
+
+    def set_subscriptions(self, symbols):
+        """
+        Diff against the current set and send only the changes; when capacity
+        runs out, symbols earlier in `symbols` win. Returns the refused ones.
+        """
+        ordered = list(dict.fromkeys(symbols))
+        current = self.symbols()
+        self.unsubscribe(current - set(ordered))
+        refused = self.subscribe([s for s in ordered if s not in current])
+        # Reopen shards after stop() even when the symbol set is unchanged
+        for shard in list(self.shards):
+            if shard.symbols:
+                self._ensure_running(shard)
+        return refused
+
+    def _send(self, shard, action, symbols):
+        # Only send on an authenticated socket; otherwise the auth handler sends the full set
+        with shard.lock:
+            if shard.ws is None or not shard.authed or not symbols:
+                return
             try:
-                current_ws.close()
+                shard.ws.send(json.dumps({"action": action, "params": ",".join(sorted(symbols))}))
+                print(f"[WS] {shard.name} {action}: {len(symbols)} symbols")
             except Exception as e:
-                print(f"[WS CLOSE ERROR] {e}")
-            current_ws = None
-        if current_thread is not None:
+                print(f"[WS SEND ERROR] {shard.name}: {e}")
+
+    # --- connections ---------------------------------------------------------
+
+    def _ensure_running(self, shard):
+        with shard.lock:
+            if shard.thread is not None and shard.thread.is_alive():
+                return
+            self._stopping.clear()
+            shard.thread = threading.Thread(target=self._run_shard, args=(shard,), name=shard.name, daemon=True)
+            shard.thread.start()
+
+    def _run_shard(self, shard):
+        # websocket-client is only needed once a stream actually starts
+        import websocket
+        backoff = 1
+        while not self._stopping.is_set():
+            def _on_open(ws):
+                ws.send(json.dumps({"action": "auth", "params": self.api_key}))
+
+            def _on_message(ws, message):
+                if '"status"' in message and not shard.authed:
+                    self._handle_status(shard, message)
+                self.on_message(ws, message)
+
+            ws = websocket.WebSocketApp(self.url, on_open=_on_open, on_message=_on_message)
+            with shard.lock:
+                shard.ws = ws
+                shard.authed = False
+            started = time.monotonic()
             try:
-                # Wait for thread to finish (with timeout)
-                current_thread.join(timeout=2)
+                ws.run_forever()
             except Exception as e:
-                print(f"[WS THREAD JOIN ERROR] {e}")
-            current_thread = None
+                print(f"[WS ERROR] {shard.name}: {e}")
+            with shard.lock:
+                shard.ws = None
+                shard.authed = False
+            if self._stopping.is_set():
+                break
+            # A connection that stayed up for a while resets the backoff
+            if time.monotonic() - started > 60:
+                backoff = 1
+            print(f"[WS] {shard.name} disconnected, reconnecting in {backoff}s")
+            self._stopping.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _handle_status(self, shard, message):
+        try:
+            events = json.loads(message)
+        except ValueError:
+            return
+        for ev in events if isinstance(events, list) else [events]:
+            if ev.get('ev') == 'status' and ev.get('status') == 'auth_success':
+                with shard.lock:
+                    shard.authed = True
+                # Restore everything this shard owns (first connect or reconnect)
+                with self._lock:
+                    symbols = list(shard.symbols)
+                self._send(shard, 'subscribe', symbols)
+
+    def stop(self, timeout=2):
+        self._stopping.set()
+        for shard in list(self.shards):
+            with shard.lock:
+                ws = shard.ws
+            if ws is not None:
+                try:
+                    ws.close()
+                except Exception as e:
+                    print(f"[WS CLOSE ERROR] {e}")
+            if shard.thread is not None:
+                shard.thread.join(timeout=timeout)
+                shard.thread = None
 
-# Start WebSocket in a background thread for a specific ticker
+
+# Process-wide stream manager used by the helpers below
+manager = StreamManager()
+
+# Helper to close the current WebSocket connection
+def close_ws():
+    manager.stop()
+
+# Live daily indicators: streamed tickers are seeded from their stored daily bars,
+# then every closed aggregator bar moves today's provisional bar (logic.streaming)
+aggregator.add_listener(engine.on_bar_close)
+
+def bootstrap_indicators(tickers):
+    today = pd.Timestamp.now().normalize()
+    for ticker in tickers:
+        if ticker in engine.tickers:
+            continue
+        bars = get_provider().bars.load(ticker)
+        bars = bars[bars.index < today]
+        if len(bars):
+            engine.bootstrap(ticker, bars['close'], bars['volume'])
+
+# Stream a specific ticker: resolves its symbols here, then swaps subscriptions on the live connection
 def start_ws_thread(ticker):
-    global current_thread
-    close_ws()  # Always close any previous WebSocket before starting a new one
-    thread = threading.Thread(target=run_ws, args=(ticker,), daemon=True)
-    with ws_lock:
-        current_thread = thread
-    thread.start()
-
-# Helper for Streamlit to get latest messages
-def get_latest_ws_data():
-    items = []
-    while not ws_queue.empty():
-        items.append(ws_queue.get())
-    return items
+    symbols = resolve_symbols([ticker]).get(ticker, [])
+    bootstrap_indicators([ticker])
+    manager.set_subscriptions(symbols)
+
+def fit_subscriptions(resolved, capacity):
+    """
+    Flatten {ticker: symbols} into at most `capacity` symbols: every trade
+    channel first, then the quote channels shared out evenly per ticker
+    (each ticker's list is already nearest-ATM first).
+    """
+    trades = [s for symbols in resolved.values() for s in symbols if not s.startswith('Q.')]
+    quotes = {t: [s for s in symbols if s.startswith('Q.')] for t, symbols in resolved.items()}
+    room = max(capacity - len(trades), 0)
+    per_ticker = room // len(quotes) if quotes else 0
+    kept = [s for symbols in quotes.values() for s in symbols[:per_ticker]]
+    dropped = sum(len(symbols) for symbols in quotes.values()) - len(kept)
+    if dropped:
+        metrics.count('ws.quotes_trimmed', dropped)
+        print(f"[WS] {len(trades) + len(kept)} symbols fit {capacity} slots, dropped {dropped} quote channels")
+    return trades[:capacity] + kept
+
+# Stream a whole universe over the same connection(s), within the manager's symbol capacity
+def start_universe_stream(tickers):
+    resolved = resolve_symbols(tickers)
+    bootstrap_indicators(list(resolved))
+    manager.set_subscriptions(fit_subscriptions(resolved, manager.capacity()))
+
+# Helper for Streamlit to get the latest state: (seq, {symbol: entry}) for symbols updated after since_seq
+def get_latest_ws_data(since_seq=0):
+    return book.snapshot(since_seq)
@@ -0,0 +1,8 @@
+# conftest.py
+# Offline test setup: a throwaway disk cache and no vendor keys from the environment
+import os
+import tempfile
+
+# The disk cache and bar store read their location at import time
+os.environ['OPTIONS_CACHE_DIR'] = tempfile.mkdtemp(prefix='options-test-')
+os.environ.pop('ALPHA_VANTAGE', None)
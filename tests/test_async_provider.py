@@ -0,0 +1,32 @@
+# test_async_provider.py
+# Async provider methods scanned through Scanner.scan_async against the replay fixtures
+import asyncio
+import inspect
+from benchmarks.replay import offline, universe
+from data.async_provider import AsyncOptionAProvider
+from data.metrics import metrics
+from logic.scanner import Scanner
+
+
+def test_timed_methods_stay_coroutine_functions():
+    assert inspect.iscoroutinefunction(AsyncOptionAProvider.get_prices)
+    assert inspect.iscoroutinefunction(AsyncOptionAProvider.get_option_chain)
+
+
+def test_scan_async_awaits_provider_methods():
+    tickers = universe(3)
+
+    async def scan():
+        async with AsyncOptionAProvider() as provider:
+            return [r async for r in Scanner(provider.get_prices, max_workers=2).scan_async(tickers)]
+
+    metrics.reset()
+    with offline():
+        results = asyncio.run(scan())
+    assert sorted(r.ticker for r in results) == tickers
+    for result in results:
+        assert result.error is None
+        assert isinstance(result.rows, dict) and result.rows['Price'] is not None
+    # The span covers the awaited call, not just creating the coroutine
+    spans = {row['span']: row for row in metrics.snapshot()['spans']}
+    assert spans['async.get_prices']['count'] == len(tickers)
@@ -0,0 +1,15 @@
+# test_provider.py
+# OptionAProvider bulk Greeks against the replay fixtures
+import math
+from benchmarks.replay import expiries, offline
+from data.provider import OptionAProvider
+
+
+def test_unlisted_contract_priced_from_snapshot_spot():
+    with offline():
+        provider = OptionAProvider()
+        spot = provider.get_chain_snapshot('T0001')['underlying_price'].iloc[0]
+        out = provider.get_greeks_bulk([{'ticker': 'T0001', 'expiry': expiries()[0], 'strike': round(spot, 2) + 0.01, 'iv': 0.4}])
+    row = out.iloc[0]
+    assert row['greeks_source'] == 'local'
+    assert 0.3 < row['delta'] < 0.7 and not math.isnan(row['gamma'])
@@ -0,0 +1,47 @@
+# test_scoring.py
+# The scalar and columnar scoring paths agree row for row
+import numpy as np
+import pandas as pd
+from logic.scoring import dte_score, dte_scores, greeks_score, greeks_scores, technical_score, technical_scores
+
+
+def _contracts(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'delta': rng.uniform(0.2, 0.8, n),
+        'theta': rng.uniform(-0.3, 0.0, n),
+        'gamma': rng.uniform(0.0, 0.03, n),
+        'iv_wow': rng.uniform(-0.2, 0.3, n),
+        'spread_pct': rng.uniform(0.0, 0.2, n),
+        'be_reach': rng.uniform(-1.0, 3.0, n),
+    })
+
+
+def test_greeks_score_matches_columnar():
+    df = _contracts()
+    scalar = [greeks_score(r.delta, r.theta, r.gamma, r.iv_wow, r.spread_pct, r.be_reach) for r in df.itertuples()]
+    np.testing.assert_allclose(greeks_scores(df), scalar)
+
+
+def test_greeks_score_without_be_reach():
+    df = _contracts().drop(columns='be_reach')
+    scalar = [greeks_score(r.delta, r.theta, r.gamma, r.iv_wow, r.spread_pct) for r in df.itertuples()]
+    np.testing.assert_allclose(greeks_scores(df), scalar)
+
+
+def test_technical_score_matches_columnar_any_case():
+    rng = np.random.default_rng(1)
+    n = 300
+    df = pd.DataFrame({
+        'MA Trend': rng.choice(['Bullish', 'bearish', 'Neutral', 'BULLISH'], n),
+        'RSI': rng.uniform(20, 90, n),
+        'MACD': rng.choice(['Up', 'down', 'UP'], n),
+        'VolRatio': rng.uniform(0.5, 3.0, n),
+    })
+    scalar = [technical_score(r[1], r[2], r[3], r[4]) for r in df.itertuples()]
+    np.testing.assert_allclose(technical_scores(df), scalar)
+
+
+def test_dte_score_matches_columnar():
+    dte = np.arange(0, 90)
+    np.testing.assert_array_equal(dte_scores(dte), [dte_score(d) for d in dte])
@@ -0,0 +1,46 @@
+# test_streaming.py
+# Streaming indicators against logic.features, and the engine fed from aggregator bar closes
+import numpy as np
+import pandas as pd
+from data.ticks import BarAggregator
+from logic import features
+from logic.streaming import RSI, IndicatorEngine
+
+
+def _prices(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2024-01-01', periods=n)
+    close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), index=index)
+    volume = pd.Series(rng.integers(1_000, 5_000, n).astype(float), index=index)
+    return close, volume
+
+
+def test_rsi_matches_dashboard_rsi():
+    close, _ = _prices()
+    expected = features.rsi(close)
+    rsi = RSI(14)
+    streamed = [rsi.update(x) for x in close]
+    np.testing.assert_allclose(np.array(streamed[13:], dtype=float), expected.iloc[13:], rtol=1e-9)
+    seeded = RSI(14)
+    seeded.bootstrap(close.iloc[:200])
+    assert abs(seeded.peek(close.iloc[200]) - expected.iloc[200]) < 1e-9
+
+
+def test_engine_live_features_from_aggregator():
+    close, volume = _prices()
+    engine = IndicatorEngine(interval=60)
+    engine.bootstrap('X', close.iloc[:-1], volume.iloc[:-1])
+    agg = BarAggregator(intervals=(60,))
+    agg.add_listener(engine.on_bar_close)
+    # Today's session as three one-minute bars; the third closes when the next trade arrives
+    day = close.index[-1].value // 1_000_000 + 15 * 3_600_000
+    last, today_volume = close.iloc[-1], volume.iloc[-1]
+    for minute, (price, size) in enumerate([(last * 0.99, 1000.0), (last * 1.01, 500.0), (last, today_volume - 1500)]):
+        agg.on_trade('X', price, size, day + minute * 60_000)
+    agg.on_trade('X', last, 1.0, day + 3 * 60_000)
+
+    live = engine.live('X')
+    expected = features.panel_features(close.to_frame('X'), volume.to_frame('X')).loc['X']
+    for col in ('20EMA', '50EMA', '200SMA', 'RSI', 'VolRatio'):
+        assert abs(live[col] - expected[col]) < 1e-6, col
+    assert live['MA Trend'] == expected['MA Trend'] and live['MACD'] == expected['MACD']
@@ -0,0 +1,18 @@
+# test_ticks.py
+# Bars handed out by the aggregator do not change as new trades arrive
+import numpy as np
+from data.ticks import BarAggregator
+
+
+def test_bars_are_stable_after_more_trades():
+    agg = BarAggregator(intervals=(1,), capacity={1: 4})
+    for second in range(5):
+        agg.on_trade('X', 100 + second, 10, second * 1000)
+    bars = agg.bars('X', 1)
+    assert len(bars['close']) == 4
+    before = bars['close'].copy()
+    for second in range(5, 12):
+        agg.on_trade('X', 200 + second, 10, second * 1000)
+    np.testing.assert_array_equal(bars['close'], before)
+    assert agg.current('X', 1)['close'] == 211
+    assert agg.frame('X', 1, include_open=True)['close'].iloc[-1] == 211